@@ -16,6 +16,7 @@
 #
 #   STATE live:
 #       Kurzer Tap      -> Foto aufnehmen
+#       Doppel-Tap      -> Serienbild (BURST_COUNT Fotos mit BURST_FPS)
 #       Langer Tap (>0.8 s gedrückt halten) -> Video starten (state="recording")
 #
 #   STATE recording:
@@ -28,12 +29,26 @@
 #
 # Autor: Martin Hofer
 
-import os, time, glob, shutil, fcntl, mmap, struct, subprocess, sys, select, struct as st, threading
+import os, time, subprocess, sys, threading
 import cv2, numpy as np
 from picamera2 import Picamera2
 from picamera2.encoders import H264Encoder
 from picamera2.outputs import FileOutput
 
+from nightcam.framebuffer import open_fb, GrayHudCompositor
+from nightcam.display_thread import DisplayThread
+from nightcam.camera import configure_camera, luma, RequestCapture
+from nightcam.enhance import make_equalizer
+from nightcam.governor import FrameGovernor
+from nightcam.hud import SpriteCache
+from nightcam.reactor import Reactor
+from nightcam.sequence import SequenceAllocator
+from nightcam.layout import MediaLayout, Resharder
+from nightcam.storage import StorageMonitor
+from nightcam.capacity import CapacityModel
+from nightcam.photo_writer import PhotoWriter
+from nightcam.touch import TouchThread, GestureRecognizer
+
 try:
     from terminal_access.terminal_launcher import TerminalLauncher
     from terminal_access.touch_button import TerminalButton
@@ -52,191 +67,118 @@ TOUCH_DEV      = "/dev/input/event0"  # ADS7846 Touchscreen
 SHORT_LONG     = 0.8           # >0.8s in LIVE => Video starten
 IDLE_SHUT      = 2.5           # >2.5s in IDLE => Shutdown
 DBL_GAP        = 0.35          # Doppeltap-Fenster
-EST_PHOTO_BYTES= 500_000       # ~0.5MB/JPG
-EST_VIDEO_MBPS = 0.5           # ~0.5 MB/s => ~30 MB/min
-
-FBIOGET_VSCREENINFO = 0x4600
+EST_PHOTO_BYTES= 500_000       # Startwert ~0.5MB/JPG (danach gemessen)
+EST_VIDEO_MBPS = 0.5           # Startwert ~0.5 MB/s (danach gemessen)
+FREE_MEASURE_SEC = 30.0        # statvfs so selten; dazwischen zählen die geschriebenen Bytes
+DISPLAY_MAX_FPS= 30            # Obergrenze Display-Refresh (eigener Thread)
+PERF_LOG_SEC   = 5.0           # Intervall für FPS-Log
+USB_REFRESH_SEC= 1.0           # USB-Manager: Status ohne Touch so oft neu zeichnen
+CAM_SIZE       = (640, 480)    # Hauptstream in den Modi "yuv"/"bgr"
+CAPTURE_MODE   = "lores"       # "lores" = ISP skaliert auf Display, "yuv" = Y-Ebene, "bgr" = alter Pfad
+CAPTURE_INFLIGHT = 2           # max. gleichzeitig gehaltene Kamera-Requests (Vorschau + Foto)
+TARGET_FPS     = 30            # Frame-Budget für den Governor (Qualität passt sich an)
+EQUALIZE_MODE  = "smooth"      # "smooth" = geglättete LUT (kein Flackern), "exact" = equalizeHist pro Frame
+MEDIA_LAYOUT   = "date"        # "date" = Unterverzeichnis pro Tag (YYYY-MM-DD), "flat" = alles in einem
+MEDIA_PER_DIR  = 1000          # max. Dateien pro Tagesverzeichnis (danach YYYY-MM-DD_2 ...)
+PHOTO_WORKERS  = 2             # Threads für JPEG-Kodierung und Schreiben
+PHOTO_QUEUE    = 6             # max. Fotos in der Warteschlange (danach verworfen)
+BURST_COUNT    = 5             # Fotos pro Serienbild
+BURST_FPS      = 4.0           # Serienbilder pro Sekunde
 
 ############################
 # SPEICHER / USB
 ############################
 
-_usb_cache = None
-_usb_cache_time = 0
-_usb_last_check = 0  # Für häufigere Hot-Unplug-Checks
-_manual_unmount = False  # Verhindert Auto-Mount nach manuellem Unmount
+# USB-Stick, Auto-Mount und freier Platz laufen im Hintergrund
+# (nightcam/storage.py); die Oberfläche liest nur storage.snapshot
+# notify läuft im Monitor-Thread: Kapazitäts-Statistik eines neuen
+# Speicherorts dort laden, nicht im Hauptthread
+storage = StorageMonitor(fallback=os.path.expanduser("~"), free_interval=FREE_MEASURE_SEC,
+                         notify=lambda: capacity.load(storage.snapshot.root))
+# Gemessene Größen pro Speicherort (nightcam/capacity.py)
+capacity = CapacityModel(photo_bytes=EST_PHOTO_BYTES, video_bps=EST_VIDEO_MBPS * 1024 * 1024)
 
 def usb_mountpoint():
-    global _usb_cache, _usb_cache_time, _usb_last_check, _manual_unmount
-    now = time.time()
-    
-    # Wenn USB physisch entfernt wurde, manual_unmount Flag zurücksetzen
-    usb_dev = "/dev/sda1"
-    if not os.path.exists(usb_dev):
-        if _manual_unmount:
-            print(f"[USB] Device entfernt, Auto-Mount wieder aktiviert")
-            _manual_unmount = False
-    
-    # Häufige Checks (alle 2s) ob noch gemountet, auch wenn Cache gültig
-    if _usb_cache is not None and (now - _usb_last_check) > 2.0:
-        if not os.path.ismount(_usb_cache):
-            print(f"[USB] Hot-Unplug erkannt: {_usb_cache} nicht mehr gemountet")
-            _usb_cache = None
-            _usb_cache_time = 0
-        _usb_last_check = now
-    
-    # Cache nur verwenden wenn Mountpoint noch existiert UND gemountet ist
-    if _usb_cache is not None and (now - _usb_cache_time) < 5.0:
-        if os.path.ismount(_usb_cache):
-            return _usb_cache
-        else:
-            print(f"[USB] Cache ungültig: {_usb_cache} nicht mehr gemountet")
-            _usb_cache = None
-    
-    # Auto-Mount: Prüfe ob USB-Device existiert aber nicht gemountet
-    # ABER: Überspringe wenn manuell unmountet wurde
-    mount_target = "/media/usb"
-    
-    if os.path.exists(usb_dev) and not os.path.ismount(mount_target) and not _manual_unmount:
-        print(f"[USB] {usb_dev} gefunden aber nicht gemountet")
-        os.makedirs(mount_target, exist_ok=True)
-        try:
-            # Mount mit User-Rechten (uid/gid vom aktuellen User)
-            uid = os.getuid()
-            gid = os.getgid()
-            subprocess.run(["sudo", "mount", "-o", f"uid={uid},gid={gid},umask=000", 
-                          usb_dev, mount_target], check=True, timeout=5)
-            print(f"[USB] Auto-Mount erfolgreich: {mount_target}")
-            time.sleep(0.5)  # Kurz warten bis Mount sichtbar
-        except Exception as e:
-            print(f"[USB] Auto-Mount fehlgeschlagen: {e}")
-    
-    # Mehrere mögliche Base-Pfade für verschiedene Raspbian-Versionen
-    base_paths = [
-        "/media/valentin",  # User valentin
-        "/media/pi",        # Ältere Raspbian-Versionen
-        "/media"            # Fallback für allgemeine Struktur
-    ]
-    
-    for base in base_paths:
-        if not os.path.isdir(base):
-            continue
-        
-        for e in os.scandir(base):
-            if e.is_dir() and e.name.startswith("usb"):
-                # NUR wenn tatsächlich als Mountpoint gemountet
-                if os.path.ismount(e.path):
-                    return e.path
-    
-    return None
+    return storage.snapshot.usb
 
 def ensure_dirs():
-    usb = usb_mountpoint()
-    if usb:
-        pdir = os.path.join(usb, "Nachtsicht_Fotos")
-        vdir = os.path.join(usb, "Nachtsicht_Videos")
-    else:
-        # Verwende HOME-Verzeichnis des aktuellen Users
-        home = os.path.expanduser("~")
-        pdir = os.path.join(home, "Nachtsicht_Fotos")
-        vdir = os.path.join(home, "Nachtsicht_Videos")
+    root = storage.snapshot.root    # USB-Stick, sonst HOME-Verzeichnis
+    pdir = os.path.join(root, "Nachtsicht_Fotos")
+    vdir = os.path.join(root, "Nachtsicht_Videos")
     os.makedirs(pdir, exist_ok=True)
     os.makedirs(vdir, exist_ok=True)
     return pdir, vdir
 
+# Nächste Nummer aus Speicher/Sidecar statt glob über das ganze Verzeichnis
+photo_seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+video_seq = SequenceAllocator("Nachtsicht_Video", ".h264")
+# Neue Dateien in Tagesverzeichnissen (nightcam/layout.py)
+media_layout = MediaLayout(sharded=(MEDIA_LAYOUT == "date"), max_per_leaf=MEDIA_PER_DIR)
+_resharders = {}    # Verzeichnis -> Resharder (alte flache Ablage verschieben)
+
 def next_photo():
     pdir, _ = ensure_dirs()
-    ex = glob.glob(os.path.join(pdir, "Nachtsicht_Foto*.jpg"))
-    n = 0
-    for p in ex:
-        b = os.path.basename(p)
-        try:
-            num = int(b.replace("Nachtsicht_Foto","").replace(".jpg",""))
-            n = max(n, num)
-        except:
-            pass
-    return os.path.join(pdir, f"Nachtsicht_Foto{n+1}.jpg")
+    return photo_seq.next_path(pdir, media_layout.leaf(pdir))
 
 def next_video():
     _, vdir = ensure_dirs()
-    ex = glob.glob(os.path.join(vdir, "Nachtsicht_Video*.h264"))
-    n = 0
-    for p in ex:
-        b = os.path.basename(p)
-        try:
-            num = int(b.replace("Nachtsicht_Video","").replace(".h264",""))
-            n = max(n, num)
-        except:
-            pass
-    return os.path.join(vdir, f"Nachtsicht_Video{n+1}.h264")
+    return video_seq.next_path(vdir, media_layout.leaf(vdir))
+
+def reshard_flat_dirs():
+    """Verschiebt flach liegende Altdateien im Hintergrund in Tagesverzeichnisse"""
+    if not media_layout.sharded:
+        return
+    for base in ensure_dirs():
+        job = _resharders.get(base)
+        if job is None or not job.is_alive():
+            job = Resharder(base, media_layout)
+            job.start()
+            _resharders[base] = job
 
 def next_video_ts():
     _, vdir = ensure_dirs()
+    vdir = media_layout.leaf(vdir)
     ts = time.strftime("%Y-%m-%d_%H%M%S")
     us = int((time.time() % 1) * 1_000_000)
     return os.path.join(vdir, f"Nachtsicht_Video_{ts}_{us:06d}.h264")
 
 def free_bytes_path():
-    path = usb_mountpoint() or os.path.expanduser("~")
-    st2 = shutil.disk_usage(path)
-    return st2.free
+    return storage.snapshot.free_bytes
 
 def estimate_capacity():
-    fb = free_bytes_path()
-    photos = int(fb // EST_PHOTO_BYTES)
-    mins   = int((fb/1024/1024) / EST_VIDEO_MBPS) // 60
-    return photos, mins
+    # Letzte Messung minus seitdem geschriebene Bytes, kein Systemaufruf
+    return capacity.estimate(storage.snapshot)
 
 ############################
 # FRAMEBUFFER HANDLING
 ############################
 
-def open_fb(path):
-    fd = os.open(path, os.O_RDWR)
-
-    # Try ioctl to get resolution. Fallback to 480x320 if parsing fails.
-    try:
-        raw = fcntl.ioctl(fd, FBIOGET_VSCREENINFO, b"\x00"*160)
-        # fb_var_screeninfo beginnt mit:
-        # __u32 xres, yres, xres_virtual, yres_virtual,
-        # xoffset, yoffset, bits_per_pixel, grayscale, ...
-        # Das sind 8 * u32 = 8 * 4 = 32 Bytes.
-        xres, yres, xrv, yrv, xoff, yoff, bpp, gray = struct.unpack_from("8I", raw, 0)
-        if xres == 0 or yres == 0:
-            raise ValueError("bad ioctl dims")
-    except Exception:
-        # Fallback für exotische Treiber
-        xres, yres, bpp = 480, 320, 16
-
-    # wir rendern sowieso als RGB565 (16bpp)
-    fbsize = xres * yres * 2
-    mm = mmap.mmap(fd, fbsize, mmap.MAP_SHARED,
-                   mmap.PROT_WRITE | mmap.PROT_READ, 0)
-    print(f"[FB] {path} {xres}x{yres}@{bpp}bpp")
-    return fd, mm, xres, yres, bpp
-
-def bgr_to_rgb565(bgr):
-    b = (bgr[:,:,0]>>3).astype(np.uint16)
-    g = (bgr[:,:,1]>>2).astype(np.uint16)
-    r = (bgr[:,:,2]>>3).astype(np.uint16)
-    return ((r<<11)|(g<<5)|b).tobytes()
-
-def fb_draw(bgr, fb_mem, w, h):
-    resized = cv2.resize(bgr, (w,h), interpolation=cv2.INTER_LINEAR)
-    fb_mem.seek(0)
-    fb_mem.write(bgr_to_rgb565(resized))
+# open_fb / Framebuffer: siehe nightcam/framebuffer.py
+# (liest Stride + Pixelformat, schreibt direkt ins gemappte /dev/fb1)
 
 ############################
 # KAMERA
 ############################
 
 picam = Picamera2()
-picam.configure(
-    picam.create_preview_configuration(
-        main={"size": (640,480)},
-        controls={"AeEnable":True, "AwbEnable":True}
+cam = None      # CameraSetup, wird in setup_camera() gesetzt
+capture = None  # RequestCapture, nach picam.start()
+governor = FrameGovernor(target_fps=TARGET_FPS)
+
+def setup_camera(panel_size):
+    """
+    Konfiguriert die Kamera passend zum Display
+    lores: Vorschau-Stream in Display-Größe, main (größer) für Video/Foto.
+    Fallback-Kette lores -> yuv -> bgr.
+    """
+    global cam
+    cam = configure_camera(
+        picam, CAPTURE_MODE, CAM_SIZE,
+        controls={"AeEnable":True, "AwbEnable":True},
+        video=False, panel_size=panel_size
     )
-)
+    return cam
+
 encoder = H264Encoder(bitrate=int(4_000_000))
 video_out = None
 
@@ -246,18 +188,62 @@ video_out = None
 
 state = "idle"
 rec_name = None
+rec_root = None     # Speicherort der laufenden Aufnahme
+rec_start = 0.0     # time.monotonic() beim Start
 _stopping_video = False
 
-def take_photo():
-    fn = next_photo()
-    frame = picam.capture_array()
-    gray  = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    enh   = cv2.equalizeHist(gray)
-    cv2.imwrite(fn, enh)
+photo_writer = None     # PhotoWriter, in main() gestartet
+burst_left = 0          # noch ausstehende Serienbilder
+burst_next = 0.0        # time.monotonic() des nächsten Serienbilds
+
+def _enhance_photo(buf):
+    cv2.equalizeHist(buf, dst=buf)
+
+def _photo_saved(fn, nbytes):
+    # Im Worker-Thread: Größe direkt aus imencode, kein stat
+    capacity.record_photo(storage.snapshot.root, nbytes)
     ph, mn = estimate_capacity()
     print(f"[FOTO] {fn} | Rest ~{ph} Fotos / ~{mn} min Video")
 
-def _stop_video_thread(rec_file, out_handle):
+def take_photo():
+    """Graubild kopieren und einreihen; Kodieren/Schreiben im PhotoWriter"""
+    w, h = cam.main_size
+    buf = photo_writer.acquire((h, w))
+    if buf is None:
+        print(f"[FOTO] Warteschlange voll ({photo_writer.pending()}), verworfen")
+        return
+    try:
+        # Request nur für die Kopie halten
+        with capture.frame("main") as frame:
+            gray = luma(frame, cam.main_mode, cam.main_size, dst=buf)
+            if gray is not buf:
+                np.copyto(buf, gray)
+    except Exception:
+        photo_writer.release(buf)
+        raise
+    photo_writer.submit(buf)
+
+def start_burst():
+    global burst_left, burst_next
+    burst_left = BURST_COUNT
+    burst_next = time.monotonic()
+
+def burst_step():
+    """Nächstes Serienbild, falls fällig; liefert die Wartezeit bis zum folgenden"""
+    global burst_left, burst_next
+    if state != "live":
+        burst_left = 0
+    if not burst_left:
+        return None
+    now = time.monotonic()
+    if now < burst_next:
+        return burst_next - now
+    take_photo()
+    burst_left -= 1
+    burst_next = max(burst_next + 1.0 / BURST_FPS, now)
+    return (burst_next - now) if burst_left else None
+
+def _stop_video_thread(rec_file, out_handle, root, seconds):
     global _stopping_video
     # NUR File-Close im Thread - stop_recording ist schon passiert!
     if out_handle:
@@ -265,18 +251,25 @@ def _stop_video_thread(rec_file, out_handle):
             out_handle.close()
         except Exception as e:
             print(f"[VIDEO] ERROR close: {e}")
+    try:
+        capacity.record_video(root, os.path.getsize(rec_file), seconds)
+    except OSError as e:
+        print(f"[VIDEO] Größe unbekannt: {e}")
     
     _stopping_video = False
     print(f"[VIDEO] SAVED -> {rec_file}")
 
 def start_video():
-    global state, rec_name, video_out, _stopping_video
+    global state, rec_name, rec_root, rec_start, video_out, _stopping_video
     if _stopping_video or state == "recording":
         return
     rec_name = next_video_ts()
     print(f"[VIDEO] START -> {rec_name}")
     video_out = FileOutput(rec_name)
     picam.start_recording(encoder, video_out)
+    rec_root = storage.snapshot.root
+    rec_start = time.monotonic()
+    capacity.video_started(rec_root)
     state = "recording"
 
 def stop_video():
@@ -293,7 +286,8 @@ def stop_video():
         
         # Nur File-Close im Worker-Thread (kann langsam sein)
         _stopping_video = True
-        worker = threading.Thread(target=_stop_video_thread, args=(rec_name, video_out))
+        worker = threading.Thread(target=_stop_video_thread,
+                                  args=(rec_name, video_out, rec_root, time.monotonic() - rec_start))
         worker.daemon = True
         worker.start()
         
@@ -308,6 +302,8 @@ def safe_shutdown():
     while _stopping_video:
         print("[SHUTDOWN] warte auf Video-Stop...")
         time.sleep(0.1)
+    if photo_writer is not None and not photo_writer.flush(5.0):
+        print("[SHUTDOWN] Fotos noch nicht gespeichert")
     
     os.sync()
 
@@ -326,31 +322,21 @@ def safe_shutdown():
 # TOUCH-EVENT HANDLING
 ############################
 #
-# Wir lesen /dev/input/event0 roh.
+# Wir lesen /dev/input/event0 roh, in eigenem Thread (nightcam/touch.py).
 # Abs-Events (ABS_X / ABS_Y) geben Position, Key-Events (BTN_TOUCH)
-# sagen "Finger down/up".
-#
-# Wir brauchen:
-# - down_time
-# - up_time
-# - last_tap_time
-# - click_pending für Doppeltap
+# sagen "Finger down/up". Der Touch-Thread erkennt daraus mit den
+# Kernel-Zeitstempeln:
+# - up      (jedes Loslassen, für Tastatur, USB-Manager und Buttons)
+# - tap     (kurz, nach Ablauf des Doppeltap-Fensters)
+# - double  (zwei kurze Taps innerhalb DBL_GAP)
+# - long    (>= SHORT_LONG, beim Loslassen)
+# - hold    (Finger seit IDLE_SHUT unten)
+# und legt sie in eine Warteschlange, die handle_gestures() abarbeitet.
 #
 
 touch_fd = None
-ABS_X = 0x00
-ABS_Y = 0x01
-BTN_TOUCH = 0x14a  # oft 330 dezimal
-
-cur_x = 0
-cur_y = 0
-norm_x = 0  # Normalisierte Display-Koordinaten (0-480)
-norm_y = 0  # Normalisierte Display-Koordinaten (0-320)
-finger_down = False
-down_time = 0.0
-
-click_pending = False
-last_tap_time = 0.0
+touch_thread = None  # TouchThread auf touch_fd (in main() gestartet)
+consumed_up = None   # Zeit des letzten "up", das Tastatur/Buttons verbraucht haben
 
 terminal_launcher = None
 terminal_button = None
@@ -368,167 +354,126 @@ def open_touch():
         print(f"[TOUCH] FAIL open {TOUCH_DEV}: {e}")
         touch_fd = None
 
-def read_touch_events():
-    """
-    Liest alle pending Events und aktualisiert cur_x, cur_y und Finger-Zustand.
-    Gibt eine Liste von "touch_up" Events zurück, jede mit (press_dauer_sek).
-    """
-    global cur_x, cur_y, norm_x, norm_y, finger_down, down_time
-    ups = []
-
-    if touch_fd is None:
-        return ups
-
-    # Linux input event struct = timeval(sec,usec), type, code, value
-    # 16 bytes time + 2 + 2 + 4 = 24 bytes
-    EVENT_SIZE = 24
-    while True:
-        r,_,_ = select.select([touch_fd],[],[],0)
-        if not r:
-            break
-        data = os.read(touch_fd, EVENT_SIZE)
-        if len(data) < EVENT_SIZE:
-            break
-        sec, usec, etype, code, value = st.unpack("llHHI", data)
-
-        if etype == 0x03:  # EV_ABS
-            if code == ABS_X:
-                cur_x = value
-            elif code == ABS_Y:
-                cur_y = value
-                
-            # Touch-Kalibrierung basierend auf gemessenen Daten
-            # Achsen tauschen: raw_y->display_x, raw_x->display_y
-            # Y-Achse: raw_x=2251→y=194, raw_x=3385→y=306
-            # X-Achse: komprimiert 52-271 → gestreckt 40-440
-            temp_x = int(cur_y * 479 / 4095)
-            temp_x_flipped = 479 - temp_x
-            # X-Offset: 15px nach links (Tastatur war zu weit rechts)
-            norm_x = int(1.826 * temp_x_flipped - 55) 
-            # Y-Offset: 50px nach oben (Buttons waren zu tief)
-            norm_y = int((cur_x - 286) * 194.0 / 1965.0) + 80
-
-        elif etype == 0x01 and code == BTN_TOUCH:
-            # value 1 = down, 0 = up
-            if value == 1 and not finger_down:
-                finger_down = True
-                down_time = time.time()
-            elif value == 0 and finger_down:
-                press_len = time.time() - down_time
-                finger_down = False
-                ups.append(press_len)
-
-    return ups
+def calibrate_touch(raw_x, raw_y):
+    """Rohwerte des Touch-Controllers -> Display-Koordinaten (norm_x, norm_y)"""
+    # Touch-Kalibrierung basierend auf gemessenen Daten
+    # Achsen tauschen: raw_y->display_x, raw_x->display_y
+    # Y-Achse: raw_x=2251→y=194, raw_x=3385→y=306
+    # X-Achse: komprimiert 52-271 → gestreckt 40-440
+    temp_x = int(raw_y * 479 / 4095)
+    temp_x_flipped = 479 - temp_x
+    # X-Offset: 15px nach links (Tastatur war zu weit rechts)
+    x = int(1.826 * temp_x_flipped - 55)
+    # Y-Offset: 50px nach oben (Buttons waren zu tief)
+    y = int((raw_x - 286) * 194.0 / 1965.0) + 80
+    return x, y
 
 def handle_gestures():
     """
-    Nutzt die "ups" Events (Finger losgelassen),
-    plus timing-Logik für short/long/double/superlong.
+    Arbeitet die Gesten aus dem Touch-Thread ab (im Hauptthread).
     Prüft auch Terminal-Button Touch und Terminal-Tastatur.
     """
-    global state, click_pending, last_tap_time, usb_manager_active, _stopping_video
+    if touch_thread is None:
+        return
+    for gesture in touch_thread.get():
+        handle_gesture(gesture)
+
+def handle_gesture(gesture):
+    global state, usb_manager_active, consumed_up
 
-    ups = read_touch_events()
-    now = time.time()
-    
     # Wenn Video gerade gestoppt wird, ignoriere alle Touches
     if _stopping_video:
         return
 
-    # USB-Manager-Modus: Alle Touches an Manager weiterleiten
-    if usb_manager_active and usb_manager and ups:
-        action, msg = usb_manager.handle_touch(norm_x, norm_y)
-        if action == "close":
-            print("[USB] Manager geschlossen")
-            usb_manager_active = False
-        elif action == "unmount":
-            print(f"[USB] {msg}")
-            # Flag setzen: Auto-Mount deaktivieren bis USB physisch entfernt
-            global _manual_unmount
-            _manual_unmount = True
-            # Nach Unmount noch kurz anzeigen, dann schließen
-            time.sleep(1.5)
-            usb_manager_active = False
-        return
-    
-    # Terminal-Modus: Alle Touches an Tastatur weiterleiten
-    if TERMINAL_AVAILABLE and terminal_launcher and terminal_launcher.is_active():
-        if ups:
-            # Nur bei Touch-Up (Finger losgelassen)
+    kind = gesture.kind
+    terminal_active = TERMINAL_AVAILABLE and terminal_launcher and terminal_launcher.is_active()
+
+    if kind == "up":
+        norm_x, norm_y = calibrate_touch(gesture.x, gesture.y)
+
+        # USB-Manager-Modus: Alle Touches an Manager weiterleiten
+        if usb_manager_active and usb_manager:
+            consumed_up = gesture.time
+            action, msg = usb_manager.handle_touch(norm_x, norm_y)
+            if action == "close":
+                print("[USB] Manager geschlossen")
+                usb_manager_active = False
+            elif action == "unmount":
+                print(f"[USB] {msg}")
+                # Auto-Mount deaktivieren bis USB physisch entfernt
+                storage.suppress_automount()
+                # Nach Unmount noch kurz anzeigen, dann schließen
+                time.sleep(1.5)
+                usb_manager_active = False
+            return
+
+        # Terminal-Modus: Alle Touches an Tastatur weiterleiten
+        if terminal_active:
+            consumed_up = gesture.time
             exit_requested = terminal_launcher.handle_touch(norm_x, norm_y)
             if exit_requested:
                 print("[TERMINAL] EXIT-Taste gedrückt")
                 terminal_launcher.toggle_terminal()
+            return
+
+        # Terminal/USB-Buttons prüfen (nur bei kurzen Taps)
+        if TERMINAL_AVAILABLE and gesture.press_len < SHORT_LONG:
+            # Terminal-Button (links oben)
+            if terminal_button and terminal_button.is_touched(norm_x, norm_y):
+                print("[TOUCH] Terminal-Button aktiviert")
+                consumed_up = gesture.time
+                if terminal_launcher:
+                    terminal_launcher.toggle_terminal()
+                return
+            # USB-Button (rechts neben Terminal-Button)
+            term_btn_x = 10
+            term_btn_y = fb_h - 40  # 280
+            term_btn_w = 70
+            term_btn_h = 30
+            usb_btn_x = term_btn_x + term_btn_w + 10  # 90
+            usb_btn_y = term_btn_y  # 280
+            usb_btn_w = 70
+            usb_btn_h = 30
+            if (usb_btn_x <= norm_x <= usb_btn_x + usb_btn_w and
+                usb_btn_y <= norm_y <= usb_btn_y + usb_btn_h):
+                print("[TOUCH] USB-Manager aktiviert")
+                consumed_up = gesture.time
+                usb_manager_active = True
         return
 
-    # Terminal/USB-Buttons prüfen (nur bei kurzen Taps)
-    if TERMINAL_AVAILABLE and ups:
-        for press_len in ups:
-            if press_len < SHORT_LONG:
-                # Terminal-Button (links oben)
-                if terminal_button and terminal_button.is_touched(norm_x, norm_y):
-                    print("[TOUCH] Terminal-Button aktiviert")
-                    if terminal_launcher:
-                        terminal_launcher.toggle_terminal()
-                    return
-                # USB-Button (rechts neben Terminal-Button)
-                term_btn_x = 10
-                term_btn_y = fb_h - 40  # 280
-                term_btn_w = 70
-                term_btn_h = 30
-                usb_btn_x = term_btn_x + term_btn_w + 10  # 90
-                usb_btn_y = term_btn_y  # 280
-                usb_btn_w = 70
-                usb_btn_h = 30
-                if (usb_btn_x <= norm_x <= usb_btn_x + usb_btn_w and
-                    usb_btn_y <= norm_y <= usb_btn_y + usb_btn_h):
-                    print("[TOUCH] USB-Manager aktiviert")
-                    usb_manager_active = True
-                    return
-
-    # Long-hold auswerten (wenn Finger weiterhin down ist)
-    # Für super-long-shutdown brauchen wir nicht loslassen, aber in idle nur.
-    if finger_down and state == "idle":
-        held = now - down_time
-        if held >= IDLE_SHUT:
+    # Gesten aus einem Loslassen, das Tastatur/Buttons schon verbraucht haben,
+    # und alles während USB-Manager/Terminal zählen nicht
+    if gesture.time == consumed_up or usb_manager_active or terminal_active:
+        return
+
+    if kind == "hold":
+        # super-long-shutdown ohne Loslassen, nur in idle
+        if state == "idle":
             print("[TOUCH] superlong idle -> shutdown")
             safe_shutdown()
-            return
 
-    for press_len in ups:
-        # press_len = wie lange Finger unten war
-        # Verhalte dich wie beim Button:
-
-        if press_len >= IDLE_SHUT and state == "idle":
+    elif kind == "long":
+        # press_len = wie lange Finger unten war (Kernel-Zeitstempel)
+        if gesture.press_len >= IDLE_SHUT and state == "idle":
             print("[TOUCH] superlong idle -> shutdown")
             safe_shutdown()
-            continue
-
-        elif press_len >= SHORT_LONG:
-            # langer Tap
-            if state == "live":
-                print("[TOUCH] long live -> start video")
-                start_video()
-            # in recording ignorieren
-            # in idle ignorieren (außer superlong)
-            click_pending = False
-
+        elif state == "live":
+            print("[TOUCH] long live -> start video")
+            start_video()
+        # in recording ignorieren
+        # in idle ignorieren (außer superlong)
+
+    elif kind == "double":
+        if state == "idle":
+            print("[TOUCH] double -> LIVE")
+            state = "live"
+        elif state == "live":
+            print(f"[TOUCH] double live -> burst {BURST_COUNT}")
+            start_burst()
         else:
-            # kurzer Tap -> Kandidat für single/double
-            if click_pending and ((now - last_tap_time) < DBL_GAP):
-                # double tap
-                click_pending = False
-                if state == "idle":
-                    print("[TOUCH] double -> LIVE")
-                    state = "live"
-                else:
-                    print("[TOUCH] double ignored (not idle)")
-            else:
-                click_pending = True
-                last_tap_time = now
+            print("[TOUCH] double ignored (not idle)")
 
-    # single tap finalisieren falls Zeit vorbei und noch pending
-    if click_pending and ((now - last_tap_time) >= DBL_GAP):
+    elif kind == "tap":
         if state == "live":
             print("[TOUCH] single live -> photo")
             take_photo()
@@ -537,113 +482,357 @@ def handle_gestures():
             stop_video()
         else:
             print("[TOUCH] single idle (noop)")
-        click_pending = False
+
+############################
+# HUD
+############################
+
+HUD_BAND = 45  # Zeilen oben/unten, in denen HUD-Elemente liegen
+
+hud_sprites = SpriteCache()  # nur im Display-Thread benutzen (draw_hud)
+
+def _draw_rec(disp, W):
+    cv2.circle(disp, (W-40,30), 12, (0,0,255), -1)
+    cv2.putText(
+        disp, "REC", (W-90,35),
+        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 2, cv2.LINE_AA
+    )
+
+def _draw_usb_button(disp, H, usb_color):
+    cv2.rectangle(disp, (90, H-40), (160, H-10), usb_color, 2)
+    cv2.putText(disp, "USB", (100, H-20),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, usb_color, 2, cv2.LINE_AA)
+
+def draw_hud(disp, hud, usb_mounted, recording):
+    """Zeichnet Status, REC-Anzeige und Buttons (BGR, Display-Koordinaten)
+
+    Läuft im Display-Thread: Statuszeile und USB-Zustand kommen fertig aus
+    der Hauptschleife (kein Mount/disk_usage hier). Alle Elemente kommen als
+    vorgerenderte Sprites aus hud_sprites; gerendert wird nur, wenn sich der
+    Inhalt ändert.
+    """
+    W, H = fb_w, fb_h
+
+    with hud_sprites.frame():
+        hud_sprites.draw_text(disp, hud, (10,20), 0.6, (0,255,0), 2)
+
+        # Aufnahme-Anzeige
+        if recording:
+            hud_sprites.draw_cached(disp, ("rec", W), (W-92, 16, W-26, 44),
+                                    lambda d: _draw_rec(d, W))
+
+        # Terminal-Button zeichnen (nur wenn Terminal nicht aktiv)
+        if TERMINAL_AVAILABLE and terminal_button:
+            b = terminal_button
+            hud_sprites.draw_cached(
+                disp, ("term", b.x, b.y, b.width, b.height, b.label, b.is_pressed),
+                (max(0, b.x-2), max(0, b.y-2), b.x+b.width+3, b.y+b.height+3), b.draw)
+
+        # USB-Button zeichnen (rechts neben Terminal-Button)
+        if TERMINAL_AVAILABLE:
+            usb_color = (100, 255, 100) if usb_mounted else (150, 150, 150)
+            hud_sprites.draw_cached(disp, ("usb", H, usb_color), (88, H-42, 163, H-7),
+                                    lambda d: _draw_usb_button(d, H, usb_color))
 
 ############################
 # MAIN LOOP
 ############################
 
 def main():
-    global state, terminal_launcher, terminal_button
+    global state, terminal_launcher, terminal_button, touch_thread, photo_writer
 
     print("NightCam Touch start")
+
+    global fb_w, fb_h, capture
+    fb = open_fb(FB_PATH)
+    W, H = fb.width, fb.height
+    fb_w, fb_h = W, H
+
+    # Kamera erst nach open_fb: Streamgrößen hängen von der Display-Größe ab
+    setup_camera((W, H))
     picam.start()
+    storage.start()
+    capture = RequestCapture(picam, max_inflight=CAPTURE_INFLIGHT)
+    # Fotos: Hauptthread reiht nur ein, Kodieren und Schreiben im Hintergrund
+    photo_writer = PhotoWriter(next_photo, process=_enhance_photo, on_saved=_photo_saved,
+                               workers=PHOTO_WORKERS, max_pending=PHOTO_QUEUE)
     open_touch()
+    hud_comp = GrayHudCompositor(W, H, [(0, HUD_BAND), (H-HUD_BAND, H)])
 
-    global fb_w, fb_h
-    fbfd, fbmem, W, H, BPP = open_fb(FB_PATH)
-    fb_w, fb_h = W, H
+    # Display-Ausgabe läuft ab hier in eigenem Thread (fb nur noch dort benutzen)
+    display = DisplayThread(fb, max_fps=DISPLAY_MAX_FPS)
+    display.start()
     
     if TERMINAL_AVAILABLE:
         terminal_launcher = TerminalLauncher(FB_PATH, TOUCH_DEV)
         terminal_button = TerminalButton(x=10, y=H-40, width=70, height=30)
         global usb_manager
-        usb_manager = USBManager(fb_width=W, fb_height=H)
+        # Ausstehende Fotos erst beim Unmount abwarten (blockiert dort ohnehin)
+        usb_manager = USBManager(fb_width=W, fb_height=H,
+                                 before_unmount=lambda: photo_writer.flush(5.0))
         print("[TERMINAL] Terminal Access & USB Manager aktiviert")
 
-    # Letztes erfolgreiches Frame speichern
-    last_frame = None
+    # Hauptschleife wartet per epoll auf Touch, PTY und Kamera statt zu pollen
+    reactor = Reactor()
+    touched = False     # seit dem letzten Durchlauf Touch-Events verarbeitet
+    term_dirty = False  # neue Shell-Ausgabe seit dem letzten Terminal-Render
+    pty = None          # (Terminal, fd), wie im Reactor registriert
+    cam_job = None      # ausstehender Kamera-Request (start_async)
+    cam_ready = False   # cam_job ist fertig
+
+    def on_touch():
+        nonlocal touched
+        handle_gestures()
+        touched = True
+
+    def on_pty():
+        nonlocal term_dirty
+        # Liest bis zum Budget; Rest meldet epoll gleich wieder als lesbar
+        terminal_launcher.update()
+        term_dirty = True
+
+    def on_camera():
+        nonlocal cam_ready
+        cam_ready = True
+
+    def sync_pty():
+        # PTY des aktuellen Terminals beobachten (neues Terminal = neuer fd,
+        # auch wenn das Betriebssystem dieselbe Nummer wieder vergibt)
+        nonlocal pty
+        current = None
+        if TERMINAL_AVAILABLE and terminal_launcher and terminal_launcher.is_active():
+            fd = terminal_launcher.fileno()
+            if fd is not None:
+                current = (terminal_launcher.terminal, fd)
+        if current == pty:
+            return
+        if pty is not None:
+            reactor.remove_reader(pty[1])
+        if current is not None:
+            reactor.add_reader(current[1], on_pty)
+        pty = current
+
+    def log_perf():
+        cap_fps, disp_fps, dropped, render_ms = display.stats()
+        held, peak, hold_ms, waits = capture.stats()
+        print(f"[PERF] Capture {cap_fps:.1f} fps | Display {disp_fps:.1f} fps | "
+              f"verworfen {dropped} | Render {render_ms:.1f} ms | "
+              f"Requests {held}/{peak}/{CAPTURE_INFLIGHT} (aktuell/max/Limit) "
+              f"Haltezeit {hold_ms:.1f} ms, gewartet {waits}")
+        print(f"[GOV] {governor.describe()}")
+        hits, misses, sprites, hud_ms = hud_sprites.stats()
+        print(f"[HUD] {hud_ms:.2f} ms/Frame | Cache {hits} Treffer / "
+              f"{misses} gerendert ({sprites} Sprites)")
+        if TERMINAL_AVAILABLE and terminal_launcher and terminal_launcher.is_active():
+            renders, idle, rows, nbytes = terminal_launcher.stats()
+            print(f"[TERM] {renders} Durchläufe, {idle} ohne Änderung | "
+                  f"{rows} Zeilen neu gerastert | "
+                  f"{nbytes / 1024 / PERF_LOG_SEC:.1f} KB/s gelesen")
+        wakeups, calls, idle_pct = reactor.stats()
+        print(f"[LOOP] {wakeups:.1f} Wakeups/s | {calls:.1f} Callbacks/s | "
+              f"{idle_pct:.0f}% wartend")
+        if touch_thread is not None:
+            events, reads, reports = touch_thread.reader.stats()
+            gestures, publish_ms, consume_ms, consume_max = touch_thread.stats()
+            print(f"[TOUCH] {events} Events in {reads} Lesezugriffen | "
+                  f"{reports} Meldungen | {gestures} Gesten, Latenz "
+                  f"{publish_ms:.1f} ms erkannt / {consume_ms:.1f} ms "
+                  f"(max {consume_max:.0f} ms) verarbeitet")
+        snap = storage.snapshot
+        mount_events, updates = storage.stats()
+        print(f"[STORAGE] {snap.root} | {snap.free_bytes / 1024**3:.1f} GB frei | "
+              f"{mount_events} Mount-Ereignisse, {updates} Änderungen")
+        photo_bytes, video_bps, n_photos, n_videos = capacity.rates(snap.root)
+        print(f"[CAPACITY] {photo_bytes / 1024:.0f} KB/Foto ({n_photos} gemessen) | "
+              f"{video_bps / 1024**2:.2f} MB/s Video ({n_videos} gemessen)")
+        saved, dropped, errors, pending, max_pending, latency_ms = photo_writer.stats()
+        print(f"[PHOTO] {saved} gespeichert, {dropped} verworfen, {errors} Fehler | "
+              f"Warteschlange {pending}/{PHOTO_QUEUE} (max {max_pending}) | "
+              f"{latency_ms:.0f} ms bis gespeichert")
+        reactor.set_timer("perf", PERF_LOG_SEC, log_perf)
+
+    if touch_fd is not None:
+        # Touch läuft in eigenem Thread weiter, auch während imwrite/Unmount
+        touch_thread = TouchThread(
+            touch_fd, GestureRecognizer(SHORT_LONG, DBL_GAP, hold=IDLE_SHUT),
+            notify=reactor.waker(on_touch).signal)
+        touch_thread.start()
+    cam_waker = reactor.waker(on_camera)
+    reactor.set_timer("perf", PERF_LOG_SEC, log_perf)
+
+    have_frame = False
+    term_frame = None   # dauerhafter Frame für den Terminal-Modus
+    term_shown = False  # term_frame ist gerade komplett auf dem Display
+    last_term_render = 0.0
+    last_usb_draw = None    # None = USB-Manager muss neu gezeichnet werden
+    equalizer = make_equalizer(EQUALIZE_MODE)
+    small = None    # Puffer für reduzierte Verarbeitungsauflösung
+    frame_no = 0
+    hud_need = 1        # volles HUD erzwingen, bis Frame Nr. hud_need angezeigt wurde
+    # HUD-Status (Kapazität, USB) im Hauptthread, höchstens einmal pro Sekunde
+    last_hud_update = 0
+    photos_left, minutes_left = 0, 0
+    media_root = None   # Speicherort, für den reshard_flat_dirs() lief
+    usb_mounted = False
     
     try:
         while True:
-            # Touch-Logik (z.B. Start/Stop Video, Foto, Shutdown)
-            handle_gestures()
+            sync_pty()
+
+            camera_mode = False
+            timeout = None  # None = schlafen bis zum nächsten Ereignis/Timer
 
-            # USB-Manager-Modus: USB-Interface rendern
+            # USB-Manager-Modus: USB-Interface nach Touch oder zur Statusaktualisierung
             if usb_manager_active and usb_manager:
-                disp = np.zeros((H, W, 3), dtype=np.uint8)
-                usb_manager.draw_interface(disp)
-                fb_draw(disp, fbmem, W, H)
-                time.sleep(0.05)
-                continue
+                now = time.monotonic()
+                if touched or last_usb_draw is None or now - last_usb_draw >= USB_REFRESH_SEC:
+                    # Eigener Frame pro Refresh: der Display-Thread kann den
+                    # vorigen noch packen (submit_bgr ohne Bänder = nicht mehr ändern)
+                    usb_frame = np.zeros((H, W, 3), dtype=np.uint8)
+                    usb_manager.draw_interface(usb_frame)
+                    display.submit_bgr(usb_frame)
+                    last_usb_draw = now
+                timeout = max(0.0, last_usb_draw + USB_REFRESH_SEC - now)
+                term_shown = False
+                hud_need = display.gray_submitted + 1   # HUD danach neu, bis angezeigt
             
             # Terminal-Modus: Terminal und Tastatur rendern
-            if TERMINAL_AVAILABLE and terminal_launcher and terminal_launcher.is_active():
-                # Terminal-Update (liest Shell-Output)
-                terminal_launcher.update()
-                
-                # Schwarzer Hintergrund für Terminal
-                disp = np.zeros((H, W, 3), dtype=np.uint8)
-                
-                # Terminal und Tastatur rendern
-                terminal_launcher.render(disp)
+            elif TERMINAL_AVAILABLE and terminal_launcher and terminal_launcher.is_active():
+                last_usb_draw = None
+                hud_need = display.gray_submitted + 1
+                if touched:
+                    term_dirty = True   # Tastatur-Zustand/Blättern
+                # Hervorhebung der angetippten Taste endet ohne weitere Eingabe
+                flash = terminal_launcher.redraw_delay()
+                if flash is not None:
+                    if flash > 0:
+                        timeout = flash
+                    else:
+                        term_dirty = True
                 
-                # zum Display pushen
-                fb_draw(disp, fbmem, W, H)
-                time.sleep(0.01)
-                continue
+                # Höchstens ein Render pro Display-Frame, egal wie viele
+                # Stücke gelesen wurden (pyte sammelt die Änderungen)
+                if term_dirty or not term_shown:
+                    now = time.monotonic()
+                    wait = last_term_render + 1.0 / DISPLAY_MAX_FPS - now
+                    if term_shown and wait > 0:
+                        timeout = wait if timeout is None else min(timeout, wait)
+                    else:
+                        last_term_render = now
+                        term_dirty = False
+                        # Dauerhafter Frame: nur geänderte Zeilen neu zeichnen und senden
+                        if term_frame is None:
+                            term_frame = np.zeros((H, W, 3), dtype=np.uint8)
+                        if not term_shown:
+                            # Beim Wechsel in den Terminal-Modus einmal alles
+                            term_frame[:] = 0
+                            terminal_launcher.invalidate()
+                        bands = terminal_launcher.render(term_frame)
+                        
+                        # zum Display pushen (im Leerlauf gar nicht)
+                        if not term_shown:
+                            display.submit_bgr(term_frame)
+                            term_shown = True
+                        elif bands:
+                            display.submit_bgr(term_frame, bands)
+
+            # Während Video-Stop kein neuer Capture: Display zeigt das letzte Bild weiter
+            elif _stopping_video and have_frame:
+                last_usb_draw = None
+                term_shown = False
+                timeout = 0.05  # Ende des Stops abwarten
 
-            # Während Video-Stop: verwende letztes Frame (capture_array blockiert)
-            if _stopping_video and last_frame is not None:
-                frame = last_frame
             else:
-                # Kameraframe holen
-                try:
-                    frame = picam.capture_array()
-                    last_frame = frame  # Speichern für Freeze-Schutz
-                except Exception as e:
-                    if last_frame is not None:
-                        frame = last_frame  # Fallback auf letztes Frame
+                last_usb_draw = None
+                term_shown = False
+                camera_mode = True
+                # Immer genau ein Request ausstehend; die unterste Governor-Stufe
+                # verzögert den nächsten (kein festes sleep)
+                if cam_job is None:
+                    wait = governor.frame_delay()
+                    if wait > 0:
+                        timeout = wait
                     else:
-                        raise
-
-            # Nacht-Boost
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            enh  = cv2.equalizeHist(gray)
-            disp = cv2.cvtColor(enh, cv2.COLOR_GRAY2BGR)
-
-            # HUD
-            photos_left, minutes_left = estimate_capacity()
-            usb_txt = "USB" if usb_mountpoint() else "INT"
-            hud = f"{state.upper()} {usb_txt} F:{photos_left} V~{minutes_left}min"
-            cv2.putText(
-                disp, hud, (10,20),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2, cv2.LINE_AA
-            )
-
-            # Aufnahme-Anzeige
-            if state == "recording":
-                cv2.circle(disp, (W-40,30), 12, (0,0,255), -1)
-                cv2.putText(
-                    disp, "REC", (W-90,35),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 2, cv2.LINE_AA
-                )
-            
-            # Terminal-Button zeichnen (nur wenn Terminal nicht aktiv)
-            if TERMINAL_AVAILABLE and terminal_button:
-                terminal_button.draw(disp)
-            
-            # USB-Button zeichnen (rechts neben Terminal-Button)
-            if TERMINAL_AVAILABLE:
-                usb_color = (100, 255, 100) if usb_mountpoint() else (150, 150, 150)
-                cv2.rectangle(disp, (90, H-40), (160, H-10), usb_color, 2)
-                cv2.putText(disp, "USB", (100, H-20), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, usb_color, 2, cv2.LINE_AA)
+                        governor.pace()
+                        try:
+                            cam_job = capture.start_async(cam_waker.signal)
+                        except Exception as e:
+                            if not have_frame:
+                                raise
+                            print(f"[CAM] Capture-Fehler: {e}")
+                        if cam_job is None:
+                            timeout = 0.01  # kein freier Request, gleich nochmal
+                # Serienbild: fällige Aufnahme, sonst bis zur nächsten schlafen
+                wait = burst_step()
+                if wait is not None:
+                    timeout = wait if timeout is None else min(timeout, wait)
+
+            touched = False
+            reactor.run_once(timeout)
+
+            if not cam_ready:
+                continue
+            cam_ready = False
+            job, cam_job = cam_job, None
+            if not camera_mode:
+                # Modus gewechselt: fertigen Request nur zurückgeben
+                with capture.finish_async(job):
+                    pass
+                continue
 
-            # zum Display pushen
-            fb_draw(disp, fbmem, W, H)
+            # Nacht-Boost direkt aus dem Kamerapuffer in einen Puffer des Display-Threads;
+            # der Request geht zurück an die Kamera, sobald enh geschrieben ist.
+            # Umfang richtet sich nach der Qualitätsstufe des Governors.
+            q = governor.quality
+            try:
+                with capture.finish_async(job, cam.preview_stream) as frame:
+                    with governor.stage("luma"):
+                        gray = luma(frame, cam.mode, cam.preview_size)
+                        pw, ph = governor.processing_size(cam.preview_size)
+                        if (pw, ph) != cam.preview_size:
+                            if small is None or small.shape != (ph, pw):
+                                small = np.empty((ph, pw), dtype=np.uint8)
+                            gray = cv2.resize(gray, (pw, ph), dst=small,
+                                              interpolation=cv2.INTER_AREA)
+                    with governor.stage("hist"):
+                        enh = display.acquire_gray(gray.shape)
+                        equalizer.apply(gray, dst=enh, every=q.hist_every)
+                have_frame = True
+            except Exception as e:
+                if not have_frame:
+                    raise
+                print(f"[CAM] Capture-Fehler: {e}")
+                continue
 
-            time.sleep(0.01)
+            # zum Display-Thread (Graustufen-LUT, HUD in Display-Koordinaten);
+            # HUD nur jeden hud_every-ten Frame neu zeichnen
+            now = time.time()
+            if now - last_hud_update > 1.0:
+                photos_left, minutes_left = estimate_capacity()
+                if storage.snapshot.root != media_root:
+                    # Neuer Speicherort: Altbestand im Hintergrund umsortieren
+                    media_root = storage.snapshot.root
+                    reshard_flat_dirs()
+                usb_mounted = bool(usb_mountpoint())
+                last_hud_update = now
+            usb_txt = "USB" if usb_mounted else "INT"
+            hud = f"{state.upper()} {usb_txt} F:{photos_left} V~{minutes_left}min Q{governor.level}"
+            if photo_writer.pending():
+                # Rückstau der Foto-Warteschlange
+                hud += f" W{photo_writer.pending()}/{PHOTO_QUEUE}"
+            # Nach Moduswechsel volles HUD, bis der Display-Thread eines angezeigt
+            # hat (ein verworfener Frame darf keine Terminal-Reste hinterlassen)
+            keep_hud = (display.hud_presented >= hud_need
+                        and frame_no % q.hud_every != 0)
+            frame_no += 1
+            display.submit_gray(
+                enh, hud_comp,
+                lambda disp, hud=hud, usb=usb_mounted, rec=(state == "recording"):
+                    draw_hud(disp, hud, usb, rec),
+                keep_hud=keep_hud)
+
+            # Display-Render läuft parallel und zählt mit ins Budget
+            governor.end_frame(display.render_time)
 
     except KeyboardInterrupt:
         print("\n[EXIT] KeyboardInterrupt")
@@ -655,8 +844,17 @@ def main():
         if terminal_launcher:
             terminal_launcher.cleanup()
         picam.stop()
-        fbmem.close()
-        os.close(fbfd)
+        display.stop()
+        if photo_writer is not None:
+            photo_writer.stop()
+        storage.stop()
+        capacity.save()
+        for job in _resharders.values():
+            job.stop()
+        reactor.close()
+        fb.close()
+        if touch_thread is not None:
+            touch_thread.stop()
         if touch_fd is not None:
             os.close(touch_fd)
         print("NightCam Touch exit")
@@ -11,12 +11,26 @@
 # - Reduced CPU usage with adaptive sleep
 #
 
-import os, time, glob, shutil, fcntl, mmap, struct, subprocess, sys, select, signal, threading
+import os, time, subprocess, sys, signal, threading
 import cv2, numpy as np
 from picamera2 import Picamera2
 from picamera2.encoders import H264Encoder
 from picamera2.outputs import FileOutput
 
+from nightcam.framebuffer import open_fb, GrayHudCompositor
+from nightcam.display_thread import DisplayThread
+from nightcam.camera import configure_camera, luma, RequestCapture
+from nightcam.enhance import make_equalizer
+from nightcam.governor import FrameGovernor
+from nightcam.hud import SpriteCache
+from nightcam.reactor import Reactor
+from nightcam.sequence import SequenceAllocator
+from nightcam.layout import MediaLayout, Resharder
+from nightcam.storage import StorageMonitor
+from nightcam.capacity import CapacityModel
+from nightcam.photo_writer import PhotoWriter
+from nightcam.touch import TouchThread, GestureRecognizer
+
 ############################
 # KONFIG
 ############################
@@ -27,120 +41,76 @@ SHORT_LONG     = 0.8
 REBOOT_HOLD    = 2.5
 SHUTDOWN_HOLD  = 5.0
 DBL_GAP        = 0.35
-EST_PHOTO_BYTES= 500_000
+EST_PHOTO_BYTES= 500_000  # Startwerte, danach gemessen (nightcam/capacity.py)
 EST_VIDEO_MBPS = 0.5
-
-FBIOGET_VSCREENINFO = 0x4600
+FREE_MEASURE_SEC = 30.0   # statvfs so selten; dazwischen zählen die geschriebenen Bytes
+DISPLAY_MAX_FPS= 30
+PERF_LOG_SEC   = 5.0
+CAM_SIZE       = (640, 480)  # Hauptstream in den Modi "yuv"/"bgr"
+CAPTURE_MODE   = "lores" # "lores" = ISP skaliert auf Display, "yuv" = Y-Ebene, "bgr" = alter Pfad
+CAPTURE_INFLIGHT = 2     # max. gleichzeitig gehaltene Kamera-Requests (Vorschau + Foto)
+TARGET_FPS     = 30      # Frame-Budget für den Governor (Qualität passt sich an)
+EQUALIZE_MODE  = "smooth" # "smooth" = geglättete LUT (kein Flackern), "exact" = equalizeHist pro Frame
+MEDIA_LAYOUT   = "date"        # "date" = Unterverzeichnis pro Tag (YYYY-MM-DD), "flat" = alles in einem
+MEDIA_PER_DIR  = 1000          # max. Dateien pro Tagesverzeichnis (danach YYYY-MM-DD_2 ...)
+PHOTO_WORKERS  = 2       # Threads für JPEG-Kodierung und Schreiben
+PHOTO_QUEUE    = 6       # max. Fotos in der Warteschlange (danach verworfen)
+BURST_COUNT    = 5       # Doppel-Tap in LIVE: Fotos pro Serienbild
+BURST_FPS      = 4.0     # Serienbilder pro Sekunde
 
 ############################
 # SPEICHER / USB
 ############################
 
-_usb_cache = None
-_usb_cache_time = 0
-_usb_last_check = 0  # Für häufigere Hot-Unplug-Checks
-_manual_unmount = False  # Verhindert Auto-Mount nach manuellem Unmount
+# USB-Stick, Auto-Mount und freier Platz laufen im Hintergrund
+# (nightcam/storage.py); die Oberfläche liest nur storage.snapshot
+# notify läuft im Monitor-Thread: Kapazitäts-Statistik eines neuen
+# Speicherorts dort laden, nicht im Hauptthread
+storage = StorageMonitor(fallback=os.path.expanduser("~"), free_interval=FREE_MEASURE_SEC,
+                         notify=lambda: capacity.load(storage.snapshot.root))
+# Gemessene Größen pro Speicherort (nightcam/capacity.py)
+capacity = CapacityModel(photo_bytes=EST_PHOTO_BYTES, video_bps=EST_VIDEO_MBPS * 1024 * 1024)
 
 def usb_mountpoint():
-    global _usb_cache, _usb_cache_time, _usb_last_check, _manual_unmount
-    now = time.time()
-    
-    # Wenn USB physisch entfernt wurde, manual_unmount Flag zurücksetzen
-    usb_dev = "/dev/sda1"
-    if not os.path.exists(usb_dev):
-        if _manual_unmount:
-            print(f"[USB] Device entfernt, Auto-Mount wieder aktiviert")
-            _manual_unmount = False
-    
-    # Häufige Checks (alle 2s) ob noch gemountet, auch wenn Cache gültig
-    if _usb_cache is not None and (now - _usb_last_check) > 2.0:
-        if not os.path.ismount(_usb_cache):
-            print(f"[USB] Hot-Unplug erkannt: {_usb_cache} nicht mehr gemountet")
-            _usb_cache = None
-            _usb_cache_time = 0
-        _usb_last_check = now
-    
-    # Cache nur verwenden wenn Mountpoint noch existiert UND gemountet ist
-    if _usb_cache is not None and (now - _usb_cache_time) < 5.0:
-        if os.path.ismount(_usb_cache):
-            return _usb_cache
-        else:
-            print(f"[USB] Cache ungültig: {_usb_cache} nicht mehr gemountet")
-            _usb_cache = None
-    
-    # Auto-Mount: Prüfe ob USB-Device existiert aber nicht gemountet
-    # ABER: Überspringe wenn manuell unmountet wurde
-    mount_target = "/media/usb"
-    
-    if os.path.exists(usb_dev) and not os.path.ismount(mount_target) and not _manual_unmount:
-        print(f"[USB] {usb_dev} gefunden aber nicht gemountet")
-        os.makedirs(mount_target, exist_ok=True)
-        try:
-            # Mount mit User-Rechten (uid/gid vom aktuellen User)
-            uid = os.getuid()
-            gid = os.getgid()
-            subprocess.run(["sudo", "mount", "-o", f"uid={uid},gid={gid},umask=000", 
-                          usb_dev, mount_target], check=True, timeout=5)
-            print(f"[USB] Auto-Mount erfolgreich: {mount_target}")
-            time.sleep(0.5)  # Kurz warten bis Mount sichtbar
-        except Exception as e:
-            print(f"[USB] Auto-Mount fehlgeschlagen: {e}")
-    
-    # Mehrere mögliche Base-Pfade für verschiedene Raspbian-Versionen
-    base_paths = [
-        "/media/valentin",  # User valentin
-        "/media/pi",        # Ältere Raspbian-Versionen
-        "/media"            # Fallback für allgemeine Struktur
-    ]
-    
-    _usb_cache = None
-    
-    for base in base_paths:
-        if not os.path.isdir(base):
-            continue
-        
-        for e in os.scandir(base):
-            if e.is_dir() and e.name.startswith("usb"):
-                # Prüfe ob tatsächlich als Mountpoint gemountet
-                if os.path.ismount(e.path):
-                    _usb_cache = e.path
-                    _usb_cache_time = now
-                    return _usb_cache
-    _usb_cache_time = now
-    return _usb_cache
+    return storage.snapshot.usb
 
 def ensure_dirs():
-    usb = usb_mountpoint()
-    if usb:
-        pdir = os.path.join(usb, "Nachtsicht_Fotos")
-        vdir = os.path.join(usb, "Nachtsicht_Videos")
-    else:
-        # Verwende HOME-Verzeichnis des aktuellen Users
-        home = os.path.expanduser("~")
-        pdir = os.path.join(home, "Nachtsicht_Fotos")
-        vdir = os.path.join(home, "Nachtsicht_Videos")
+    root = storage.snapshot.root    # USB-Stick, sonst HOME-Verzeichnis
+    pdir = os.path.join(root, "Nachtsicht_Fotos")
+    vdir = os.path.join(root, "Nachtsicht_Videos")
     os.makedirs(pdir, exist_ok=True)
     os.makedirs(vdir, exist_ok=True)
     return pdir, vdir
 
+# Nächste Nummer aus Speicher/Sidecar statt glob über das ganze Verzeichnis
+photo_seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+video_seq = SequenceAllocator("Nachtsicht_Video", ".h264")
+# Neue Dateien in Tagesverzeichnissen (nightcam/layout.py)
+media_layout = MediaLayout(sharded=(MEDIA_LAYOUT == "date"), max_per_leaf=MEDIA_PER_DIR)
+_resharders = {}    # Verzeichnis -> Resharder (alte flache Ablage verschieben)
+
 def next_photo():
     pdir, _ = ensure_dirs()
-    ex = glob.glob(os.path.join(pdir, "Nachtsicht_Foto*.jpg"))
-    n = max((int(os.path.basename(p).replace("Nachtsicht_Foto","").replace(".jpg","")) 
-             for p in ex if os.path.basename(p).replace("Nachtsicht_Foto","").replace(".jpg","").isdigit()), 
-            default=0)
-    return os.path.join(pdir, f"Nachtsicht_Foto{n+1}.jpg")
+    return photo_seq.next_path(pdir, media_layout.leaf(pdir))
 
 def next_video():
     _, vdir = ensure_dirs()
-    ex = glob.glob(os.path.join(vdir, "Nachtsicht_Video*.h264"))
-    n = max((int(os.path.basename(p).replace("Nachtsicht_Video","").replace(".h264","")) 
-             for p in ex if os.path.basename(p).replace("Nachtsicht_Video","").replace(".h264","").isdigit()), 
-            default=0)
-    return os.path.join(vdir, f"Nachtsicht_Video{n+1}.h264")
+    return video_seq.next_path(vdir, media_layout.leaf(vdir))
+
+def reshard_flat_dirs():
+    """Verschiebt flach liegende Altdateien im Hintergrund in Tagesverzeichnisse"""
+    if not media_layout.sharded:
+        return
+    for base in ensure_dirs():
+        job = _resharders.get(base)
+        if job is None or not job.is_alive():
+            job = Resharder(base, media_layout)
+            job.start()
+            _resharders[base] = job
 
 def next_video_ts():
     _, vdir = ensure_dirs()
+    vdir = media_layout.leaf(vdir)
     ts = time.strftime("%Y-%m-%d_%H%M%S")
     us = int((time.time() % 1) * 1_000_000)
     filename = f"Nachtsicht_Video_{ts}_{us:06d}.h264"
@@ -156,81 +126,43 @@ def next_video_ts():
         filename = f"Nachtsicht_Video_{ts}_{us:06d}.h264"
         return os.path.join(vdir, filename)
 
-_free_bytes_cache = 0
-_free_bytes_time = 0
-
 def free_bytes_path():
-    global _free_bytes_cache, _free_bytes_time
-    now = time.time()
-    if (now - _free_bytes_time) < 2.0:
-        return _free_bytes_cache
-    
-    path = usb_mountpoint() or "/home/pi"
-    _free_bytes_cache = shutil.disk_usage(path).free
-    _free_bytes_time = now
-    return _free_bytes_cache
+    return storage.snapshot.free_bytes
 
 def estimate_capacity():
-    fb = free_bytes_path()
-    photos = fb // EST_PHOTO_BYTES
-    mins   = (fb // (1024 * 1024) // EST_VIDEO_MBPS) // 60
-    return int(photos), int(mins)
+    # Letzte Messung minus seitdem geschriebene Bytes, kein Systemaufruf
+    return capacity.estimate(storage.snapshot)
 
 ############################
 # FRAMEBUFFER HANDLING
 ############################
 
-def open_fb(path):
-    fd = os.open(path, os.O_RDWR)
-
-    try:
-        raw = fcntl.ioctl(fd, FBIOGET_VSCREENINFO, b"\x00"*160)
-        xres, yres, xrv, yrv, xoff, yoff, bpp, gray = struct.unpack_from("8I", raw, 0)
-        if xres == 0 or yres == 0:
-            raise ValueError("bad ioctl dims")
-    except Exception:
-        xres, yres, bpp = 480, 320, 16
-
-    fbsize = xres * yres * 2
-    mm = mmap.mmap(fd, fbsize, mmap.MAP_SHARED,
-                   mmap.PROT_WRITE | mmap.PROT_READ, 0)
-    print(f"[FB] {path} {xres}x{yres}@{bpp}bpp")
-    return fd, mm, xres, yres, bpp
-
-_rgb565_buffer = None
-
-def bgr_to_rgb565(bgr):
-    global _rgb565_buffer
-    b = (bgr[:,:,0] >> 3).astype(np.uint16)
-    g = (bgr[:,:,1] >> 2).astype(np.uint16)
-    r = (bgr[:,:,2] >> 3).astype(np.uint16)
-    packed = (r << 11) | (g << 5) | b
-    if _rgb565_buffer is None or _rgb565_buffer.shape != packed.shape:
-        _rgb565_buffer = np.empty(packed.shape, dtype=np.uint16)
-    np.copyto(_rgb565_buffer, packed)
-    return _rgb565_buffer.tobytes()
-
-_resize_buffer = None
-
-def fb_draw(bgr, fb_mem, w, h):
-    global _resize_buffer
-    if _resize_buffer is None or _resize_buffer.shape[:2] != (h, w):
-        _resize_buffer = np.empty((h, w, 3), dtype=np.uint8)
-    cv2.resize(bgr, (w, h), dst=_resize_buffer, interpolation=cv2.INTER_LINEAR)
-    fb_mem.seek(0)
-    fb_mem.write(bgr_to_rgb565(_resize_buffer))
+# open_fb / Framebuffer: siehe nightcam/framebuffer.py
+# (liest Stride + Pixelformat, schreibt direkt ins gemappte /dev/fb1)
 
 ############################
 # KAMERA
 ############################
 
 picam = Picamera2()
-picam.configure(
-    picam.create_video_configuration(
-        main={"size": (640,480)},
-        controls={"AeEnable":True, "AwbEnable":True}
+cam = None      # CameraSetup, wird in setup_camera() gesetzt
+capture = None  # RequestCapture, nach picam.start()
+governor = FrameGovernor(target_fps=TARGET_FPS)
+
+def setup_camera(panel_size):
+    """
+    Konfiguriert die Kamera passend zum Display
+    lores: Vorschau-Stream in Display-Größe, main (größer) für Video/Foto.
+    Fallback-Kette lores -> yuv -> bgr.
+    """
+    global cam
+    cam = configure_camera(
+        picam, CAPTURE_MODE, CAM_SIZE,
+        controls={"AeEnable":True, "AwbEnable":True},
+        video=True, panel_size=panel_size
     )
-)
+    return cam
+
 encoder = H264Encoder(bitrate=4_000_000)
 video_out = None
 
@@ -240,41 +172,81 @@ video_out = None
 
 state = "idle"
 rec_name = None
+rec_root = None     # Speicherort der laufenden Aufnahme
+rec_start = 0.0     # time.monotonic() beim Start
 
-_gray_buffer = None
-_enh_buffer = None
+_gray_buffer = None   # Vorschau (BGR-Modus)
+photo_writer = None   # PhotoWriter (Pufferpool für Fotos), in main() gestartet
+burst_left = 0        # noch ausstehende Serienbilder
+burst_next = 0.0      # time.monotonic() des nächsten Serienbilds
 
-def take_photo():
-    global _gray_buffer, _enh_buffer
-    fn = next_photo()
-    frame = picam.capture_array()
-    
-    if _gray_buffer is None or _gray_buffer.shape != frame.shape[:2]:
-        _gray_buffer = np.empty(frame.shape[:2], dtype=np.uint8)
-        _enh_buffer = np.empty(frame.shape[:2], dtype=np.uint8)
-    
-    cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=_gray_buffer)
-    cv2.equalizeHist(_gray_buffer, dst=_enh_buffer)
-    cv2.imwrite(fn, _enh_buffer)
+def _enhance_photo(buf):
+    cv2.equalizeHist(buf, dst=buf)
+
+def _photo_saved(fn, nbytes):
+    # Im Worker-Thread: Größe direkt aus imencode, kein stat
+    capacity.record_photo(storage.snapshot.root, nbytes)
     ph, mn = estimate_capacity()
     print(f"[FOTO] {fn} | Rest ~{ph} Fotos / ~{mn} min Video")
 
+def take_photo():
+    """Graubild in einen Pool-Puffer kopieren und einreihen (wartet nie auf den Stick)"""
+    w, h = cam.main_size
+    buf = photo_writer.acquire((h, w))
+    if buf is None:
+        print(f"[FOTO] Warteschlange voll ({photo_writer.pending()}), verworfen")
+        return
+    try:
+        # Request nur für die Kopie halten
+        with capture.frame("main") as frame:
+            gray = luma(frame, cam.main_mode, cam.main_size, dst=buf)
+            if gray is not buf:
+                np.copyto(buf, gray)
+    except Exception:
+        photo_writer.release(buf)
+        raise
+    photo_writer.submit(buf)
+
+def start_burst():
+    global burst_left, burst_next
+    burst_left = BURST_COUNT
+    burst_next = time.monotonic()
+
+def burst_step():
+    """Nächstes Serienbild, falls fällig; liefert die Wartezeit bis zum folgenden"""
+    global burst_left, burst_next
+    if state != "live":
+        burst_left = 0
+    if not burst_left:
+        return None
+    now = time.monotonic()
+    if now < burst_next:
+        return burst_next - now
+    take_photo()
+    burst_left -= 1
+    burst_next = max(burst_next + 1.0 / BURST_FPS, now)
+    return (burst_next - now) if burst_left else None
+
 def start_video():
-    global state, rec_name, video_out
+    global state, rec_name, rec_root, rec_start, video_out
     if _stopping_video or state == "recording":
         return
     rec_name = next_video_ts()
     print(f"[VIDEO] START -> {rec_name}")
     video_out = FileOutput(rec_name)
     picam.start_recording(encoder, video_out)
+    rec_root = storage.snapshot.root
+    rec_start = time.monotonic()
+    capacity.video_started(rec_root)
     state = "recording"
 
-def _stop_video_thread(rec_file):
+def _stop_video_thread(rec_file, root, seconds):
     global video_out, _stopping_video, _stop_thread
     try:
         picam.stop_recording()
         video_out = None
         print(f"[VIDEO] SAVED -> {rec_file}")
+        capacity.record_video(root, os.path.getsize(rec_file), seconds)
     except Exception as e:
         print(f"[VIDEO] ERROR: {e}")
         video_out = None
@@ -291,7 +263,9 @@ def stop_video():
         print("[VIDEO] STOP")
         _stopping_video = True
         state = "live"
-        _stop_thread = threading.Thread(target=_stop_video_thread, args=(rec_name,), daemon=False)
+        _stop_thread = threading.Thread(
+            target=_stop_video_thread,
+            args=(rec_name, rec_root, time.monotonic() - rec_start), daemon=False)
         _stop_thread.start()
 
 def safe_reboot():
@@ -300,6 +274,8 @@ def safe_reboot():
         stop_video()
     if _stop_thread is not None:
         _stop_thread.join(timeout=2.0)
+    if photo_writer is not None and not photo_writer.flush(5.0):
+        print("[SHUTDOWN] Fotos noch nicht gespeichert")
     os.sync()
     print("[REBOOT] rebooting ...")
     subprocess.call(["sudo","reboot"])
@@ -310,6 +286,8 @@ def safe_shutdown():
         stop_video()
     if _stop_thread is not None:
         _stop_thread.join(timeout=2.0)
+    if photo_writer is not None and not photo_writer.flush(5.0):
+        print("[SHUTDOWN] Fotos noch nicht gespeichert")
     os.sync()
 
     base = "/media"
@@ -328,17 +306,7 @@ def safe_shutdown():
 ############################
 
 touch_fd = None
-ABS_X = 0x00
-ABS_Y = 0x01
-BTN_TOUCH = 0x14a
-
-cur_x = 0
-cur_y = 0
-finger_down = False
-down_time = 0.0
-
-click_pending = False
-last_tap_time = 0.0
+touch_thread = None  # TouchThread auf touch_fd (Gesten, siehe nightcam/touch.py)
 
 def open_touch():
     global touch_fd
@@ -349,160 +317,239 @@ def open_touch():
         print(f"[TOUCH] FAIL open {TOUCH_DEV}: {e}")
         touch_fd = None
 
-EVENT_SIZE = 24
-EVENT_STRUCT = "llHHI"
-
-def read_touch_events():
-    global cur_x, cur_y, finger_down, down_time
-    ups = []
-
-    if touch_fd is None:
-        return ups
-
-    while True:
-        r, _, _ = select.select([touch_fd], [], [], 0)
-        if not r:
-            break
-        try:
-            data = os.read(touch_fd, EVENT_SIZE)
-            if len(data) < EVENT_SIZE:
-                break
-        except OSError:
-            break
-
-        sec, usec, etype, code, value = struct.unpack(EVENT_STRUCT, data)
-
-        if etype == 0x03:
-            if code == ABS_X:
-                cur_x = value
-            elif code == ABS_Y:
-                cur_y = value
-        elif etype == 0x01 and code == BTN_TOUCH:
-            if value == 1 and not finger_down:
-                finger_down = True
-                down_time = time.time()
-            elif value == 0 and finger_down:
-                press_len = time.time() - down_time
-                finger_down = False
-                ups.append(press_len)
-
-    return ups
-
 def handle_gestures():
-    global state, click_pending, last_tap_time
+    global state
 
-    ups = read_touch_events()
-    now = time.time()
+    if touch_thread is None:
+        return
 
-    if finger_down:
-        held = now - down_time
-        if held >= SHUTDOWN_HOLD:
+    for gesture in touch_thread.get():
+        # press_len aus Kernel-Zeitstempeln, unabhängig von Verzögerungen
+        if gesture.kind == "hold":
             print("[TOUCH] 5s hold -> shutdown")
             safe_shutdown()
-            return
-        elif held >= REBOOT_HOLD:
-            pass
-
-    for press_len in ups:
-        if press_len >= SHUTDOWN_HOLD:
-            print("[TOUCH] 5s press -> shutdown")
-            safe_shutdown()
-            continue
-        elif press_len >= REBOOT_HOLD:
-            print("[TOUCH] 2.5s press -> reboot")
-            safe_reboot()
-            continue
-        elif press_len >= SHORT_LONG:
-            if state == "live":
+        elif gesture.kind == "long":
+            if gesture.press_len >= SHUTDOWN_HOLD:
+                print("[TOUCH] 5s press -> shutdown")
+                safe_shutdown()
+            elif gesture.press_len >= REBOOT_HOLD:
+                print("[TOUCH] 2.5s press -> reboot")
+                safe_reboot()
+            elif state == "live":
                 print("[TOUCH] long live -> start video")
                 start_video()
-            click_pending = False
-        else:
-            if click_pending and ((now - last_tap_time) < DBL_GAP):
-                click_pending = False
-                if state == "idle":
-                    print("[TOUCH] double -> LIVE")
-                    state = "live"
-                else:
-                    print("[TOUCH] double ignored (not idle)")
+        elif gesture.kind == "double":
+            if state == "idle":
+                print("[TOUCH] double -> LIVE")
+                state = "live"
+            elif state == "live":
+                print(f"[TOUCH] double live -> burst {BURST_COUNT}")
+                start_burst()
             else:
-                click_pending = True
-                last_tap_time = now
-
-    if click_pending and ((now - last_tap_time) >= DBL_GAP):
-        if state == "live":
-            print("[TOUCH] single live -> photo")
-            take_photo()
-        elif state == "recording":
-            print("[TOUCH] single rec -> stop video")
-            stop_video()
-        else:
-            print("[TOUCH] single idle (noop)")
-        click_pending = False
+                print("[TOUCH] double ignored (not idle)")
+        elif gesture.kind == "tap":
+            if state == "live":
+                print("[TOUCH] single live -> photo")
+                take_photo()
+            elif state == "recording":
+                print("[TOUCH] single rec -> stop video")
+                stop_video()
+            else:
+                print("[TOUCH] single idle (noop)")
+
+############################
+# HUD
+############################
+
+hud_sprites = SpriteCache()  # nur im Display-Thread benutzen (draw_hud)
+
+def _draw_rec(disp, W):
+    cv2.circle(disp, (W-40,30), 12, (0,0,255), -1)
+    cv2.putText(
+        disp, "REC", (W-90,35),
+        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 2, cv2.LINE_AA
+    )
+
+def draw_hud(disp, hud, recording):
+    """Läuft im Display-Thread: Statuszeile und REC-Zustand kommen mit dem Frame"""
+    W = disp.shape[1]
+    with hud_sprites.frame():
+        hud_sprites.draw_text(disp, hud, (10,20), 0.6, (0,255,0), 2)
+
+        if recording:
+            hud_sprites.draw_cached(disp, ("rec", W), (W-92, 16, W-26, 44),
+                                    lambda d: _draw_rec(d, W))
 
 ############################
 # MAIN LOOP
 ############################
 
 def main():
-    global state, _gray_buffer, _enh_buffer
+    global state, _gray_buffer, capture, touch_thread, photo_writer
 
     print("NightCam Touch start (OPTIMIZED)")
+
+    fb = open_fb(FB_PATH)
+    W, H = fb.width, fb.height
+
+    # Kamera erst nach open_fb: Streamgrößen hängen von der Display-Größe ab
+    setup_camera((W, H))
     picam.start()
+    storage.start()
+    # Fotos: Hauptthread reiht nur ein, Kodieren und Schreiben im Hintergrund
+    photo_writer = PhotoWriter(next_photo, process=_enhance_photo, on_saved=_photo_saved,
+                               workers=PHOTO_WORKERS, max_pending=PHOTO_QUEUE)
+    capture = RequestCapture(picam, max_inflight=CAPTURE_INFLIGHT)
     open_touch()
-
-    fbfd, fbmem, W, H, BPP = open_fb(FB_PATH)
     
-    _gray_buffer = np.empty((480, 640), dtype=np.uint8)
-    _enh_buffer = np.empty((480, 640), dtype=np.uint8)
-    disp = np.empty((480, 640, 3), dtype=np.uint8)
+    pw, ph = cam.preview_size
+    _gray_buffer = np.empty((ph, pw), dtype=np.uint8)
+    # HUD liegt nur im oberen Band (Status + REC)
+    hud_comp = GrayHudCompositor(W, H, [(0, 45)])
+
+    # Display-Ausgabe in eigenem Thread (fb nur noch dort benutzen)
+    display = DisplayThread(fb, max_fps=DISPLAY_MAX_FPS)
+    display.start()
+
+    # Hauptschleife wartet per epoll auf Touch und Kamera statt zu pollen
+    reactor = Reactor()
+    cam_job = None      # ausstehender Kamera-Request (start_async)
+    cam_ready = False   # cam_job ist fertig
+
+    def on_camera():
+        nonlocal cam_ready
+        cam_ready = True
+
+    def log_perf():
+        cap_fps, disp_fps, dropped, render_ms = display.stats()
+        held, peak, hold_ms, waits = capture.stats()
+        print(f"[PERF] Capture {cap_fps:.1f} fps | Display {disp_fps:.1f} fps | "
+              f"verworfen {dropped} | Render {render_ms:.1f} ms | "
+              f"Requests {held}/{peak}/{CAPTURE_INFLIGHT} (aktuell/max/Limit) "
+              f"Haltezeit {hold_ms:.1f} ms, gewartet {waits}")
+        print(f"[GOV] {governor.describe()}")
+        hits, misses, sprites, hud_ms = hud_sprites.stats()
+        print(f"[HUD] {hud_ms:.2f} ms/Frame | Cache {hits} Treffer / "
+              f"{misses} gerendert ({sprites} Sprites)")
+        wakeups, calls, idle_pct = reactor.stats()
+        print(f"[LOOP] {wakeups:.1f} Wakeups/s | {calls:.1f} Callbacks/s | "
+              f"{idle_pct:.0f}% wartend")
+        if touch_thread is not None:
+            events, reads, reports = touch_thread.reader.stats()
+            gestures, publish_ms, consume_ms, consume_max = touch_thread.stats()
+            print(f"[TOUCH] {events} Events in {reads} Lesezugriffen | "
+                  f"{reports} Meldungen | {gestures} Gesten, Latenz "
+                  f"{publish_ms:.1f} ms erkannt / {consume_ms:.1f} ms "
+                  f"(max {consume_max:.0f} ms) verarbeitet")
+        snap = storage.snapshot
+        mount_events, updates = storage.stats()
+        print(f"[STORAGE] {snap.root} | {snap.free_bytes / 1024**3:.1f} GB frei | "
+              f"{mount_events} Mount-Ereignisse, {updates} Änderungen")
+        photo_bytes, video_bps, n_photos, n_videos = capacity.rates(snap.root)
+        print(f"[CAPACITY] {photo_bytes / 1024:.0f} KB/Foto ({n_photos} gemessen) | "
+              f"{video_bps / 1024**2:.2f} MB/s Video ({n_videos} gemessen)")
+        saved, dropped, errors, pending, max_pending, latency_ms = photo_writer.stats()
+        print(f"[PHOTO] {saved} gespeichert, {dropped} verworfen, {errors} Fehler | "
+              f"Warteschlange {pending}/{PHOTO_QUEUE} (max {max_pending}) | "
+              f"{latency_ms:.0f} ms bis gespeichert")
+        reactor.set_timer("perf", PERF_LOG_SEC, log_perf)
+
+    if touch_fd is not None:
+        # Touch läuft in eigenem Thread weiter, auch während imwrite
+        touch_thread = TouchThread(
+            touch_fd, GestureRecognizer(SHORT_LONG, DBL_GAP, hold=SHUTDOWN_HOLD),
+            notify=reactor.waker(handle_gestures).signal)
+        touch_thread.start()
+    cam_waker = reactor.waker(on_camera)
+    reactor.set_timer("perf", PERF_LOG_SEC, log_perf)
 
     try:
         last_hud_update = 0
         photos_left, minutes_left = 0, 0
+        media_root = None   # Speicherort, für den reshard_flat_dirs() lief
         usb_txt = "INT"
         
         loop_count = 0
-        last_frame = None
+        hud_need = 1        # volles HUD erzwingen, bis Frame Nr. hud_need angezeigt wurde
+        equalizer = make_equalizer(EQUALIZE_MODE)
+        small = None    # Puffer für reduzierte Verarbeitungsauflösung
         
         while True:
-            handle_gestures()
+            # Immer genau ein Request ausstehend; die unterste Governor-Stufe
+            # verzögert den nächsten (kein festes sleep)
+            timeout = None
+            if cam_job is None:
+                wait = governor.frame_delay()
+                if wait > 0:
+                    timeout = wait
+                else:
+                    governor.pace()
+                    try:
+                        cam_job = capture.start_async(cam_waker.signal)
+                    except Exception as e:
+                        print(f"[MAIN] capture_request error: {e}")
+                        timeout = 0.1
+                    if cam_job is None and timeout is None:
+                        timeout = 0.01  # kein freier Request, gleich nochmal
+            # Serienbild: fällige Aufnahme, sonst bis zur nächsten schlafen
+            wait = burst_step()
+            if wait is not None:
+                timeout = wait if timeout is None else min(timeout, wait)
+
+            reactor.run_once(timeout)
+            if not cam_ready:
+                continue
+            cam_ready = False
+            job, cam_job = cam_job, None
 
+            # Nacht-Boost direkt aus dem Kamerapuffer; Request wird freigegeben,
+            # sobald enh geschrieben ist. Umfang nach Qualitätsstufe des Governors.
+            q = governor.quality
             try:
-                frame = picam.capture_array()
+                with capture.finish_async(job, cam.preview_stream) as frame:
+                    with governor.stage("luma"):
+                        gray = luma(frame, cam.mode, cam.preview_size, dst=_gray_buffer)
+                        pw, ph = governor.processing_size(cam.preview_size)
+                        if (pw, ph) != cam.preview_size:
+                            if small is None or small.shape != (ph, pw):
+                                small = np.empty((ph, pw), dtype=np.uint8)
+                            gray = cv2.resize(gray, (pw, ph), dst=small,
+                                              interpolation=cv2.INTER_AREA)
+                    with governor.stage("hist"):
+                        enh = display.acquire_gray(gray.shape)
+                        equalizer.apply(gray, dst=enh, every=q.hist_every)
             except Exception as e:
-                print(f"[MAIN] capture_array error: {e}")
+                print(f"[MAIN] capture_request error: {e}")
                 import traceback
                 traceback.print_exc()
-                time.sleep(0.1)
                 continue
 
-            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=_gray_buffer)
-            cv2.equalizeHist(_gray_buffer, dst=_enh_buffer)
-            cv2.cvtColor(_enh_buffer, cv2.COLOR_GRAY2BGR, dst=disp)
-
             now = time.time()
             if now - last_hud_update > 1.0:
                 photos_left, minutes_left = estimate_capacity()
+                if storage.snapshot.root != media_root:
+                    # Neuer Speicherort: Altbestand im Hintergrund umsortieren
+                    media_root = storage.snapshot.root
+                    reshard_flat_dirs()
                 usb_txt = "USB" if usb_mountpoint() else "INT"
                 last_hud_update = now
 
-            hud = f"{state.upper()} {usb_txt} F:{photos_left} V~{minutes_left}min"
-            cv2.putText(
-                disp, hud, (10,20),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2, cv2.LINE_AA
-            )
-
-            if state == "recording":
-                cv2.circle(disp, (W-40,30), 12, (0,0,255), -1)
-                cv2.putText(
-                    disp, "REC", (W-90,35),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 2, cv2.LINE_AA
-                )
-
-            fb_draw(disp, fbmem, W, H)
-
-            time.sleep(0.01)
+            hud = f"{state.upper()} {usb_txt} F:{photos_left} V~{minutes_left}min Q{governor.level}"
+            if photo_writer.pending():
+                # Rückstau der Foto-Warteschlange
+                hud += f" W{photo_writer.pending()}/{PHOTO_QUEUE}"
+            # HUD nur jeden hud_every-ten Frame neu zeichnen
+            # Erst nach dem ersten tatsächlich angezeigten vollen HUD auslassen
+            keep_hud = (display.hud_presented >= hud_need
+                        and loop_count % q.hud_every != 0)
+            loop_count += 1
+            display.submit_gray(enh, hud_comp,
+                                lambda disp, hud=hud, rec=(state == "recording"):
+                                    draw_hud(disp, hud, rec),
+                                keep_hud=keep_hud)
+
+            # Display-Render läuft parallel und zählt mit ins Budget
+            governor.end_frame(display.render_time)
 
     except KeyboardInterrupt:
         print("\n[EXIT] KeyboardInterrupt")
@@ -514,8 +561,17 @@ def main():
         if _stop_thread is not None:
             _stop_thread.join(timeout=2.0)
         picam.stop()
-        fbmem.close()
-        os.close(fbfd)
+        display.stop()
+        if photo_writer is not None:
+            photo_writer.stop()
+        storage.stop()
+        capacity.save()
+        for job in _resharders.values():
+            job.stop()
+        reactor.close()
+        fb.close()
+        if touch_thread is not None:
+            touch_thread.stop()
         if touch_fd is not None:
             os.close(touch_fd)
         print("NightCam Touch exit")
@@ -0,0 +1 @@
+# Kern-Module (Display, Kamera, Touch, Speicher) für Nachtsichtgerät
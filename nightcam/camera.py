@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kamera-Konfiguration für die Nachtsicht-Vorschau
+
+Modus "lores": zusätzlicher lores-Stream in Display-Größe (der ISP skaliert),
+               der große main-Stream bleibt Video und Fotos vorbehalten.
+Modus "yuv":   Hauptstream als YUV420, die Y-Ebene (Luma) wird direkt als
+               Slice ohne Kopie und ohne Farbkonvertierung verwendet.
+Modus "bgr":   bisheriger Pfad (RGB/BGR-Stream + cvtColor nach Grau).
+
+Fallback-Kette bei Fehlern: lores -> yuv -> bgr
+
+RequestCapture liest Frames über capture_request()/MappedArray direkt aus
+dem DMA-Puffer der Kamera (keine Kopie pro Frame wie bei capture_array).
+"""
+
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import cv2
+
+CAPTURE_MODES = ("lores", "yuv", "bgr")
+
+# mode:           aktiver Modus
+# preview_stream: "main" oder "lores" (für capture_array(name))
+# preview_size:   (Breite, Höhe) des Vorschau-Streams
+# main_size:      (Breite, Höhe) des Hauptstreams (Video/Foto)
+# main_mode:      "yuv" oder "bgr" - Format des Hauptstreams für luma()
+CameraSetup = namedtuple("CameraSetup", "mode preview_stream preview_size main_size main_mode")
+
+
+def stream_sizes(panel_size, main_scale=2):
+    """
+    Leitet Streamgrößen aus der Display-Geometrie ab
+
+    Args:
+        panel_size: (Breite, Höhe) aus open_fb
+        main_scale: Faktor für den Hauptstream (gleiches Seitenverhältnis)
+
+    Returns:
+        (main_size, lores_size), jeweils gerade Werte (YUV420)
+    """
+    w, h = panel_size
+    lores = (w & ~1, h & ~1)
+    main = ((w * main_scale) & ~1, (h * main_scale) & ~1)
+    return main, lores
+
+
+def _configure(picam, config):
+    """Richtet die Konfiguration aus (falls unterstützt) und aktiviert sie"""
+    align = getattr(picam, "align_configuration", None)
+    if align is not None:
+        align(config)
+    picam.configure(config)
+    return config
+
+
+def _stream_size(config, name, default):
+    try:
+        return tuple(config[name]["size"])
+    except (KeyError, TypeError):
+        return default
+
+
+def configure_camera(picam, mode, size, controls=None, video=False, panel_size=None):
+    """
+    Konfiguriert Picamera2 für den gewünschten Aufnahme-Modus
+
+    Args:
+        picam: Picamera2 Instanz
+        mode: "lores", "yuv" oder "bgr"
+        size: (Breite, Höhe) des Hauptstreams für "yuv"/"bgr"
+        controls: optionale Kamera-Controls
+        video: create_video_configuration statt create_preview_configuration
+        panel_size: Display-Auflösung (nötig für "lores")
+
+    Returns:
+        CameraSetup mit dem tatsächlich aktiven Modus
+    """
+    make = picam.create_video_configuration if video else picam.create_preview_configuration
+    controls = controls or {}
+
+    if mode == "lores":
+        if panel_size is None:
+            print("[CAM] lores ohne Display-Größe nicht möglich - Fallback auf YUV")
+        else:
+            main_size, lores_size = stream_sizes(panel_size)
+            try:
+                config = _configure(picam, make(
+                    main={"size": main_size, "format": "YUV420"},
+                    lores={"size": lores_size, "format": "YUV420"},
+                    controls=controls))
+                main_size = _stream_size(config, "main", main_size)
+                lores_size = _stream_size(config, "lores", lores_size)
+                print(f"[CAM] main {main_size[0]}x{main_size[1]} + "
+                      f"lores {lores_size[0]}x{lores_size[1]} (ISP skaliert)")
+                return CameraSetup("lores", "lores", lores_size, main_size, "yuv")
+            except Exception as e:
+                print(f"[CAM] lores-Stream nicht verfügbar ({e}) - Fallback auf YUV")
+        mode = "yuv"
+
+    if mode == "yuv":
+        try:
+            config = _configure(picam, make(main={"size": size, "format": "YUV420"},
+                                            controls=controls))
+            size = _stream_size(config, "main", size)
+            print(f"[CAM] YUV420 {size[0]}x{size[1]} (Y-Ebene direkt)")
+            return CameraSetup("yuv", "main", size, size, "yuv")
+        except Exception as e:
+            print(f"[CAM] YUV420 nicht verfügbar ({e}) - Fallback auf BGR")
+    elif mode != "bgr":
+        print(f"[CAM] Unbekannter Modus '{mode}' - verwende BGR")
+
+    config = _configure(picam, make(main={"size": size}, controls=controls))
+    size = _stream_size(config, "main", size)
+    print(f"[CAM] BGR {size[0]}x{size[1]}")
+    return CameraSetup("bgr", "main", size, size, "bgr")
+
+
+def luma(frame, mode, size, dst=None):
+    """
+    Liefert das Graubild eines Kameraframes
+
+    Args:
+        frame: Array von capture_array()
+        mode: "yuv" (auch für lores-Streams) oder "bgr"
+        size: (Breite, Höhe) des Streams
+        dst: optionaler uint8 Puffer für den BGR-Pfad
+
+    Returns:
+        uint8 Graubild (H x W); im YUV-Modus ein View ohne Kopie
+    """
+    w, h = size
+    if mode in ("yuv", "lores"):
+        # YUV420-Layout: h Zeilen Y, danach h/2 Zeilen U+V (Zeilen ggf. gepolstert)
+        return frame[:h, :w]
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=dst)
+
+
+class RequestCapture:
+    """
+    Frames als Requests statt als Kopie
+
+    Ein Request hält einen Kamerapuffer fest, bis er freigegeben wird. Die
+    Anzahl gleichzeitig gehaltener Requests ist begrenzt, damit der Kamera
+    nie die Puffer ausgehen. Verwendung:
+
+        with capture.frame(cam.preview_stream) as frame:
+            gray = luma(frame, cam.mode, cam.preview_size)
+            cv2.equalizeHist(gray, dst=enh)
+        # Request ist hier bereits zurück bei der Kamera
+    """
+
+    def __init__(self, picam, max_inflight=1, mapped_array=None):
+        """
+        Args:
+            picam: Picamera2 Instanz (gestartet)
+            max_inflight: maximal gleichzeitig gehaltene Requests
+            mapped_array: MappedArray-Klasse (Standard: aus picamera2)
+        """
+        if mapped_array is None:
+            from picamera2 import MappedArray as mapped_array
+        self.picam = picam
+        self.mapped_array = mapped_array
+        self.max_inflight = max_inflight
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._lock = threading.Lock()
+
+        self.held = 0           # aktuell gehaltene Requests
+        self.peak_held = 0      # Maximum seit der letzten Abfrage
+        self.waits = 0          # wie oft auf einen freien Platz gewartet wurde
+        self.hold_time = 0.0    # gleitender Mittelwert (Sekunden) bis zur Freigabe
+
+    def acquire(self):
+        """Holt den nächsten Request (blockiert, wenn max_inflight erreicht ist)"""
+        if not self._slots.acquire(blocking=False):
+            self.waits += 1
+            self._slots.acquire()
+        try:
+            request = self.picam.capture_request()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.held += 1
+            self.peak_held = max(self.peak_held, self.held)
+        return request, time.monotonic()
+
+    def release(self, request, t_acquired):
+        """Gibt den Request an die Kamera zurück"""
+        try:
+            request.release()
+        finally:
+            dt = time.monotonic() - t_acquired
+            with self._lock:
+                self.held -= 1
+                self.hold_time = dt if self.hold_time == 0.0 else 0.9 * self.hold_time + 0.1 * dt
+            self._slots.release()
+
+    @contextmanager
+    def frame(self, stream="main"):
+        """
+        Liefert den Stream als Array direkt im Kamerapuffer
+
+        Das Array ist nur innerhalb des with-Blocks gültig.
+        """
+        request, t0 = self.acquire()
+        try:
+            with self.mapped_array(request, stream, write=False) as m:
+                yield m.array
+        finally:
+            self.release(request, t0)
+
+    def start_async(self, signal):
+        """
+        Fordert den nächsten Request an, ohne zu warten
+
+        Args:
+            signal: Callback ohne Argumente, läuft im Kamera-Thread, sobald der
+                    Request fertig ist (z.B. Waker.signal des Reactors)
+
+        Returns:
+            Job für finish_async() oder None, wenn max_inflight erreicht ist
+        """
+        if not self._slots.acquire(blocking=False):
+            self.waits += 1
+            return None
+        try:
+            return self.picam.capture_request(wait=False, signal_function=lambda job: signal())
+        except Exception:
+            self._slots.release()
+            raise
+
+    @contextmanager
+    def finish_async(self, job, stream="main"):
+        """
+        Wie frame(), aber für einen mit start_async() angeforderten Request
+
+        Nach dem Signal blockiert das nicht mehr.
+        """
+        try:
+            request = self.picam.wait(job)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.held += 1
+            self.peak_held = max(self.peak_held, self.held)
+        t0 = time.monotonic()
+        try:
+            with self.mapped_array(request, stream, write=False) as m:
+                yield m.array
+        finally:
+            self.release(request, t0)
+
+    def stats(self):
+        """
+        Returns:
+            (held, peak_held, hold_ms, waits); peak wird danach zurückgesetzt
+        """
+        with self._lock:
+            peak, self.peak_held = self.peak_held, self.held
+            return self.held, peak, self.hold_time * 1000, self.waits
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Restkapazität aus gemessenen Datei- und Bitraten
+
+Die HUD-Anzeige "F:<Fotos> V~<min>" hat den freien Platz durch feste
+Schätzwerte geteilt (500 KB pro Foto, 0,5 MB/s Video). Die Graustufen-JPEGs
+sind aber deutlich kleiner, und die Videorate hängt vom Encoder ab.
+CapacityModel merkt sich pro Speicherort die tatsächliche Größe jedes
+gespeicherten Fotos und die Bytes/s jeder Aufnahme (gleitender Mittelwert)
+und legt sie in einer kleinen JSON-Datei im Speicherort ab, damit sie
+einen Neustart und das Umstecken des Sticks überleben.
+
+Der freie Platz kommt aus dem StorageSnapshot (selten gemessen) minus den
+seitdem selbst geschriebenen Bytes und dem Fortschritt einer laufenden
+Aufnahme. estimate() rechnet damit ohne Systemaufruf.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+STATS_FILE = ".nachtsicht_capacity.json"
+
+
+class _RollingMean:
+    """Mittelwert über die letzten `window` Werte (exponentiell angenähert)"""
+
+    def __init__(self, prior, window, mean=None, count=0):
+        self.mean = prior if mean is None else mean
+        self.count = count
+        self.window = window
+
+    def add(self, value):
+        self.count += 1
+        self.mean += (value - self.mean) / min(self.count, self.window)
+
+
+class CapacityModel:
+    """
+    Schätzt Restfotos und Restminuten Video aus gelernten Größen
+
+    Verwendung:
+
+        capacity = CapacityModel(photo_bytes=500_000, video_bps=500_000)
+        capacity.record_photo(root, os.path.getsize(fn))
+        capacity.video_started(root)
+        capacity.record_video(root, size, seconds)      # nach dem Stoppen
+        photos, minutes = capacity.estimate(storage.snapshot)
+    """
+
+    def __init__(self, photo_bytes, video_bps, window=50, save_every=10):
+        """
+        Args:
+            photo_bytes: Startwert Bytes pro Foto (bis gemessen wurde)
+            video_bps: Startwert Bytes pro Sekunde Video
+            window: Anzahl Werte im gleitenden Mittel
+            save_every: Statistik nach so vielen neuen Fotos speichern
+        """
+        self.photo_prior = photo_bytes
+        self.video_prior = video_bps
+        self.window = window
+        self.save_every = save_every
+
+        self._lock = threading.Lock()
+        self._targets = {}      # root -> {"photo": _RollingMean, "video": _RollingMean}
+        self._unsaved = {}      # root -> neue Werte seit dem letzten Speichern
+        self._writes = deque()  # (time.monotonic, root, bytes) seit dem Snapshot
+        self._written = {}      # root -> Summe der Bytes in _writes
+        self._recording = None  # (root, Startzeit monotonic)
+
+    ############################
+    # MESSWERTE
+    ############################
+
+    def record_photo(self, root, nbytes):
+        """Foto mit nbytes unter root gespeichert"""
+        self.load(root)
+        with self._lock:
+            self._target(root)["photo"].add(nbytes)
+            self._wrote(root, nbytes)
+            self._unsaved[root] = self._unsaved.get(root, 0) + 1
+            save = self._unsaved[root] >= self.save_every
+        if save:
+            self.save(root)
+
+    def video_started(self, root):
+        """Aufnahme läuft (Fortschritt wird bis record_video geschätzt)"""
+        self.load(root)
+        with self._lock:
+            self._target(root)
+            self._recording = (root, time.monotonic())
+
+    def record_video(self, root, nbytes, seconds):
+        """Aufnahme beendet: nbytes in seconds Sekunden"""
+        self.load(root)
+        with self._lock:
+            self._recording = None
+            if seconds > 0 and nbytes > 0:
+                self._target(root)["video"].add(nbytes / seconds)
+            self._wrote(root, nbytes)
+            self._unsaved[root] = self._unsaved.get(root, 0) + 1
+        self.save(root)
+
+    ############################
+    # SCHÄTZUNG
+    ############################
+
+    def estimate(self, snapshot, now=None):
+        """
+        Returns:
+            (fotos, minuten) für den Speicherort des Snapshots
+        """
+        now = time.monotonic() if now is None else now
+        root = snapshot.root
+        self.load(root)     # nach load() im Storage-Thread nur ein Dict-Zugriff
+        with self._lock:
+            target = self._target(root)
+            # Schreibvorgänge vor der Messung stecken schon in free_bytes
+            while self._writes and self._writes[0][0] <= snapshot.time:
+                _, r, n = self._writes.popleft()
+                self._written[r] -= n
+            written = self._written.get(root, 0)
+            video_bps = target["video"].mean
+            if self._recording is not None and self._recording[0] == root:
+                started = max(self._recording[1], snapshot.time)
+                written += video_bps * max(0.0, now - started)
+            photo_bytes = target["photo"].mean
+
+        free = max(0, snapshot.free_bytes - written)
+        photos = int(free // max(photo_bytes, 1))
+        minutes = int(free / max(video_bps, 1) // 60)
+        return photos, minutes
+
+    def _wrote(self, root, nbytes):
+        self._writes.append((time.monotonic(), root, nbytes))
+        self._written[root] = self._written.get(root, 0) + nbytes
+
+    def rates(self, root):
+        """
+        Returns:
+            (bytes_pro_foto, bytes_pro_sekunde_video, fotos_gemessen, videos_gemessen)
+        """
+        self.load(root)
+        with self._lock:
+            target = self._target(root)
+            return (target["photo"].mean, target["video"].mean,
+                    target["photo"].count, target["video"].count)
+
+    ############################
+    # PERSISTENZ
+    ############################
+
+    def load(self, root):
+        """
+        Liest die Statistik eines Speicherorts einmal aus der Datei
+
+        Die Datei wird ohne Sperre gelesen, damit estimate() im Hauptthread
+        nie hinter Stick-I/O wartet. Am besten beim Wechsel des Speicherorts
+        im Storage-Thread aufrufen (StorageMonitor notify).
+        """
+        if root in self._targets:
+            return
+        saved = {}
+        try:
+            with open(os.path.join(root, STATS_FILE)) as f:
+                saved = json.load(f)
+            if not isinstance(saved, dict):
+                saved = {}
+        except (OSError, ValueError):
+            pass
+        target = {
+            "photo": self._mean(self.photo_prior, saved.get("photo")),
+            "video": self._mean(self.video_prior, saved.get("video")),
+        }
+        with self._lock:
+            self._targets.setdefault(root, target)     # anderer Thread war schneller
+
+    def _target(self, root):
+        """Statistik eines Speicherorts (nach load(), unter self._lock)"""
+        return self._targets[root]
+
+    def _mean(self, prior, saved):
+        try:
+            return _RollingMean(prior, self.window, float(saved["mean"]), int(saved["count"]))
+        except (TypeError, KeyError, ValueError):
+            return _RollingMean(prior, self.window)
+
+    def save(self, root=None):
+        """Schreibt die Statistik (eines oder aller Speicherorte) atomar"""
+        with self._lock:
+            roots = [root] if root is not None else list(self._targets)
+            data = {}
+            for r in roots:
+                target = self._targets.get(r)
+                if target is not None:
+                    data[r] = {name: {"mean": m.mean, "count": m.count}
+                               for name, m in target.items()}
+                self._unsaved.pop(r, None)
+        for r, stats in data.items():
+            path = os.path.join(r, STATS_FILE)
+            tmp = path + ".tmp"
+            try:
+                with open(tmp, "w") as f:
+                    json.dump(stats, f)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"[CAPACITY] Statistik nicht gespeichert ({r}): {e}")
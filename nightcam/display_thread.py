@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Display-Ausgabe in eigenem Thread
+
+Aufnahme/Verarbeitung und Display-Refresh laufen parallel. Übergabe über
+ein Ein-Platz-Postfach: ein neuer Frame ersetzt einen noch wartenden
+(der alte zählt als verworfen). Der Display-Thread taktet sich selbst über
+seine gemessene Render-Zeit, statt über ein festes sleep().
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+class FrameMailbox:
+    """Ein-Platz-Postfach mit "neuester Frame gewinnt"-Semantik"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        """
+        Legt einen Frame ab
+
+        Returns:
+            Den ersetzten, nie angezeigten Frame oder None
+        """
+        with self._cond:
+            old = self._item
+            if old is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+            return old
+
+    def take(self, timeout=None):
+        """Wartet auf den nächsten Frame (None bei Timeout oder close())"""
+        with self._cond:
+            if self._item is None and not self._closed:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        """Weckt wartende Leser auf; liefert einen evtl. noch wartenden Frame"""
+        with self._cond:
+            self._closed = True
+            item, self._item = self._item, None
+            self._cond.notify_all()
+            return item
+
+
+class RateCounter:
+    """Zählt Ereignisse und liefert die Rate seit der letzten Abfrage"""
+
+    def __init__(self):
+        self.count = 0
+        self._last_count = 0
+        self._last_time = time.monotonic()
+
+    def tick(self):
+        self.count += 1
+
+    def rate(self):
+        now = time.monotonic()
+        dt = now - self._last_time
+        fps = (self.count - self._last_count) / dt if dt > 0 else 0.0
+        self._last_count = self.count
+        self._last_time = now
+        return fps
+
+
+class DisplayThread(threading.Thread):
+    """
+    Eigener Thread für das Schreiben ins Framebuffer
+
+    Nach start() darf nur noch dieser Thread auf das Framebuffer-Objekt
+    zugreifen. Produzenten übergeben Render-Jobs per submit().
+    """
+
+    def __init__(self, fb, max_fps=30.0, gray_buffers=3):
+        """
+        Args:
+            fb: nightcam.framebuffer.Framebuffer
+            max_fps: Obergrenze für den Display-Refresh
+            gray_buffers: Größe des Puffer-Pools für submit_gray
+                          (einer in Arbeit, einer wartend, einer beim Produzenten)
+        """
+        super().__init__(name="display", daemon=True)
+        self.fb = fb
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.mailbox = FrameMailbox()
+        self._running = True
+
+        self._pool_lock = threading.Lock()
+        self._pool = []
+        self._pool_shape = None
+        self._pool_size = gray_buffers
+
+        # Noch nicht angezeigte Bänder aus submit_bgr (siehe dort)
+        self._bands_lock = threading.Lock()
+        self._pending_bands = []
+        self._pending_full = False
+
+        # HUD-Bestätigung: Nummer des letzten submit_gray (Produzent) und
+        # des letzten tatsächlich angezeigten Frames mit vollem HUD (Display-Thread)
+        self.gray_submitted = 0
+        self.hud_presented = 0
+
+        self._dropped_mark = 0  # mailbox.dropped bei der letzten stats()-Abfrage
+
+        self.captured = RateCounter()
+        self.displayed = RateCounter()
+        self.render_time = 0.0  # gleitender Mittelwert in Sekunden
+
+    ############################
+    # PRODUZENTEN-SEITE
+    ############################
+
+    def acquire_gray(self, shape):
+        """Holt einen freien uint8 Puffer aus dem Pool"""
+        with self._pool_lock:
+            if self._pool_shape != shape:
+                self._pool_shape = shape
+                self._pool = [np.empty(shape, dtype=np.uint8)
+                              for _ in range(self._pool_size)]
+            if self._pool:
+                return self._pool.pop()
+        # Pool leer (sollte bei 3 Puffern nicht vorkommen)
+        return np.empty(shape, dtype=np.uint8)
+
+    def release_gray(self, buf):
+        """Gibt einen Puffer an den Pool zurück"""
+        with self._pool_lock:
+            if buf.shape == self._pool_shape and len(self._pool) < self._pool_size:
+                self._pool.append(buf)
+
+    def submit(self, render, release=None):
+        """
+        Übergibt einen Render-Job
+
+        Args:
+            render: Callback render(fb), läuft im Display-Thread
+            release: optionaler Callback, sobald der Job erledigt oder verworfen ist
+        """
+        self.captured.tick()
+        old = self.mailbox.put((render, release))
+        if old is not None and old[1] is not None:
+            old[1]()
+
+    def submit_gray(self, buf, compositor, draw_hud=None, keep_hud=False):
+        """
+        Graubild (aus acquire_gray) + HUD anzeigen; Puffer geht danach zurück in den Pool
+
+        Returns:
+            Nummer des Frames; hud_presented erreicht sie erst, wenn dieser
+            (oder ein späterer) Frame mit vollem HUD angezeigt wurde
+        """
+        self.gray_submitted += 1
+        seq = self.gray_submitted
+
+        def render(fb):
+            fb.draw_gray(buf, compositor, draw_hud, keep_hud)
+            if not keep_hud:
+                self.hud_presented = seq
+
+        self.submit(render, lambda: self.release_gray(buf))
+        return seq
+
+    def submit_bgr(self, bgr, bands=None):
+        """
+        BGR-Bild anzeigen
+
+        Ohne bands darf das Bild danach nicht mehr verändert werden. Mit bands
+        darf der Produzent ein dauerhaftes Bild weiter bearbeiten, solange
+        jede Änderung mit einem folgenden submit_bgr() gemeldet wird: Bänder
+        verworfener Jobs werden gesammelt und beim nächsten angezeigten Job
+        mit übertragen.
+
+        Args:
+            bgr: BGR-Bild
+            bands: optionale Liste geänderter Zeilenbereiche (y0, y1)
+        """
+        with self._bands_lock:
+            if bands is None:
+                self._pending_full = True
+            else:
+                self._pending_bands.extend(bands)
+
+        def render(fb):
+            with self._bands_lock:
+                full, pending = self._pending_full, self._pending_bands
+                self._pending_full, self._pending_bands = False, []
+            fb.draw(bgr, None if full else pending)
+
+        self.submit(render)
+
+    ############################
+    # DISPLAY-THREAD
+    ############################
+
+    def run(self):
+        while self._running:
+            job = self.mailbox.take(timeout=0.5)
+            if job is None:
+                continue
+            render, release = job
+
+            t0 = time.monotonic()
+            try:
+                render(self.fb)
+            except Exception as e:
+                print(f"[DISPLAY] Render-Fehler: {e}")
+            finally:
+                if release is not None:
+                    release()
+            dt = time.monotonic() - t0
+            self.render_time = dt if self.render_time == 0.0 else 0.9 * self.render_time + 0.1 * dt
+            self.displayed.tick()
+
+            # Selbst-Taktung: nicht schneller als max_fps
+            if dt < self.min_interval:
+                time.sleep(self.min_interval - dt)
+
+    def stop(self, timeout=2.0):
+        """Beendet den Thread und gibt wartende Puffer frei"""
+        self._running = False
+        job = self.mailbox.close()
+        if job is not None and job[1] is not None:
+            job[1]()
+        if self.is_alive():
+            self.join(timeout)
+
+    def stats(self):
+        """
+        Returns:
+            (capture_fps, display_fps, dropped, render_ms) seit der letzten Abfrage
+        """
+        dropped = self.mailbox.dropped
+        interval, self._dropped_mark = dropped - self._dropped_mark, dropped
+        return (self.captured.rate(), self.displayed.rate(),
+                interval, self.render_time * 1000)
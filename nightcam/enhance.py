@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Histogram-Equalizing für die Nachtsicht-Vorschau
+
+equalize_lut() berechnet dieselbe Abbildung wie cv2.equalizeHist, aber als
+256-Einträge-LUT. Damit kann eine LUT über mehrere Frames wiederverwendet
+und per cv2.LUT angewendet werden, statt das Histogramm jedes Mal neu zu
+berechnen.
+
+SmoothEqualizer geht weiter: Histogramm aus einer Unterabtastung, die neue
+LUT wird per gleitendem Mittel mit der alten verrechnet (kein Helligkeits-
+flackern durch IR-Rauschen) und nur alle N Frames oder bei einem
+Szenenwechsel neu bestimmt. Jeder Frame kostet dann nur ein cv2.LUT.
+"""
+
+import cv2
+import numpy as np
+
+
+def equalize_lut(gray):
+    """
+    Equalizing-LUT eines Graubilds (wie cv2.equalizeHist)
+
+    Args:
+        gray: uint8 Graubild
+
+    Returns:
+        uint8 LUT (256 Einträge)
+    """
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    return _lut_from_hist(hist)
+
+
+def _lut_from_hist(hist):
+    return np.clip(np.rint(_mapping_from_hist(hist)), 0, 255).astype(np.uint8)
+
+
+def _mapping_from_hist(hist):
+    """Equalizing-Abbildung als float32 (ungerundet, für das Mitteln)"""
+    nonzero = np.flatnonzero(hist)
+    if nonzero.size == 0:
+        return np.zeros(256, dtype=np.float32)
+    first = nonzero[0]
+    cdf = np.cumsum(hist, dtype=np.float64)
+    total = cdf[-1]
+    if hist[first] == total:
+        # Einfarbiges Bild: alles auf diesen Wert
+        return np.full(256, first, dtype=np.float32)
+    scale = np.float32(255.0 / (total - hist[first]))
+    return np.maximum((cdf - hist[first]).astype(np.float32) * scale, 0)
+
+
+class HistEqualizer:
+    """
+    Equalizing mit einstellbarer Neuberechnungsrate
+
+    every=1 entspricht cv2.equalizeHist pro Frame. Bei every=N wird die LUT
+    nur jeden N-ten Frame neu berechnet, dazwischen nur cv2.LUT angewendet.
+    """
+
+    name = "exact"
+
+    def __init__(self):
+        self.lut = None
+        self.age = 0    # Frames seit der letzten LUT-Berechnung
+
+    def apply(self, gray, dst=None, every=1):
+        """
+        Args:
+            gray: uint8 Graubild
+            dst: optionales uint8 Ziel (gleiche Größe)
+            every: LUT-Neuberechnung alle N Frames
+
+        Returns:
+            equalisiertes Graubild (dst, falls angegeben)
+        """
+        if every <= 1:
+            self.lut = None
+            return cv2.equalizeHist(gray, dst=dst)
+        if self.lut is None or self.age >= every - 1:
+            self.lut = equalize_lut(gray)
+            self.age = 0
+        else:
+            self.age += 1
+        return cv2.LUT(gray, self.lut, dst=dst)
+
+
+class SmoothEqualizer:
+    """
+    Equalizing mit unterabgetastetem Histogramm und zeitlich geglätteter LUT
+
+    Neuberechnung alle `every` Frames (mal dem Faktor des Governors) oder
+    sofort, wenn sich die mittlere Helligkeit um mehr als `shift` ändert.
+    """
+
+    name = "smooth"
+
+    def __init__(self, every=4, stride=4, alpha=0.25, shift=12.0, shift_alpha=0.6):
+        """
+        Args:
+            every: Grundintervall der Neuberechnung in Frames
+            stride: Unterabtastung für das Histogramm (jede n-te Zeile/Spalte)
+            alpha: Gewicht der neuen LUT im gleitenden Mittel
+            shift: Änderung der mittleren Helligkeit, ab der sofort neu berechnet wird
+            shift_alpha: Gewicht der neuen LUT nach einem Szenenwechsel
+        """
+        self.every = every
+        self.stride = stride
+        self.alpha = alpha
+        self.shift = shift
+        self.shift_alpha = shift_alpha
+
+        self.lut = None
+        self.age = 0
+        self.recomputes = 0
+        self._mapping = None    # float32, gleitendes Mittel
+        self._mean = None       # mittlere Helligkeit bei der letzten Berechnung
+        self._sub = None        # vorallokierte Unterabtastung
+
+    def _subsample(self, gray):
+        view = gray[::self.stride, ::self.stride]
+        if self._sub is None or self._sub.shape != view.shape:
+            self._sub = np.empty(view.shape, dtype=np.uint8)
+        np.copyto(self._sub, view)
+        return self._sub
+
+    def reset(self):
+        """Vergisst die gemittelte LUT (nächster Frame startet neu)"""
+        self.lut = None
+        self._mapping = None
+        self._mean = None
+
+    def apply(self, gray, dst=None, every=1):
+        """
+        Args:
+            gray: uint8 Graubild
+            dst: optionales uint8 Ziel (gleiche Größe)
+            every: Faktor auf das Grundintervall (vom Governor)
+
+        Returns:
+            equalisiertes Graubild (dst, falls angegeben)
+        """
+        interval = self.every * max(1, every)
+        due = self.lut is None or self.age >= interval - 1
+        sub = None
+        if not due:
+            # Szenenwechsel? Mittelwert der Unterabtastung ist billig
+            sub = self._subsample(gray)
+            due = abs(cv2.mean(sub)[0] - self._mean) > self.shift
+
+        if due:
+            if sub is None:
+                sub = self._subsample(gray)
+            hist = cv2.calcHist([sub], [0], None, [256], [0, 256]).ravel()
+            mapping = _mapping_from_hist(hist)
+            mean = float(np.dot(hist, np.arange(256, dtype=np.float32)) / max(hist.sum(), 1))
+            if self._mapping is None:
+                self._mapping = mapping
+            else:
+                a = self.alpha if abs(mean - self._mean) <= self.shift else self.shift_alpha
+                self._mapping *= 1.0 - a
+                self._mapping += a * mapping
+            self._mean = mean
+            self.lut = np.clip(np.rint(self._mapping), 0, 255).astype(np.uint8)
+            self.age = 0
+            self.recomputes += 1
+        else:
+            self.age += 1
+        return cv2.LUT(gray, self.lut, dst=dst)
+
+
+EQUALIZE_MODES = ("smooth", "exact")
+
+
+def make_equalizer(mode):
+    """
+    Args:
+        mode: "smooth" (geglättete LUT) oder "exact" (wie cv2.equalizeHist)
+    """
+    if mode == "exact":
+        return HistEqualizer()
+    if mode != "smooth":
+        print(f"[ENH] Unbekannter Modus '{mode}' - verwende smooth")
+    return SmoothEqualizer()
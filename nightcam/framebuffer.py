@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Framebuffer-Backend für das SPI-Display (/dev/fb1)
+
+- liest fb_var_screeninfo UND fb_fix_screeninfo (bpp, RGB-Bitfelder, line_length)
+- wählt einen passenden Packer: RGB565, BGR565, XRGB8888 oder RGB888
+- schreibt direkt über NumPy-Views in den gemappten Display-Speicher
+- optional Diff-Modus: nur geänderte Speicherseiten landen im mmap
+  (fbtft Deferred-IO schickt nur schmutzige Seiten per SPI)
+- Graustufen-Pfad über Lookup-Table ohne BGR-Umweg
+"""
+
+import os
+import sys
+import fcntl
+import mmap
+import struct
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+FBIOGET_VSCREENINFO = 0x4600
+FBIOGET_FSCREENINFO = 0x4602
+
+PAGE_SIZE = mmap.PAGESIZE
+
+# fb_var_screeninfo: xres, yres, xres_virtual, yres_virtual, xoffset, yoffset,
+# bits_per_pixel, grayscale, red/green/blue/transp je (offset, length, msb_right)
+_VAR_FMT = "=20I"
+# fb_fix_screeninfo: id[16], smem_start (unsigned long), smem_len, type,
+# type_aux, visual, xpanstep, ypanstep, ywrapstep, line_length
+_FIX_FMT = "@16sL4I3HI"
+
+FbInfo = namedtuple("FbInfo", "xres yres bpp line_length red green blue")
+
+
+def read_fb_info(fd):
+    """
+    Liest Geometrie und Pixelformat per ioctl
+
+    Returns:
+        FbInfo; red/green/blue sind (offset, length) Tupel
+    """
+    raw = fcntl.ioctl(fd, FBIOGET_VSCREENINFO, b"\x00"*160)
+    v = struct.unpack_from(_VAR_FMT, raw, 0)
+    xres, yres, bpp = v[0], v[1], v[6]
+    red, green, blue = (v[8], v[9]), (v[11], v[12]), (v[14], v[15])
+    if xres == 0 or yres == 0:
+        raise ValueError("bad ioctl dims")
+
+    line_length = 0
+    try:
+        raw = fcntl.ioctl(fd, FBIOGET_FSCREENINFO, b"\x00"*128)
+        line_length = struct.unpack_from(_FIX_FMT, raw, 0)[-1]
+    except OSError:
+        pass
+    if line_length < xres * bpp // 8:
+        line_length = xres * bpp // 8
+
+    return FbInfo(xres, yres, bpp, line_length, red, green, blue)
+
+
+def _build_gray_lut():
+    """256-Einträge-Tabelle: Grauwert -> gepacktes RGB565"""
+    v = np.arange(256, dtype=np.uint16)
+    return ((v >> 3) << 11) | ((v >> 2) << 5) | (v >> 3)
+
+
+GRAY_RGB565_LUT = _build_gray_lut()
+
+
+def _as_u16(dst):
+    """(H x W x 2) uint8 View -> (H x W) uint16 View auf denselben Speicher"""
+    return dst.view(np.uint16)[:, :, 0]
+
+
+############################
+# PACKER
+############################
+#
+# Alle Packer schreiben in ein uint8 Ziel (H x W x Bytes-pro-Pixel),
+# typischerweise ein View direkt aufs mmap. Byte-Reihenfolge: Little-Endian
+# (Raspberry Pi), d.h. XRGB8888 liegt im Speicher als B,G,R,X.
+
+def _rgb565_bgr(bgr, dst):
+    cv2.cvtColor(bgr, cv2.COLOR_BGR2BGR565, dst=dst)
+
+def _bgr565_bgr(bgr, dst):
+    cv2.cvtColor(bgr, cv2.COLOR_RGB2BGR565, dst=dst)
+
+def _565_gray(gray, dst):
+    # Grau ist symmetrisch in R/B -> gleiche Tabelle für RGB565 und BGR565
+    cv2.LUT(gray, GRAY_RGB565_LUT, dst=_as_u16(dst))
+
+def _xrgb8888_bgr(bgr, dst):
+    cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA, dst=dst)
+
+def _xrgb8888_gray(gray, dst):
+    cv2.cvtColor(gray, cv2.COLOR_GRAY2BGRA, dst=dst)
+
+def _rgb888_bgr(bgr, dst):
+    np.copyto(dst, bgr)
+
+def _rgb888_gray(gray, dst):
+    cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=dst)
+
+PixelFormat = namedtuple("PixelFormat", "name bytes_pp pack_bgr pack_gray")
+
+RGB565   = PixelFormat("RGB565", 2, _rgb565_bgr, _565_gray)
+BGR565   = PixelFormat("BGR565", 2, _bgr565_bgr, _565_gray)
+XRGB8888 = PixelFormat("XRGB8888", 4, _xrgb8888_bgr, _xrgb8888_gray)
+RGB888   = PixelFormat("RGB888", 3, _rgb888_bgr, _rgb888_gray)
+
+PIXEL_FORMATS = {f.name: f for f in (RGB565, BGR565, XRGB8888, RGB888)}
+
+
+def detect_format(info):
+    """Wählt den Packer anhand bpp und Rot/Blau-Offset"""
+    red_off, blue_off = info.red[0], info.blue[0]
+    if info.bpp == 16:
+        return BGR565 if red_off == 0 and blue_off == 11 else RGB565
+    if info.bpp == 32 and red_off == 16 and blue_off == 0:
+        return XRGB8888
+    if info.bpp == 24 and red_off == 16 and blue_off == 0:
+        return RGB888
+    raise ValueError(f"Pixelformat nicht unterstützt: {info.bpp}bpp "
+                     f"R@{red_off} B@{blue_off}")
+
+
+def bgr_to_rgb565(bgr, out=None):
+    """
+    Packt ein BGR-Bild nach RGB565
+
+    Args:
+        bgr: uint8 numpy array (H x W x 3)
+        out: optionales uint16 Ziel-Array (H x W), darf ein View aufs mmap sein
+
+    Returns:
+        uint16 numpy array (H x W)
+    """
+    if out is None:
+        out = np.empty(bgr.shape[:2], dtype=np.uint16)
+    _rgb565_bgr(bgr, out[:, :, None].view(np.uint8))
+    return out
+
+
+def gray_to_rgb565(gray, out=None):
+    """
+    Wandelt ein 8-Bit Graubild per Tabellen-Lookup in RGB565
+
+    Args:
+        gray: uint8 numpy array (H x W)
+        out: optionales uint16 Ziel-Array (H x W)
+
+    Returns:
+        uint16 numpy array (H x W)
+    """
+    return cv2.LUT(gray, GRAY_RGB565_LUT, dst=out)
+
+
+############################
+# FRAMEBUFFER
+############################
+
+class Framebuffer:
+    """
+    Gemappter Framebuffer mit formatgerechtem Packer
+
+    self.pixels ist ein beschreibbarer uint8 View (H x W x Bytes-pro-Pixel)
+    mit dem Zeilenabstand (line_length) des Treibers.
+
+    Ohne Diff-Modus zeigt self.pixels direkt aufs mmap. Im Diff-Modus zeigt es
+    auf einen Backbuffer; present() vergleicht ihn seitenweise mit dem zuletzt
+    gesendeten Frame und kopiert nur geänderte Seiten ins mmap. So markiert
+    der fbtft-Treiber nur diese Seiten als schmutzig.
+
+    Kamerabilder (draw_gray) ändern ohnehin fast jede Seite; sie gehen auch
+    im Diff-Modus direkt über self.screen ins mmap. Der nächste BGR-Frame
+    (Terminal, USB-Manager) wird danach komplett gesendet.
+    """
+
+    def __init__(self, path, info=None, fmt=None, diff=True):
+        """
+        Args:
+            path: Framebuffer-Device (oder normale Datei als Ersatz)
+            info: optionales FbInfo (sonst per ioctl, Fallback 480x320 RGB565)
+            fmt: optionales PixelFormat (sonst aus info abgeleitet)
+            diff: nur geänderte Seiten ins mmap schreiben
+        """
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR)
+
+        if info is None:
+            try:
+                info = read_fb_info(self.fd)
+            except Exception:
+                # Fallback für exotische Treiber (oder normale Datei als Ersatz)
+                info = FbInfo(480, 320, 16, 960, (11, 5), (5, 6), (0, 5))
+        self.info = info
+        self.width = info.xres
+        self.height = info.yres
+        self.bpp = info.bpp
+        self.line_length = info.line_length
+        self.format = fmt or detect_format(info)
+
+        self.size = self.line_length * self.height
+        self.mm = mmap.mmap(self.fd, self.size, mmap.MAP_SHARED,
+                            mmap.PROT_WRITE | mmap.PROT_READ, 0)
+        self._mm_flat = np.ndarray((self.size,), dtype=np.uint8, buffer=self.mm)
+
+        self.diff = diff
+        if diff:
+            # Backbuffer + zuletzt gesendeter Frame, auf ganze Seiten aufgerundet
+            npages = -(-self.size // PAGE_SIZE)
+            self._back = np.zeros(npages * PAGE_SIZE, dtype=np.uint8)
+            self._shadow = np.zeros(npages * PAGE_SIZE, dtype=np.uint8)
+            self._shadow[:self.size] = self._mm_flat
+            self._back[:self.size] = self._mm_flat
+            self._back_pages = self._back.view(np.uint64).reshape(npages, -1)
+            self._shadow_pages = self._shadow.view(np.uint64).reshape(npages, -1)
+            self._changed = np.empty(npages, dtype=bool)
+            self._neq = np.empty(self._back_pages.shape, dtype=bool)
+            target = self._back
+        else:
+            target = self.mm
+        shape = (self.height, self.width, self.format.bytes_pp)
+        strides = (self.line_length, self.format.bytes_pp, 1)
+        self.pixels = np.ndarray(shape, dtype=np.uint8, buffer=target, strides=strides)
+        # Direkt aufs mmap (ohne Diff-Modus dasselbe wie pixels)
+        self.screen = np.ndarray(shape, dtype=np.uint8, buffer=self.mm, strides=strides)
+        self._shadow_valid = True   # False: mmap wurde am Backbuffer vorbei beschrieben
+
+        # Statistik: Bytes, die tatsächlich ins mmap geschrieben wurden
+        self.frames = 0
+        self.last_bytes = 0
+        self.total_bytes = 0
+
+        # Vorallokierter Resize-Puffer für draw()
+        self._resize = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+        print(f"[FB] {path} {self.width}x{self.height}@{self.bpp}bpp "
+              f"{self.format.name} stride={self.line_length}"
+              f"{' diff' if diff else ''}")
+
+    def draw(self, bgr, bands=None):
+        """Skaliert ein BGR-Bild auf Display-Größe, packt es und sendet es"""
+        if bgr.shape[:2] == (self.height, self.width):
+            if bands is not None and self._shadow_valid:
+                # Nur die gemeldeten Zeilen packen, der Rest ist unverändert
+                for y0, y1 in bands:
+                    self.format.pack_bgr(bgr[y0:y1], self.pixels[y0:y1])
+                return self.present(bands)
+            src = bgr
+        else:
+            src = cv2.resize(bgr, (self.width, self.height), dst=self._resize,
+                             interpolation=cv2.INTER_LINEAR)
+        self.format.pack_bgr(src, self.pixels)
+        return self.present(bands)
+
+    def draw_gray(self, gray, compositor, draw_hud=None, keep_hud=False):
+        """
+        Graubild + HUD packen und senden (siehe GrayHudCompositor)
+
+        Direkt ins mmap, ohne Seitenvergleich (Kamerabilder ändern fast alles).
+        """
+        compositor.render_into(gray, self.screen, self.format, draw_hud, keep_hud)
+        if self.diff:
+            self._shadow_valid = False
+        rows = self.height
+        if keep_hud and compositor.bands:
+            rows = sum(y1 - y0 for y0, y1 in compositor.gaps)
+        written = rows * self.line_length
+        self.frames += 1
+        self.last_bytes = written
+        self.total_bytes += written
+        return written
+
+    def present(self, bands=None):
+        """
+        Überträgt den Backbuffer ins mmap (nur geänderte Seiten)
+
+        Args:
+            bands: optionale Liste von (y0, y1) Zeilenbereichen, die sich
+                   geändert haben können; sonst wird der ganze Frame verglichen
+
+        Returns:
+            Anzahl ins mmap geschriebener Bytes
+        """
+        self.frames += 1
+        if not self.diff:
+            self.last_bytes = self.size
+            self.total_bytes += self.size
+            return self.size
+
+        if not self._shadow_valid:
+            # mmap zeigt ein Kamerabild: alles senden
+            self.invalidate()
+            bands = None
+            self._shadow_valid = True
+
+        changed = self._changed
+        changed[:] = False
+        if bands is None:
+            bands = [(0, self.height)]
+        for y0, y1 in bands:
+            p0 = (y0 * self.line_length) // PAGE_SIZE
+            p1 = -(-(y1 * self.line_length) // PAGE_SIZE)
+            if p1 > p0:
+                neq = np.not_equal(self._back_pages[p0:p1], self._shadow_pages[p0:p1],
+                                   out=self._neq[p0:p1])
+                neq.any(axis=1, out=changed[p0:p1])
+
+        # Zusammenhängende Läufe geänderter Seiten finden
+        edges = np.diff(changed.view(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        written = 0
+        for p0, p1 in zip(starts, ends):
+            a = p0 * PAGE_SIZE
+            b = min(p1 * PAGE_SIZE, self.size)
+            self._mm_flat[a:b] = self._back[a:b]
+            self._shadow[a:b] = self._back[a:b]
+            written += b - a
+
+        self.last_bytes = written
+        self.total_bytes += written
+        return written
+
+    def invalidate(self):
+        """Erzwingt beim nächsten present() einen kompletten Frame"""
+        if self.diff:
+            np.bitwise_not(self._back, out=self._shadow)
+
+    def bytes_per_frame(self):
+        """Durchschnittlich geschriebene Bytes pro Frame"""
+        return self.total_bytes / self.frames if self.frames else 0.0
+
+    def close(self):
+        """Schließt mmap und Device"""
+        self.pixels = None
+        self.screen = None
+        self._mm_flat = None
+        try:
+            self.mm.close()
+        except BufferError:
+            # Noch exportierte Views - mmap wird beim Prozessende freigegeben
+            pass
+        os.close(self.fd)
+
+
+def open_fb(path):
+    """Öffnet /dev/fbX als Framebuffer-Backend"""
+    return Framebuffer(path)
+
+
+class GrayHudCompositor:
+    """
+    Graustufen-Frame + farbiges HUD -> Display-Format
+
+    Das Kamerabild geht komplett über den Graustufen-Packer (LUT). Nur die
+    HUD-Bänder (Zeilenbereiche mit Text/Buttons) werden als BGR gezeichnet
+    und danach gepackt über das Ergebnis gelegt.
+    """
+
+    def __init__(self, width, height, bands):
+        """
+        Args:
+            width, height: Display-Auflösung
+            bands: Liste von (y0, y1) Zeilenbereichen, in denen HUD liegt
+        """
+        self.width = width
+        self.height = height
+        self.bands = [(max(0, y0), min(height, y1)) for y0, y1 in bands]
+
+        # Zeilenbereiche ohne HUD (für keep_hud)
+        self.gaps = []
+        y = 0
+        for y0, y1 in sorted(self.bands):
+            if y0 > y:
+                self.gaps.append((y, y0))
+            y = max(y, y1)
+        if y < height:
+            self.gaps.append((y, height))
+
+        # Vorallokierte Puffer (keine Allokation pro Frame)
+        self.gray = np.empty((height, width), dtype=np.uint8)
+        self.canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        self.packed = np.empty((height, width), dtype=np.uint16)
+
+    def _compose(self, gray, draw_hud):
+        """Skaliert auf Display-Größe und zeichnet das HUD in die Bänder"""
+        if gray.shape == (self.height, self.width):
+            small = gray
+        else:
+            small = cv2.resize(gray, (self.width, self.height),
+                               dst=self.gray, interpolation=cv2.INTER_LINEAR)
+
+        if draw_hud is not None and self.bands:
+            for y0, y1 in self.bands:
+                cv2.cvtColor(small[y0:y1], cv2.COLOR_GRAY2BGR, dst=self.canvas[y0:y1])
+            draw_hud(self.canvas)
+        return small
+
+    def render_into(self, gray, dst, fmt, draw_hud=None, keep_hud=False):
+        """
+        Packt Graubild + HUD in ein Ziel im Display-Format
+
+        Args:
+            gray: uint8 Graubild (beliebige Größe)
+            dst: uint8 Ziel (H x W x Bytes-pro-Pixel), z.B. Framebuffer.pixels
+            fmt: PixelFormat des Ziels
+            draw_hud: Callback draw_hud(canvas) zeichnet in BGR-Display-Koordinaten
+            keep_hud: HUD-Bänder nicht anfassen (der letzte Inhalt in dst bleibt
+                      stehen); nur sinnvoll, wenn dst über Frames erhalten bleibt
+        """
+        if keep_hud and self.bands:
+            small = self._compose(gray, None)
+            for y0, y1 in self.gaps:
+                fmt.pack_gray(small[y0:y1], dst[y0:y1])
+            return dst
+
+        small = self._compose(gray, draw_hud)
+        fmt.pack_gray(small, dst)
+        if draw_hud is not None:
+            for y0, y1 in self.bands:
+                fmt.pack_bgr(self.canvas[y0:y1], dst[y0:y1])
+        return dst
+
+    def render(self, gray, draw_hud=None, out=None):
+        """
+        Wie render_into, aber als RGB565 (uint16 H x W)
+
+        Returns:
+            uint16 RGB565 array (H x W)
+        """
+        if out is None:
+            out = self.packed
+        self.render_into(gray, out[:, :, None].view(np.uint8), RGB565, draw_hud)
+        return out
+
+
+if sys.byteorder != "little":
+    print("[WARN] Framebuffer-Packer gehen von Little-Endian aus")
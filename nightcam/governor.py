@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Frame-Budget-Governor für die Live-Vorschau
+
+Misst die Arbeitszeit pro Frame (Summe der Stufen im Haupt-Thread bzw. die
+Render-Zeit des Display-Threads, je nachdem was länger dauert) gegen die
+Ziel-Framezeit. Bei anhaltender Überlast wird stufenweise Qualität
+abgegeben, bei genug Reserve wieder zurückgeschaltet:
+
+    0  voll      alles jeden Frame
+    1  hud/3     HUD nur jeden 3. Frame neu zeichnen
+    2  hist/4    Equalizing-LUT 4x seltener neu berechnen
+    3  halb      Verarbeitung in halber Auflösung
+    4  15fps     Vorschau auf 15 fps begrenzt
+"""
+
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# hud_every:  HUD alle N Frames neu zeichnen (dazwischen bleibt das alte stehen)
+# hist_every: Faktor auf das Neuberechnungs-Intervall der Equalizing-LUT
+# scale:      Faktor für die Verarbeitungsauflösung
+# max_fps:    Obergrenze der Vorschau (None = Kamera-Takt)
+Quality = namedtuple("Quality", "name hud_every hist_every scale max_fps")
+
+QUALITY_LEVELS = (
+    Quality("voll",   1, 1, 1.0, None),
+    Quality("hud/3",  3, 1, 1.0, None),
+    Quality("hist/4", 3, 4, 1.0, None),
+    Quality("halb",   3, 4, 0.5, None),
+    Quality("15fps",  3, 4, 0.5, 15),
+)
+
+
+class FrameGovernor:
+    """
+    Wählt die Qualitätsstufe anhand der gemessenen Framezeit
+
+    Verwendung pro Frame:
+
+        q = governor.quality
+        with governor.stage("hist"):
+            ...
+        governor.end_frame(display.render_time)
+        governor.pace()
+    """
+
+    def __init__(self, target_fps=30.0, levels=QUALITY_LEVELS,
+                 down_after=10, up_after=90, headroom=0.6, clock=time.monotonic):
+        """
+        Args:
+            target_fps: Ziel-Framerate der Vorschau
+            levels: Qualitätsstufen, von voll nach sparsam
+            down_after: so viele Frames in Folge über Budget -> eine Stufe runter
+            up_after: so viele Frames in Folge unter headroom * Budget -> eine Stufe hoch
+            headroom: Anteil des Budgets, unter dem wieder hochgeschaltet wird
+            clock: Zeitquelle (für Tests austauschbar)
+        """
+        self.target_fps = target_fps
+        self.levels = levels
+        self.down_after = down_after
+        self.up_after = up_after
+        self.headroom = headroom
+        self.clock = clock
+
+        self.level = 0
+        self.changes = 0
+        self.stage_times = {}   # gleitende Mittelwerte pro Stufe (Sekunden)
+        self.load = 0.0         # gleitender Mittelwert der Framelast (Sekunden)
+        self._work = 0.0
+        self._over = 0
+        self._under = 0
+        self._last_frame = None
+
+    @property
+    def quality(self):
+        return self.levels[self.level]
+
+    def budget(self):
+        """Ziel-Framezeit der aktuellen Stufe in Sekunden"""
+        fps = self.target_fps
+        if self.quality.max_fps:
+            fps = min(fps, self.quality.max_fps)
+        return 1.0 / fps
+
+    @contextmanager
+    def stage(self, name):
+        """Misst eine Verarbeitungsstufe des aktuellen Frames"""
+        t0 = self.clock()
+        try:
+            yield
+        finally:
+            dt = self.clock() - t0
+            self._work += dt
+            old = self.stage_times.get(name)
+            self.stage_times[name] = dt if old is None else 0.9 * old + 0.1 * dt
+
+    def end_frame(self, parallel=0.0):
+        """
+        Schließt den Frame ab und passt ggf. die Stufe an
+
+        Args:
+            parallel: Zeit einer parallel laufenden Stufe (z.B. Display-Render)
+
+        Returns:
+            True, wenn sich die Stufe geändert hat
+        """
+        work = max(self._work, parallel)
+        self._work = 0.0
+        self.load = work if self.load == 0.0 else 0.9 * self.load + 0.1 * work
+
+        budget = self.budget()
+        if work > budget:
+            self._over += 1
+            self._under = 0
+        elif work < self.headroom * budget:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.down_after and self.level < len(self.levels) - 1:
+            return self._set_level(self.level + 1)
+        if self._under >= self.up_after and self.level > 0:
+            return self._set_level(self.level - 1)
+        return False
+
+    def _set_level(self, level):
+        direction = "runter" if level > self.level else "hoch"
+        print(f"[GOV] Qualität {direction}: {self.level} -> {level} "
+              f"({self.levels[level].name}) | Last {self.load * 1000:.1f} ms, "
+              f"Budget {self.budget() * 1000:.1f} ms")
+        self.level = level
+        self.changes += 1
+        self._over = self._under = 0
+        return True
+
+    def frame_delay(self):
+        """Sekunden bis zum nächsten erlaubten Frame (0 = sofort), ohne zu warten"""
+        max_fps = self.quality.max_fps
+        if not max_fps or self._last_frame is None:
+            return 0.0
+        return max(0.0, self._last_frame + 1.0 / max_fps - self.clock())
+
+    def pace(self):
+        """Wartet, falls die aktuelle Stufe die Vorschau-FPS begrenzt"""
+        now = self.clock()
+        wait = self.frame_delay()
+        if wait > 0:
+            time.sleep(wait)
+            now += wait
+        self._last_frame = now
+
+    def processing_size(self, size):
+        """(Breite, Höhe) der Verarbeitung für die aktuelle Stufe (gerade Werte)"""
+        scale = self.quality.scale
+        if scale >= 1.0:
+            return size
+        w, h = size
+        return (max(2, int(w * scale)) & ~1, max(2, int(h * scale)) & ~1)
+
+    def describe(self):
+        """Kurztext für Log/HUD"""
+        stages = " ".join(f"{name} {t * 1000:.1f}" for name, t in self.stage_times.items())
+        return (f"Q{self.level} {self.quality.name} | Last {self.load * 1000:.1f}/"
+                f"{self.budget() * 1000:.1f} ms | {stages}")
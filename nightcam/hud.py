@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HUD-Elemente als vorgerenderte Sprites
+
+Text, Buttons und Symbole werden einmal (pro Inhalt) in ein kleines
+BGR-Bild mit Alpha-Maske gerendert und danach pro Frame nur noch aufs
+Bild gelegt (Festkomma: roi * (256 - a) + Farbe * a, vorberechnet).
+Zahlen (Fotos/Minuten übrig) werden aus einzeln vorgerenderten Ziffern
+zusammengesetzt: ändert sich ein Wert, wird die Zeile aus vorhandenen
+Sprites montiert statt neu mit putText gerendert.
+"""
+
+import re
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# premul:    uint16 Farbe * Deckkraft * 256 (+128 zum Runden), h x w x 3
+# inv:       uint16 (1 - Deckkraft) * 256, h x w x 3
+# alpha:     float32 Deckkraft (h x w), zum Montieren von Zeilen
+# ox, oy:    Lage der linken oberen Ecke relativ zum Ankerpunkt
+# advance:   Vorschub in x (Text) bzw. 0
+Sprite = namedtuple("Sprite", "premul inv alpha ox oy advance")
+
+_RUNS = re.compile(r"\d+|\D+")
+
+
+def _sprite(color, alpha, ox, oy, advance=0):
+    alpha = np.ascontiguousarray(alpha, dtype=np.float32)
+    a256 = np.rint(alpha * 256).astype(np.uint16)
+    inv = np.repeat((256 - a256)[:, :, None], 3, axis=2)
+    premul = color.astype(np.uint16) * a256[:, :, None] + 128
+    return Sprite(premul, inv, alpha, ox, oy, advance)
+
+
+class SpriteCache:
+    """
+    Cache für HUD-Sprites (LRU, nur aus einem Thread benutzen)
+
+    Verwendung im draw_hud-Callback:
+
+        with sprites.frame():
+            sprites.draw_text(canvas, "LIVE F:123", (10, 20), 0.6, (0, 255, 0), 2)
+            sprites.draw_cached(canvas, ("btn", pressed), (x0, y0, x1, y1),
+                                lambda c: button.draw(c))
+    """
+
+    def __init__(self, max_items=128):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.cost = 0.0     # gleitender Mittelwert der HUD-Zeit pro Frame (Sekunden)
+        self._tmp = {}      # Zwischenpuffer pro Größe (zusammenhängend = schneller)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _get(self, key, make):
+        sprite = self._items.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self._items.move_to_end(key)
+            return sprite
+        self.misses += 1
+        sprite = make()
+        self._items[key] = sprite
+        if len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return sprite
+
+    ############################
+    # SPRITES ERZEUGEN
+    ############################
+
+    def text(self, text, scale, color, thickness=1):
+        """Text-Sprite, Anker ist der Grundlinien-Anfang wie bei cv2.putText"""
+        return self._get(("text", text, scale, color, thickness),
+                         lambda: self._render_text(text, scale, color, thickness))
+
+    @staticmethod
+    def _render_text(text, scale, color, thickness):
+        (w, h), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+        pad = thickness + 1
+        mask = np.zeros((h + baseline + 2 * pad, w + 2 * pad), dtype=np.uint8)
+        cv2.putText(mask, text, (pad, pad + h), FONT, scale, 255, thickness, cv2.LINE_AA)
+        bgr = np.empty(mask.shape + (3,), dtype=np.uint8)
+        bgr[:] = color
+        # Vorschub ohne den Dicken-Zuschlag von getTextSize (wie putText intern)
+        advance = w - (thickness + 1) // 2
+        return _sprite(bgr, mask / 255.0, -pad, -(pad + h), advance)
+
+    def capture(self, key, rect, draw):
+        """
+        Sprite aus beliebigem Zeichencode (z.B. TouchButton.draw)
+
+        draw(canvas) zeichnet in absoluten Koordinaten; Farbe und Deckkraft
+        werden aus einem Durchlauf auf Schwarz und einem auf Weiß bestimmt
+        (funktioniert auch mit Antialiasing).
+
+        Args:
+            key: Cache-Schlüssel (muss alles enthalten, was das Aussehen ändert)
+            rect: (x0, y0, x1, y1) Bereich, in dem gezeichnet wird
+            draw: Callback draw(canvas)
+        """
+        return self._get(("capture",) + tuple(key), lambda: self._render_capture(rect, draw))
+
+    @staticmethod
+    def _render_capture(rect, draw):
+        x0, y0, x1, y1 = rect
+        black = np.zeros((y1, x1, 3), dtype=np.uint8)
+        white = np.full((y1, x1, 3), 255, dtype=np.uint8)
+        draw(black)
+        draw(white)
+        black = black[y0:y1, x0:x1].astype(np.float32)
+        white = white[y0:y1, x0:x1].astype(np.float32)
+        # Schwarz: c*a, Weiß: c*a + 255*(1-a)
+        alpha = 1.0 - (white - black).mean(axis=2) / 255.0
+        alpha = np.clip(alpha, 0.0, 1.0)
+        color = black / np.maximum(alpha, 1e-3)[:, :, None]
+        color = np.clip(np.rint(color), 0, 255).astype(np.uint8)
+        return _sprite(color, alpha, x0, y0)
+
+    ############################
+    # ZEICHNEN
+    ############################
+
+    def blit(self, canvas, sprite, x, y):
+        """Legt ein Sprite mit Alpha auf canvas (Anker bei x, y), mit Clipping"""
+        h, w = sprite.alpha.shape
+        x0, y0 = x + sprite.ox, y + sprite.oy
+        H, W = canvas.shape[:2]
+        cx0, cy0 = max(0, x0), max(0, y0)
+        cx1, cy1 = min(W, x0 + w), min(H, y0 + h)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return
+        sx, sy = cx0 - x0, cy0 - y0
+        src = (slice(sy, sy + cy1 - cy0), slice(sx, sx + cx1 - cx0))
+        roi = canvas[cy0:cy1, cx0:cx1]
+        tmp = self._tmp.get(roi.shape)
+        if tmp is None:
+            if len(self._tmp) >= self.max_items:
+                self._tmp.clear()
+            tmp = self._tmp[roi.shape] = np.empty(roi.shape, dtype=np.uint16)
+        np.multiply(roi, sprite.inv[src], out=tmp)
+        tmp += sprite.premul[src]
+        tmp >>= 8
+        roi[:] = tmp
+
+    def line(self, text, scale, color, thickness=1):
+        """
+        Textzeile als ein Sprite, montiert aus Textstücken und Ziffern
+
+        Ziffernfolgen kommen aus einzeln gecachten Ziffern, der Rest als
+        ganze Textstücke; die fertige Zeile wird ebenfalls gecacht.
+        """
+        return self._get(("line", text, scale, color, thickness),
+                         lambda: self._assemble(text, scale, color, thickness))
+
+    def _assemble(self, text, scale, color, thickness):
+        pieces = []
+        x = 0
+        for run in _RUNS.findall(text):
+            for part in (run if run[0].isdigit() else (run,)):
+                sprite = self.text(part, scale, color, thickness)
+                pieces.append((sprite, x))
+                x += sprite.advance
+        if not pieces:
+            return self.text(text, scale, color, thickness)
+
+        x0 = min(px + sp.ox for sp, px in pieces)
+        y0 = min(sp.oy for sp, _ in pieces)
+        x1 = max(px + sp.ox + sp.alpha.shape[1] for sp, px in pieces)
+        y1 = max(sp.oy + sp.alpha.shape[0] for sp, _ in pieces)
+        # Deckkraft überlagern: 1 - Produkt der Transparenzen
+        clear = np.ones((y1 - y0, x1 - x0), dtype=np.float32)
+        for sp, px in pieces:
+            h, w = sp.alpha.shape
+            ax, ay = px + sp.ox - x0, sp.oy - y0
+            clear[ay:ay + h, ax:ax + w] *= 1.0 - sp.alpha
+        bgr = np.empty(clear.shape + (3,), dtype=np.uint8)
+        bgr[:] = color
+        return _sprite(bgr, 1.0 - clear, x0, y0, x)
+
+    def draw_text(self, canvas, text, org, scale, color, thickness=1):
+        """Wie cv2.putText(..., LINE_AA), aber aus Sprites (siehe line())"""
+        sprite = self.line(text, scale, color, thickness)
+        self.blit(canvas, sprite, org[0], org[1])
+        return org[0] + sprite.advance
+
+    def draw_cached(self, canvas, key, rect, draw):
+        """capture() + blit() an der ursprünglichen Position"""
+        self.blit(canvas, self.capture(key, rect, draw), 0, 0)
+
+    ############################
+    # STATISTIK
+    ############################
+
+    @contextmanager
+    def frame(self):
+        """Misst die HUD-Zeit eines Frames"""
+        t0 = time.monotonic()
+        try:
+            yield self
+        finally:
+            dt = time.monotonic() - t0
+            self.cost = dt if self.cost == 0.0 else 0.9 * self.cost + 0.1 * dt
+
+    def stats(self):
+        """
+        Returns:
+            (hits, misses, sprites, hud_ms)
+        """
+        return self.hits, self.misses, len(self._items), self.cost * 1000
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ablage der Fotos/Videos in Unterverzeichnissen pro Tag
+
+Bisher lagen alle Fotos in einem flachen Nachtsicht_Fotos und alle Videos
+in Nachtsicht_Videos. Auf vfat werden Suchen, Anlegen und Auflisten mit
+der Anzahl der Einträge linear langsamer. MediaLayout legt neue Dateien
+stattdessen in Nachtsicht_Fotos/YYYY-MM-DD/ ab, mit höchstens
+max_per_leaf Einträgen pro Verzeichnis (danach YYYY-MM-DD_2, _3 ...).
+Die Belegung wird pro Verzeichnis einmal gezählt und danach im Speicher
+mitgeführt.
+
+Resharder verschiebt ein bestehendes flaches Verzeichnis im Hintergrund
+in diese Struktur: in kleinen Blöcken mit Pause dazwischen, per rename
+(gleiches Dateisystem, keine Kopie), damit Aufnahmen nicht warten.
+
+Auch von Hand aufrufbar:
+
+    python -m nightcam.layout /media/usb/Nachtsicht_Fotos
+"""
+
+import os
+import sys
+import threading
+import time
+
+MEDIA_SUFFIXES = (".jpg", ".h264", ".mp4")
+
+
+def is_media(name):
+    """Foto/Video-Datei (keine Sidecar- oder versteckten Dateien)"""
+    return not name.startswith(".") and name.lower().endswith(MEDIA_SUFFIXES)
+
+
+class MediaLayout:
+    """
+    Wählt das Zielverzeichnis für neue Dateien
+
+    Verwendung:
+
+        layout = MediaLayout(sharded=True, max_per_leaf=1000)
+        leaf = layout.leaf(pdir)            # pdir/2026-10-17 (angelegt)
+        leaf = layout.leaf(pdir, mtime)     # Tag einer älteren Datei
+    """
+
+    def __init__(self, sharded=True, max_per_leaf=1000):
+        """
+        Args:
+            sharded: False = alles flach in base (bisheriges Verhalten)
+            max_per_leaf: höchstens so viele Einträge pro Tagesverzeichnis
+        """
+        self.sharded = sharded
+        self.max_per_leaf = max_per_leaf
+        self._lock = threading.Lock()   # Aufnahme und Resharder teilen sich die Zähler
+        self._counts = {}               # Pfad -> Einträge
+        self._current = {}              # (base, Tag) -> aktuelles Verzeichnis
+
+    def leaf(self, base, when=None):
+        """
+        Verzeichnis für eine neue Datei unter base (reserviert einen Platz)
+
+        Args:
+            base: Nachtsicht_Fotos bzw. Nachtsicht_Videos
+            when: Zeitpunkt (time.time()-Sekunden) für den Tag, Standard jetzt
+
+        Returns:
+            Pfad des (angelegten) Verzeichnisses
+        """
+        if not self.sharded:
+            return base
+        day = time.strftime("%Y-%m-%d", time.localtime(when))
+        with self._lock:
+            key = (base, day)
+            path = self._current.get(key)
+            if path is None or not os.path.isdir(path):
+                # Erster Zugriff (oder Stick gewechselt): ab _1 suchen
+                path = self._open(base, day, 1)
+            elif self._counts[path] >= self.max_per_leaf:
+                path = self._open(base, day, self._part(day, path) + 1)
+            self._counts[path] += 1
+            self._current[key] = path
+            return path
+
+    def _open(self, base, day, part):
+        """Erstes Verzeichnis ab `part` mit freiem Platz (legt es an)"""
+        while True:
+            name = day if part == 1 else f"{day}_{part}"
+            path = os.path.join(base, name)
+            os.makedirs(path, exist_ok=True)
+            with os.scandir(path) as entries:
+                count = sum(1 for _ in entries)
+            if count < self.max_per_leaf:
+                self._counts[path] = count
+                return path
+            part += 1
+
+    @staticmethod
+    def _part(day, path):
+        name = os.path.basename(path)
+        return 1 if name == day else int(name[len(day) + 1:])
+
+
+class Resharder(threading.Thread):
+    """
+    Verschiebt Dateien aus einem flachen Verzeichnis in Tagesverzeichnisse
+
+    Läuft in Blöcken von `batch` Dateien mit `pause` Sekunden dazwischen.
+    Der Tag einer Datei ist ihr Änderungszeitpunkt.
+    """
+
+    def __init__(self, base, layout, batch=50, pause=0.2):
+        super().__init__(name="reshard", daemon=True)
+        self.base = base
+        self.layout = layout
+        self.batch = batch
+        self.pause = pause
+        self._stop_event = threading.Event()
+
+        self.moved = 0
+        self.skipped = 0
+        self.total = 0
+
+    def run(self):
+        try:
+            with os.scandir(self.base) as entries:
+                names = [e.name for e in entries if e.is_file() and is_media(e.name)]
+        except OSError as e:
+            print(f"[LAYOUT] {self.base} nicht lesbar: {e}")
+            return
+        self.total = len(names)
+        if not names:
+            return
+        print(f"[LAYOUT] {self.base}: {len(names)} Dateien in Tagesverzeichnisse")
+
+        for start in range(0, len(names), self.batch):
+            if self._stop_event.is_set():
+                break
+            for name in names[start:start + self.batch]:
+                self._move(name)
+            if start + self.batch < len(names):
+                self._stop_event.wait(self.pause)   # Aufnahmen den Vortritt lassen
+        print(f"[LAYOUT] {self.base}: {self.moved} verschoben, {self.skipped} übersprungen")
+
+    def _move(self, name):
+        src = os.path.join(self.base, name)
+        try:
+            leaf = self.layout.leaf(self.base, os.stat(src).st_mtime)
+            dst = os.path.join(leaf, name)
+            if os.path.exists(dst):
+                self.skipped += 1
+                return
+            os.rename(src, dst)
+            self.moved += 1
+        except OSError:
+            self.skipped += 1   # z.B. gerade gelöscht oder Stick abgezogen
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("Verwendung: python -m nightcam.layout <Verzeichnis> [...]")
+        return 1
+    layout = MediaLayout()
+    for base in argv[1:]:
+        job = Resharder(base, layout, pause=0.0)
+        job.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fotos im Hintergrund speichern
+
+take_photo() hat Equalizing, JPEG-Kodierung und das Schreiben auf den
+Stick im Hauptthread erledigt; so lange standen Vorschau und Touch. Jetzt
+kopiert der Hauptthread nur das Graubild in einen Puffer aus einem festen
+Pool und reiht ihn ein. Ein kleiner Worker-Pool übernimmt Bearbeitung,
+cv2.imencode, Dateinamen und Schreiben.
+
+Die Warteschlange ist durch den Pool begrenzt: ist kein Puffer frei,
+liefert acquire() None und das Foto wird verworfen, statt den Hauptthread
+warten zu lassen. pending() zeigt den Rückstau fürs HUD. Dateinamen werden
+in Aufnahme-Reihenfolge vergeben, auch wenn mehrere Worker schreiben.
+"""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class PhotoWriter:
+    """
+    Worker-Pool für Fotos mit begrenzter Warteschlange
+
+    Verwendung:
+
+        writer = PhotoWriter(allocate=next_photo, process=equalize, workers=2)
+        buf = writer.acquire(gray.shape)
+        if buf is not None:
+            np.copyto(buf, gray)        # nur kopieren, Request freigeben
+            writer.submit(buf)
+    """
+
+    def __init__(self, allocate, process=None, on_saved=None, workers=2,
+                 max_pending=4, ext=".jpg", params=()):
+        """
+        Args:
+            allocate: Callback allocate() -> Pfad der neuen Datei (im Worker)
+            process: optionaler Callback process(buf), bearbeitet den Puffer an Ort und Stelle
+            on_saved: optionaler Callback on_saved(pfad, bytes), im Worker
+            workers: Anzahl Worker-Threads
+            max_pending: höchstens so viele Fotos eingereiht oder in Arbeit
+            ext, params: Format und Parameter für cv2.imencode
+        """
+        self.allocate = allocate
+        self.process = process
+        self.on_saved = on_saved
+        self.max_pending = max_pending
+        self.ext = ext
+        self.params = list(params)
+
+        self._cond = threading.Condition()
+        self._queue = deque()       # (Puffer, Ticket, Zeitpunkt submit)
+        self._pool = []
+        self._pool_shape = None
+        self._allocated = 0         # Puffer im Umlauf (Pool + unterwegs)
+        self._pending = 0           # eingereiht oder in Arbeit
+        self._ticket = 0            # nächste Nummer beim Einreihen
+        # Eigene Sperre für die Namensvergabe: allocate() schreibt die
+        # Sidecar-Datei und darf submit() nicht aufhalten
+        self._turn_cond = threading.Condition()
+        self._turn = 0              # Ticket, das als nächstes einen Namen bekommt
+        self._running = True
+
+        self.saved = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_seen = 0           # größter Rückstau
+        self.latency = 0.0          # gleitender Mittelwert submit -> gespeichert (s)
+
+        self._threads = [threading.Thread(target=self._run, name=f"photo{i}", daemon=True)
+                         for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    ############################
+    # HAUPTTHREAD
+    ############################
+
+    def acquire(self, shape):
+        """
+        Freier uint8 Puffer für ein Foto
+
+        Returns:
+            Puffer oder None, wenn max_pending Fotos unterwegs sind (verworfen)
+        """
+        with self._cond:
+            if self._pool_shape != shape:
+                # Andere Auflösung: alte Puffer verfallen bei der Rückgabe
+                self._pool_shape = shape
+                self._allocated -= len(self._pool)
+                self._pool = []
+            if self._pool:
+                return self._pool.pop()
+            if self._allocated < self.max_pending:
+                self._allocated += 1
+                return np.empty(shape, dtype=np.uint8)
+            self.dropped += 1
+            return None
+
+    def release(self, buf):
+        """Gibt einen nicht eingereichten Puffer zurück (z.B. nach Capture-Fehler)"""
+        with self._cond:
+            self._recycle(buf)
+
+    def _recycle(self, buf):
+        if buf.shape == self._pool_shape:
+            self._pool.append(buf)
+        else:
+            self._allocated -= 1    # Puffer der alten Auflösung verfällt
+
+    def submit(self, buf):
+        """Reiht einen Puffer aus acquire() ein (wartet nie)"""
+        with self._cond:
+            self._queue.append((buf, self._ticket, time.monotonic()))
+            self._ticket += 1
+            self._pending += 1
+            self.max_seen = max(self.max_seen, self._pending)
+            self._cond.notify()
+
+    def pending(self):
+        """Eingereihte oder gerade gespeicherte Fotos"""
+        return self._pending
+
+    def flush(self, timeout=None):
+        """
+        Wartet, bis alle eingereihten Fotos gespeichert sind
+
+        Returns:
+            True, wenn nichts mehr aussteht
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                wait = None if deadline is None else deadline - time.monotonic()
+                if wait is not None and wait <= 0:
+                    break
+                self._cond.wait(wait)
+            return self._pending == 0
+
+    def stop(self, timeout=5.0):
+        """Speichert ausstehende Fotos und beendet die Worker"""
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+
+    def stats(self):
+        """
+        Returns:
+            (gespeichert, verworfen, fehler, rückstau, max_rückstau, latenz_ms)
+        """
+        return (self.saved, self.dropped, self.errors, self._pending,
+                self.max_seen, self.latency * 1000)
+
+    ############################
+    # WORKER
+    ############################
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and self._running:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                buf, ticket, t0 = self._queue.popleft()
+            ok = False
+            try:
+                ok = self._save(buf, ticket, t0)
+            finally:
+                with self._cond:
+                    self._pending -= 1
+                    if ok:
+                        self.saved += 1
+                    else:
+                        self.errors += 1
+                    self._recycle(buf)
+                    self._cond.notify_all()
+
+    def _save(self, buf, ticket, t0):
+        try:
+            if self.process is not None:
+                self.process(buf)
+            ok, data = cv2.imencode(self.ext, buf, self.params)
+            if not ok:
+                raise ValueError(f"imencode {self.ext} fehlgeschlagen")
+        except Exception as e:
+            self._in_turn(ticket, None)
+            print(f"[FOTO] ERROR Kodierung: {e}")
+            return False
+
+        path = None
+        try:
+            path = self._in_turn(ticket, self.allocate)
+            with open(path, "wb") as f:
+                f.write(data)
+        except Exception as e:
+            print(f"[FOTO] ERROR {path or 'Dateiname'}: {e}")
+            return False
+
+        dt = time.monotonic() - t0
+        self.latency = dt if self.latency == 0.0 else 0.9 * self.latency + 0.1 * dt
+        if self.on_saved is not None:
+            try:
+                self.on_saved(path, len(data))
+            except Exception as e:
+                print(f"[FOTO] on_saved: {e}")
+        return True
+
+    def _in_turn(self, ticket, fn):
+        """Ruft fn() in Aufnahme-Reihenfolge auf (wartet auf ältere Tickets)"""
+        with self._turn_cond:
+            while self._turn != ticket:
+                self._turn_cond.wait()
+            try:
+                return fn() if fn is not None else None
+            finally:
+                self._turn += 1
+                self._turn_cond.notify_all()
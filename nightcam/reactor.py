@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ereignisgesteuerte Hauptschleife
+
+Statt Touch, PTY und Kamera reihum abzufragen und dazwischen fest zu
+schlafen, wartet der Reactor per selectors (epoll unter Linux) auf alle
+Deskriptoren gleichzeitig und ruft nur die Callbacks auf, die etwas zu tun
+haben. Zeitabhängiges (Doppeltap-Fenster, Halten zum Ausschalten, FPS-Log)
+läuft über benannte Timer, die das Warte-Timeout bestimmen. Andere Threads
+(z.B. der Kamera-Thread von Picamera2) wecken die Schleife über ein
+Waker-eventfd.
+"""
+
+import os
+import selectors
+import time
+
+
+class Waker:
+    """Thread-sicheres Wecken des Reactors über ein eventfd (sonst eine Pipe)"""
+
+    def __init__(self):
+        if hasattr(os, "eventfd"):
+            self._rfd = self._wfd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        else:
+            self._rfd, self._wfd = os.pipe()
+            os.set_blocking(self._rfd, False)
+            os.set_blocking(self._wfd, False)
+
+    def fileno(self):
+        return self._rfd
+
+    def signal(self):
+        """Weckt den Reactor (aus beliebigem Thread)"""
+        try:
+            os.write(self._wfd, (1).to_bytes(8, "little"))
+        except BlockingIOError:
+            pass    # Zähler/Pipe voll: ist ohnehin schon geweckt
+
+    def clear(self):
+        """Setzt das Signal zurück"""
+        try:
+            while os.read(self._rfd, 4096):
+                if self._rfd == self._wfd:
+                    break   # eventfd liefert den Zähler auf einmal
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        os.close(self._rfd)
+        if self._wfd != self._rfd:
+            os.close(self._wfd)
+
+
+class Reactor:
+    """
+    Wartet auf Deskriptoren und Timer, ruft die passenden Callbacks auf
+
+    Verwendung:
+
+        reactor = Reactor()
+        reactor.add_reader(touch_fd, on_touch)
+        camera = reactor.waker(on_camera)       # camera.signal() aus anderem Thread
+        reactor.set_timer("perf", 5.0, log_perf)
+        while True:
+            ...
+            reactor.run_once(timeout)
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """
+        Args:
+            clock: Zeitquelle (für Tests austauschbar)
+        """
+        self.clock = clock
+        self._selector = selectors.DefaultSelector()
+        self._timers = {}       # Name -> (Zeitpunkt, Callback)
+        self._wakers = []
+
+        self.wakeups = 0        # Rückkehr aus dem Warten seit stats()
+        self.dispatched = 0     # aufgerufene Callbacks seit stats()
+        self.wait_time = 0.0    # Zeit im Warten seit stats()
+        self._stats_since = clock()
+
+    ############################
+    # DESKRIPTOREN
+    ############################
+
+    def add_reader(self, fd, callback):
+        """callback() läuft, sobald fd lesbar ist (Level-getriggert)"""
+        self._selector.register(fd, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, fd):
+        """Entfernt fd (auch wenn er inzwischen geschlossen wurde)"""
+        try:
+            self._selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def has_reader(self, fd):
+        try:
+            self._selector.get_key(fd)
+            return True
+        except (KeyError, ValueError):
+            return False
+
+    def waker(self, callback):
+        """
+        Waker für andere Threads; callback() läuft im Reactor nach signal()
+
+        Returns:
+            Waker (signal() ist thread-sicher)
+        """
+        waker = Waker()
+
+        def on_signal():
+            waker.clear()
+            callback()
+
+        self.add_reader(waker.fileno(), on_signal)
+        self._wakers.append(waker)
+        return waker
+
+    ############################
+    # TIMER
+    ############################
+
+    def set_timer(self, name, delay, callback):
+        """Setzt (oder ersetzt) den Timer `name`: callback() nach delay Sekunden"""
+        self._timers[name] = (self.clock() + max(0.0, delay), callback)
+
+    def cancel_timer(self, name):
+        self._timers.pop(name, None)
+
+    def timer_pending(self, name):
+        return name in self._timers
+
+    def _next_deadline(self):
+        if not self._timers:
+            return None
+        return min(when for when, _ in self._timers.values())
+
+    ############################
+    # SCHLEIFE
+    ############################
+
+    def run_once(self, timeout=None):
+        """
+        Wartet auf das nächste Ereignis und arbeitet alles Fällige ab
+
+        Args:
+            timeout: längste Wartezeit in Sekunden (None = bis zum nächsten
+                     Ereignis oder Timer, 0 = nur abfragen)
+
+        Returns:
+            Anzahl aufgerufener Callbacks
+        """
+        deadline = self._next_deadline()
+        if deadline is not None:
+            until_timer = max(0.0, deadline - self.clock())
+            timeout = until_timer if timeout is None else min(timeout, until_timer)
+
+        t0 = self.clock()
+        events = self._selector.select(timeout)
+        now = self.clock()
+        self.wait_time += now - t0
+        self.wakeups += 1
+
+        count = 0
+        for key, _ in events:
+            key.data()
+            count += 1
+
+        # Fällige Timer (einmalig; Callbacks dürfen sich neu setzen)
+        due = [name for name, (when, _) in self._timers.items() if when <= now]
+        for name in due:
+            entry = self._timers.get(name)
+            if entry is not None and entry[0] <= now:
+                del self._timers[name]
+                entry[1]()
+                count += 1
+
+        self.dispatched += count
+        return count
+
+    def stats(self):
+        """
+        Returns:
+            (wakeups_per_sec, callbacks_per_sec, idle_percent) seit der letzten Abfrage
+        """
+        now = self.clock()
+        dt = max(now - self._stats_since, 1e-9)
+        result = (self.wakeups / dt, self.dispatched / dt, 100.0 * self.wait_time / dt)
+        self.wakeups = self.dispatched = 0
+        self.wait_time = 0.0
+        self._stats_since = now
+        return result
+
+    def close(self):
+        for waker in self._wakers:
+            self.remove_reader(waker.fileno())
+            waker.close()
+        self._wakers.clear()
+        self._selector.close()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fortlaufende Dateinummern ohne Verzeichnis-Scan
+
+next_photo()/next_video() haben pro Aufnahme das ganze Zielverzeichnis
+per glob gelesen und jeden Namen geparst, um die höchste Nummer zu finden.
+Auf einem FAT32-Stick mit tausenden Fotos ist das ein linearer Scan pro
+Tap. SequenceAllocator hält die nächste Nummer im Speicher und legt sie
+atomar (Temp-Datei + rename) in einer kleinen Sidecar-Datei im
+Verzeichnis ab. Gescannt wird nur einmal pro Verzeichnis: beim ersten
+Zugriff (Start, neuer Mount, anderer Stick) wird die Sidecar-Nummer mit dem
+Bestand abgeglichen, max(Sidecar, höchste Nummer + 1). So fällt eine
+veraltete Sidecar (z.B. nach Hot-Unplug nicht mehr geschrieben) auch dann
+auf, wenn die Nummern in anderen Tagesverzeichnissen liegen. Danach wird vor
+jeder Vergabe nur noch die eine Zieldatei geprüft.
+
+Bei Unterverzeichnissen pro Tag (siehe nightcam/layout.py) bleibt die
+Sidecar-Datei im Hauptverzeichnis, die Datei landet im übergebenen
+Unterverzeichnis, und der Abgleich liest auch die Unterverzeichnisse.
+"""
+
+import os
+import re
+
+
+class SequenceAllocator:
+    """
+    Vergibt Dateinamen <prefix><n><suffix> in einem Verzeichnis
+
+    Verwendung:
+
+        photos = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        path = photos.next_path(pdir)       # .../Nachtsicht_Foto17.jpg
+        path = photos.next_path(pdir, leaf) # leaf/Nachtsicht_Foto18.jpg
+    """
+
+    def __init__(self, prefix, suffix):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.sidecar_name = f".{prefix}.seq"
+        self._pattern = re.compile(re.escape(prefix) + r"(\d+)" + re.escape(suffix) + "$")
+
+        self._directory = None
+        self._identity = None   # (st_dev, st_ino) des Verzeichnisses
+        self._next = 1
+
+        self.scans = 0          # vollständige Verzeichnis-Scans (Statistik)
+
+    def next_path(self, directory, leaf=None):
+        """
+        Reserviert die nächste Nummer im Verzeichnis
+
+        Args:
+            directory: Verzeichnis der Nummernfolge (enthält die Sidecar-Datei)
+            leaf: Zielverzeichnis der Datei (Unterverzeichnis, Standard: directory)
+
+        Returns:
+            Pfad der neuen Datei (existiert noch nicht)
+        """
+        leaf = leaf or directory
+        st = os.stat(directory)
+        identity = (st.st_dev, st.st_ino)
+        if directory != self._directory or identity != self._identity:
+            # Neues Verzeichnis, neu gemountet oder anderer Stick: Sidecar
+            # mit allen Unterverzeichnissen abgleichen
+            self._directory = directory
+            self._identity = identity
+            self._next = max(self._load(directory), self._scan(directory))
+
+        path = self._path(leaf, self._next)
+        if os.path.exists(path):
+            # Seit dem Abgleich fremde Dateien dazugekommen: neu abgleichen
+            self._next = self._scan(directory)
+            path = self._path(leaf, self._next)
+        self._next += 1
+        self._store(directory, self._next)
+        return path
+
+    def _path(self, directory, n):
+        return os.path.join(directory, f"{self.prefix}{n}{self.suffix}")
+
+    def _load(self, directory):
+        """Nummer aus der Sidecar-Datei (1, wenn sie fehlt oder kaputt ist)"""
+        try:
+            with open(os.path.join(directory, self.sidecar_name)) as f:
+                return max(1, int(f.read().strip()))
+        except (OSError, ValueError):
+            return 1
+
+    def _scan(self, directory):
+        """Höchste vorhandene Nummer + 1 (einmaliger Scan, eine Ebene tief)"""
+        self.scans += 1
+        n = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir() and not entry.name.startswith("."):
+                    n = max(n, self._max_in(entry.path))
+                else:
+                    m = self._pattern.match(entry.name)
+                    if m:
+                        n = max(n, int(m.group(1)))
+        return n + 1
+
+    def _max_in(self, directory):
+        n = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    m = self._pattern.match(entry.name)
+                    if m:
+                        n = max(n, int(m.group(1)))
+        except OSError:
+            pass
+        return n
+
+    def _store(self, directory, n):
+        sidecar = os.path.join(directory, self.sidecar_name)
+        tmp = sidecar + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(f"{n}\n")
+            os.replace(tmp, sidecar)
+        except OSError as e:
+            # Nummer bleibt im Speicher gültig; beim nächsten Mount wird gescannt
+            print(f"[SEQ] Sidecar nicht geschrieben: {e}")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Speicher-Überwachung im Hintergrund
+
+Bisher hat die Hauptschleife pro Frame nach dem USB-Stick gesucht
+(exists/ismount/scandir) und im schlimmsten Fall direkt `sudo mount` plus
+0,5 s Pause ausgeführt. StorageMonitor erledigt das in eigenem Thread:
+Mount-Änderungen meldet der Kernel über POLLPRI auf /proc/self/mountinfo,
+das Erscheinen/Verschwinden des Block-Device wird einmal pro Sekunde
+geprüft, freier Platz alle paar Sekunden. Ergebnis ist ein unveränderlicher
+StorageSnapshot, den die Oberfläche ohne Systemaufruf liest. Auto-Mount
+läuft nur noch in diesem Thread.
+"""
+
+import os
+import re
+import select
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from nightcam.reactor import Waker
+
+MOUNTINFO = "/proc/self/mountinfo"
+_OCTAL = re.compile(r"\\([0-7]{3})")
+
+# Zustand des Speichers:
+#   root            Verzeichnis für Fotos/Videos (USB-Mountpoint oder Fallback)
+#   usb             USB-Mountpoint oder None
+#   device_present  Block-Device des Sticks ist vorhanden
+#   free_bytes      freier Platz unter root
+#   time            Zeitpunkt der Messung (time.monotonic)
+StorageSnapshot = namedtuple("StorageSnapshot", "root usb device_present free_bytes time")
+
+
+def _unescape(path):
+    """mountinfo kodiert Leerzeichen usw. oktal (\\040)"""
+    return _OCTAL.sub(lambda m: chr(int(m.group(1), 8)), path)
+
+
+def parse_mountpoints(text):
+    """
+    Mountpoints aus dem Inhalt von /proc/self/mountinfo
+
+    Returns:
+        Liste der Mountpoints (5. Feld) in Dateireihenfolge
+    """
+    mounts = []
+    for line in text.splitlines():
+        fields = line.split(" ", 5)
+        if len(fields) >= 5:
+            mounts.append(_unescape(fields[4]))
+    return mounts
+
+
+def find_usb_mount(mounts, base_paths):
+    """Erster Mountpoint "<base>/usb*" in der Reihenfolge von base_paths"""
+    for base in base_paths:
+        for mount in mounts:
+            if os.path.dirname(mount) == base and os.path.basename(mount).startswith("usb"):
+                return mount
+    return None
+
+
+class StorageMonitor(threading.Thread):
+    """
+    Beobachtet USB-Stick und freien Platz, veröffentlicht StorageSnapshot
+
+    Verwendung:
+
+        storage = StorageMonitor(fallback=os.path.expanduser("~"))
+        storage.start()
+        snap = storage.snapshot             # jederzeit, ohne Systemaufruf
+        storage.suppress_automount()        # nach manuellem Unmount
+        storage.refresh()                   # z.B. nach dem Speichern eines Fotos
+        storage.stop()
+    """
+
+    def __init__(self, fallback, usb_dev="/dev/sda1", mount_target="/media/usb",
+                 base_paths=("/media/valentin", "/media/pi", "/media"),
+                 auto_mount=True, device_interval=1.0, free_interval=2.0,
+                 mountinfo=MOUNTINFO, notify=None):
+        """
+        Args:
+            fallback: Speicherort ohne USB-Stick
+            usb_dev: Block-Device des Sticks
+            mount_target: Ziel für Auto-Mount
+            base_paths: Verzeichnisse, unter denen "usb*"-Mountpoints zählen
+            auto_mount: Stick automatisch einhängen, wenn vorhanden
+            device_interval: Sekunden zwischen Prüfungen des Block-Device
+            free_interval: Sekunden zwischen Messungen des freien Platzes
+            mountinfo: Pfad der mountinfo-Datei (für Tests austauschbar)
+            notify: wird (im Monitor-Thread) nach einem geänderten Snapshot aufgerufen
+        """
+        super().__init__(name="storage", daemon=True)
+        self.fallback = fallback
+        self.usb_dev = usb_dev
+        self.mount_target = mount_target
+        self.base_paths = tuple(base_paths)
+        self.auto_mount = auto_mount
+        self.device_interval = device_interval
+        self.free_interval = free_interval
+        self.mountinfo = mountinfo
+        self._notify = notify
+
+        self._waker = Waker()
+        self._running = True
+        self._manual_unmount = False    # kein Auto-Mount bis der Stick entfernt wurde
+        self._mount_failed = False      # Auto-Mount erst nach neuem Einstecken erneut
+
+        self.mount_events = 0           # POLLPRI auf mountinfo seit stats()
+        self.updates = 0                # neue Snapshots seit stats()
+
+        self._usb = self._scan_mounts()
+        self.snapshot = self._measure(self._usb, os.path.exists(self.usb_dev))
+
+    ############################
+    # OBERFLÄCHEN-SEITE
+    ############################
+
+    def suppress_automount(self):
+        """Nach manuellem Unmount: nicht wieder einhängen, bis der Stick entfernt wurde"""
+        self._manual_unmount = True
+        self._waker.signal()
+
+    def refresh(self):
+        """Freien Platz und Mounts bald neu messen (z.B. nach dem Speichern)"""
+        self._waker.signal()
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        self._waker.signal()
+        if self.is_alive():
+            self.join(timeout)
+        self._waker.close()
+
+    def stats(self):
+        """
+        Returns:
+            (mount_events, updates) seit der letzten Abfrage
+        """
+        result = (self.mount_events, self.updates)
+        self.mount_events = self.updates = 0
+        return result
+
+    ############################
+    # MONITOR-THREAD
+    ############################
+
+    def run(self):
+        poller = select.poll()
+        try:
+            mount_fd = os.open(self.mountinfo, os.O_RDONLY)
+            poller.register(mount_fd, select.POLLPRI | select.POLLERR)
+        except OSError as e:
+            print(f"[STORAGE] {self.mountinfo} nicht lesbar: {e}")
+            mount_fd = None
+        poller.register(self._waker.fileno(), select.POLLIN)
+
+        next_free = time.monotonic() + self.free_interval
+        try:
+            while self._running:
+                wait = min(self.device_interval, max(0.0, next_free - time.monotonic()))
+                events = poller.poll(wait * 1000)
+                if not self._running:
+                    break
+
+                mounts_changed = False
+                for fd, _ in events:
+                    if fd == mount_fd:
+                        self.mount_events += 1
+                        mounts_changed = True
+                    else:
+                        self._waker.clear()
+                        mounts_changed = True   # refresh(): alles neu
+
+                now = time.monotonic()
+                if self.update(rescan=mounts_changed or mount_fd is None,
+                               remeasure=now >= next_free or mounts_changed):
+                    next_free = time.monotonic() + self.free_interval
+        finally:
+            if mount_fd is not None:
+                os.close(mount_fd)
+
+    def update(self, rescan=True, remeasure=True):
+        """
+        Ein Prüfschritt (läuft im Monitor-Thread; in Tests direkt aufrufbar)
+
+        Args:
+            rescan: mountinfo neu lesen
+            remeasure: freien Platz neu messen
+
+        Returns:
+            True wenn der freie Platz neu gemessen wurde
+        """
+        present = os.path.exists(self.usb_dev)
+        if not present:
+            if self._manual_unmount:
+                print("[USB] Device entfernt, Auto-Mount wieder aktiviert")
+            self._manual_unmount = False
+            self._mount_failed = False
+
+        if rescan:
+            usb = self._scan_mounts()
+            if self._usb is not None and usb is None:
+                print(f"[USB] Hot-Unplug erkannt: {self._usb} nicht mehr gemountet")
+            self._usb = usb
+
+        if (present and self._usb is None and self.auto_mount
+                and not self._manual_unmount and not self._mount_failed):
+            # Eingehängt sieht man am nächsten POLLPRI
+            self._mount_failed = not self._mount()
+
+        old = self.snapshot
+        changed = (self._usb != old.usb or present != old.device_present)
+        if not (changed or remeasure):
+            return False
+        snapshot = self._measure(self._usb, present)
+        self.snapshot = snapshot
+        if snapshot[:4] != old[:4]:
+            self.updates += 1
+            if self._notify is not None:
+                self._notify()
+        return True
+
+    def _scan_mounts(self):
+        try:
+            with open(self.mountinfo) as f:
+                return find_usb_mount(parse_mountpoints(f.read()), self.base_paths)
+        except OSError:
+            return None
+
+    def _measure(self, usb, present):
+        root = usb or self.fallback
+        try:
+            st = os.statvfs(root)
+            free = st.f_bavail * st.f_frsize
+        except OSError:
+            free = 0
+        return StorageSnapshot(root, usb, present, free, time.monotonic())
+
+    def _mount(self):
+        print(f"[USB] {self.usb_dev} gefunden aber nicht gemountet")
+        try:
+            os.makedirs(self.mount_target, exist_ok=True)
+            # Mount mit User-Rechten (uid/gid vom aktuellen User)
+            uid = os.getuid()
+            gid = os.getgid()
+            subprocess.run(["sudo", "mount", "-o", f"uid={uid},gid={gid},umask=000",
+                            self.usb_dev, self.mount_target], check=True, timeout=5)
+            print(f"[USB] Auto-Mount erfolgreich: {self.mount_target}")
+            return True
+        except Exception as e:
+            print(f"[USB] Auto-Mount fehlgeschlagen: {e}")
+            return False
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für die Kamera-Konfiguration
+Prüft YUV420-Modus, BGR-Fallback, Luma-Extraktion und Request-Capture
+(synchron und asynchron, ohne Kamera)
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import cv2
+import numpy as np
+from nightcam.camera import configure_camera, luma, stream_sizes, RequestCapture
+
+
+class FakePicamera2:
+    """Minimaler Ersatz für Picamera2 (nur Konfiguration)"""
+
+    def __init__(self, reject_yuv=False, reject_lores=False):
+        self.reject_yuv = reject_yuv
+        self.reject_lores = reject_lores
+        self.configured = None
+
+    def _make(self, use_case, main, lores=None, controls=None):
+        if self.reject_yuv and main.get("format") == "YUV420":
+            raise RuntimeError("format not supported")
+        if self.reject_lores and lores is not None:
+            raise RuntimeError("lores not supported")
+        config = {"use_case": use_case, "main": dict(main), "controls": controls}
+        if lores is not None:
+            config["lores"] = dict(lores)
+        return config
+
+    def create_preview_configuration(self, main, lores=None, controls=None):
+        return self._make("preview", main, lores, controls)
+
+    def create_video_configuration(self, main, lores=None, controls=None):
+        return self._make("video", main, lores, controls)
+
+    def align_configuration(self, config):
+        # Wie libcamera: Breite auf Vielfaches von 32 aufrunden
+        for name in ("main", "lores"):
+            if name in config:
+                w, h = config[name]["size"]
+                config[name]["size"] = ((w + 31) // 32 * 32, h)
+
+    def configure(self, config):
+        self.configured = config
+
+
+class FakeRequest:
+    """Request mit einem Puffer pro Stream"""
+
+    def __init__(self, owner, buffers):
+        self.owner = owner
+        self.buffers = buffers
+        self.released = False
+
+    def release(self):
+        assert not self.released, "Request doppelt freigegeben"
+        self.released = True
+        self.owner.outstanding -= 1
+
+
+class FakeMappedArray:
+    """Wie picamera2.MappedArray: Array direkt auf dem Request-Puffer"""
+
+    def __init__(self, request, stream, write=True):
+        self.request = request
+        self.stream = stream
+
+    def __enter__(self):
+        self.array = self.request.buffers[self.stream]
+        return self
+
+    def __exit__(self, *exc):
+        self.array = None
+
+
+class FakeRequestCamera:
+    """Liefert Requests aus einem festen Pufferpool (wie libcamera)"""
+
+    def __init__(self, buffers=4, fail=False):
+        self.pool = [{"main": np.full((6, 8), i, dtype=np.uint8)} for i in range(buffers)]
+        self.count = 0
+        self.outstanding = 0
+        self.fail = fail
+
+    def capture_request(self, wait=None, signal_function=None):
+        if self.fail:
+            raise RuntimeError("camera stopped")
+        assert self.outstanding < len(self.pool), "Kamera ohne freie Puffer"
+        buffers = self.pool[self.count % len(self.pool)]
+        self.count += 1
+        self.outstanding += 1
+        request = FakeRequest(self, buffers)
+        if wait is not False:
+            return request
+        # Wie Picamera2: Job, fertig wird er im Kamera-Thread
+        job = {"request": request, "done": threading.Event()}
+
+        def complete():
+            time.sleep(0.01)
+            job["done"].set()
+            signal_function(job)
+
+        threading.Thread(target=complete, daemon=True).start()
+        return job
+
+    def wait(self, job):
+        assert job["done"].wait(1.0), "Job nicht fertig"
+        return job["request"]
+
+
+def test_configure_yuv():
+    """Test: YUV-Modus konfiguriert YUV420-Hauptstream"""
+    print("[TEST] YUV420-Konfiguration...")
+
+    cam = FakePicamera2()
+    setup = configure_camera(cam, "yuv", (640, 480), controls={"AeEnable": True}, video=True)
+    assert setup.mode == "yuv"
+    assert setup.preview_stream == "main"
+    assert setup.preview_size == setup.main_size == (640, 480)
+    assert cam.configured["main"] == {"size": (640, 480), "format": "YUV420"}
+    assert cam.configured["use_case"] == "video"
+    print("  ✓ YUV420 aktiv")
+
+
+def test_configure_fallback():
+    """Test: Abgelehnter YUV-Modus fällt auf BGR zurück"""
+    print("[TEST] BGR-Fallback...")
+
+    cam = FakePicamera2(reject_yuv=True)
+    setup = configure_camera(cam, "yuv", (640, 480))
+    assert setup.mode == "bgr" and setup.main_mode == "bgr"
+    assert cam.configured["main"] == {"size": (640, 480)}
+
+    setup = configure_camera(FakePicamera2(), "bgr", (640, 480))
+    assert setup.mode == "bgr"
+
+    setup = configure_camera(FakePicamera2(reject_lores=True), "lores", (640, 480),
+                             panel_size=(480, 320))
+    assert setup.mode == "yuv", "lores-Fehler sollte auf YUV zurückfallen"
+    setup = configure_camera(FakePicamera2(), "lores", (640, 480))
+    assert setup.mode == "yuv", "lores ohne Display-Größe sollte auf YUV zurückfallen"
+    print("  ✓ Fallback-Kette lores -> yuv -> bgr")
+
+
+def test_configure_lores():
+    """Test: lores-Stream in Display-Größe, main für Video/Foto"""
+    print("[TEST] lores-Konfiguration...")
+
+    assert stream_sizes((480, 320)) == ((960, 640), (480, 320))
+    assert stream_sizes((321, 241), main_scale=1) == ((320, 240), (320, 240))
+
+    cam = FakePicamera2()
+    setup = configure_camera(cam, "lores", (640, 480), video=True, panel_size=(480, 320))
+    assert setup.mode == "lores"
+    assert setup.preview_stream == "lores"
+    assert setup.main_mode == "yuv"
+    assert cam.configured["lores"]["format"] == "YUV420"
+    assert cam.configured["main"]["size"] == setup.main_size == (960, 640)
+    # Ausgerichtete Größe wird übernommen (480 -> 480, da schon Vielfaches von 32)
+    assert setup.preview_size == (480, 320)
+
+    setup = configure_camera(FakePicamera2(), "lores", (640, 480), panel_size=(470, 320))
+    assert setup.preview_size == (480, 320), "Ausgerichtete lores-Größe sollte zurückkommen"
+    print("  ✓ lores aus Display-Geometrie abgeleitet")
+
+
+def test_luma_yuv_is_view():
+    """Test: Y-Ebene ist ein Slice ohne Kopie"""
+    print("[TEST] Luma aus YUV420...")
+
+    w, h = 640, 480
+    bgr = np.random.randint(0, 256, (h, w, 3), dtype=np.uint8)
+    yuv = cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420)  # (h*3/2) x w
+    y = luma(yuv, "yuv", (w, h))
+    assert y.shape == (h, w)
+    assert np.shares_memory(y, yuv), "Y-Ebene sollte ohne Kopie kommen"
+    assert np.array_equal(y, yuv[:h])
+
+    # Gepolsterte Zeilen (Stride > Breite)
+    padded = np.zeros((h * 3 // 2, w + 64), dtype=np.uint8)
+    padded[:, :w] = yuv
+    assert np.array_equal(luma(padded, "yuv", (w, h)), yuv[:h])
+    print("  ✓ Y-Ebene als View, auch mit Stride")
+
+
+def test_luma_bgr():
+    """Test: BGR-Pfad entspricht cvtColor"""
+    print("[TEST] Luma aus BGR...")
+
+    bgr = np.random.randint(0, 256, (480, 640, 3), dtype=np.uint8)
+    dst = np.empty((480, 640), dtype=np.uint8)
+    gray = luma(bgr, "bgr", (640, 480), dst=dst)
+    assert gray is dst
+    assert np.array_equal(gray, cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY))
+    print("  ✓ BGR-Pfad unverändert")
+
+
+def test_request_capture_zero_copy():
+    """Test: Frame liegt im Request-Puffer, Freigabe nach dem with-Block"""
+    print("[TEST] Request-Capture...")
+
+    picam = FakeRequestCamera()
+    capture = RequestCapture(picam, max_inflight=2, mapped_array=FakeMappedArray)
+    enh = np.empty((6, 8), dtype=np.uint8)
+    for i in range(10):
+        with capture.frame("main") as frame:
+            assert frame is picam.pool[i % 4]["main"], "Frame sollte ohne Kopie kommen"
+            assert picam.outstanding == 1
+            gray = luma(frame, "yuv", (8, 6))
+            cv2.equalizeHist(gray, dst=enh)
+        assert picam.outstanding == 0, "Request sollte sofort freigegeben sein"
+
+    held, peak, hold_ms, waits = capture.stats()
+    assert (held, peak, waits) == (0, 1, 0)
+    assert hold_ms >= 0.0
+
+    # Auch bei Fehlern im Block wird freigegeben
+    try:
+        with capture.frame("main"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert picam.outstanding == 0 and capture.held == 0
+
+    # Fehler in capture_request() gibt den Platz wieder frei
+    capture = RequestCapture(FakeRequestCamera(fail=True), max_inflight=1,
+                             mapped_array=FakeMappedArray)
+    for _ in range(2):
+        try:
+            with capture.frame("main"):
+                pass
+        except RuntimeError:
+            pass
+    assert capture.held == 0 and capture.waits == 0
+    print("  ✓ Zero-Copy, Freigabe auch bei Fehlern")
+
+
+def test_request_capture_bounded():
+    """Test: Nicht mehr als max_inflight Requests gleichzeitig"""
+    print("[TEST] Request-Limit...")
+
+    picam = FakeRequestCamera(buffers=4)
+    capture = RequestCapture(picam, max_inflight=2, mapped_array=FakeMappedArray)
+    r1 = capture.acquire()
+    r2 = capture.acquire()
+    assert capture.held == 2
+
+    got = []
+    t = threading.Thread(target=lambda: got.append(capture.acquire()))
+    t.start()
+    time.sleep(0.05)
+    assert not got, "Dritter Request sollte warten"
+    capture.release(*r1)
+    t.join(1.0)
+    assert got and capture.waits == 1
+
+    capture.release(*r2)
+    capture.release(*got[0])
+    held, peak, hold_ms, waits = capture.stats()
+    assert (held, peak, waits) == (0, 2, 1)
+    assert hold_ms > 0.0
+    assert capture.stats()[1] == 0, "Maximum sollte nach Abfrage zurückgesetzt sein"
+    print("  ✓ Limit eingehalten, Wartezeit sichtbar")
+
+
+def test_request_capture_async():
+    """Test: start_async() kehrt sofort zurück, Signal kommt aus dem Kamera-Thread"""
+    print("[TEST] Asynchroner Request...")
+
+    picam = FakeRequestCamera(buffers=4)
+    capture = RequestCapture(picam, max_inflight=2, mapped_array=FakeMappedArray)
+    signalled = threading.Event()
+    job = capture.start_async(signalled.set)
+    assert job is not None and not signalled.is_set(), "Sollte nicht warten"
+    assert signalled.wait(1.0)
+
+    with capture.finish_async(job) as frame:
+        assert frame is picam.pool[0]["main"]
+        assert capture.held == 1
+    assert picam.outstanding == 0 and capture.held == 0
+
+    # Limit erreicht: kein Blockieren, sondern None
+    jobs = [capture.start_async(lambda: None) for _ in range(3)]
+    assert jobs[2] is None and capture.waits == 1
+    for job in jobs[:2]:
+        with capture.finish_async(job):
+            pass
+    assert picam.outstanding == 0
+    assert capture.start_async(lambda: None) is not None, "Plätze wieder frei"
+    print("  ✓ Nicht blockierend, Freigabe nach finish_async()")
+
+
+def main():
+    print("=" * 50)
+    print("KAMERA TEST")
+    print("=" * 50)
+
+    test_configure_yuv()
+    test_configure_fallback()
+    test_configure_lores()
+    test_luma_yuv_is_view()
+    test_luma_bgr()
+    test_request_capture_zero_copy()
+    test_request_capture_bounded()
+    test_request_capture_async()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
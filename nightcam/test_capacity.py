@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für die Kapazitätsschätzung
+Prüft gelernte Foto-/Videogrößen, Persistenz pro Speicherort, den
+freien Platz aus geschriebenen Bytes und misst estimate() pro Aufruf
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from nightcam.capacity import CapacityModel, STATS_FILE
+from nightcam.storage import StorageSnapshot
+
+MB = 1024 * 1024
+
+
+def _snapshot(root, free_bytes, t=None):
+    t = time.monotonic() if t is None else t
+    return StorageSnapshot(root, None, False, free_bytes, t)
+
+
+def test_learned_sizes():
+    """Test: Startwerte werden durch gemessene Größen ersetzt"""
+    print("[TEST] Gelernte Größen...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = CapacityModel(photo_bytes=500_000, video_bps=0.5 * MB)
+        snap = _snapshot(tmp, 100 * MB)
+        assert model.estimate(snap) == (209, 3)
+
+        for _ in range(5):
+            model.record_photo(tmp, 100_000)
+        model.record_video(tmp, 60 * MB, 60.0)
+        photo_bytes, video_bps, n_photos, n_videos = model.rates(tmp)
+        assert photo_bytes == 100_000 and n_photos == 5
+        assert video_bps == MB and n_videos == 1
+        print("  ✓ Erster Messwert ersetzt den Startwert")
+
+        # Gleitendes Mittel über die letzten `window` Werte
+        model = CapacityModel(photo_bytes=500_000, video_bps=MB, window=4, save_every=100)
+        for size in (100, 100, 100, 100, 500, 500, 500, 500, 500, 500, 500, 500):
+            model.record_photo(tmp + "/x", size)
+        assert 450 < model.rates(tmp + "/x")[0] <= 500
+        print("  ✓ Gleitendes Mittel folgt neuen Größen")
+
+
+def test_persistence():
+    """Test: Statistik pro Speicherort überlebt einen Neustart"""
+    print("[TEST] Persistenz...")
+
+    with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+        model = CapacityModel(photo_bytes=500_000, video_bps=MB, save_every=3)
+        model.record_photo(a, 80_000)
+        model.record_photo(a, 80_000)
+        assert not os.path.exists(os.path.join(a, STATS_FILE))
+        model.record_photo(a, 80_000)
+        assert os.path.exists(os.path.join(a, STATS_FILE))
+        model.record_photo(b, 200_000)
+        model.save()
+        print("  ✓ Gespeichert alle save_every Fotos und bei save()")
+
+        model = CapacityModel(photo_bytes=500_000, video_bps=MB)
+        model.load(a)   # wie im Storage-Thread beim Wechsel des Speicherorts
+        os.remove(os.path.join(a, STATS_FILE))
+        model.load(a)   # schon geladen: kein zweites Lesen
+        assert model.rates(a)[0] == 80_000 and model.rates(a)[2] == 3
+        assert model.rates(b)[0] == 200_000
+        print("  ✓ Neustart liest die Werte pro Speicherort (einmal, per load())")
+
+        with open(os.path.join(a, STATS_FILE), "w") as f:
+            f.write("{kaputt")
+        model = CapacityModel(photo_bytes=500_000, video_bps=MB)
+        assert model.rates(a) == (500_000, MB, 0, 0)
+        print("  ✓ Kaputte Datei -> Startwerte")
+
+        model = CapacityModel(photo_bytes=500_000, video_bps=MB, save_every=1)
+        model.record_photo("/proc/nicht_schreibbar", 1)
+        print("  ✓ Nicht schreibbarer Speicherort bricht nicht ab")
+
+
+def test_incremental_free():
+    """Test: geschriebene Bytes werden bis zur nächsten Messung abgezogen"""
+    print("[TEST] Freier Platz ohne Messung...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = CapacityModel(photo_bytes=MB, video_bps=MB)
+        snap = _snapshot(tmp, 100 * MB)
+        model.record_photo(tmp, MB)
+        model.record_photo(tmp, MB)
+        assert model.estimate(snap)[0] == 98
+        model.record_photo(tmp + "/anderer", MB)
+        assert model.estimate(snap)[0] == 98
+        print("  ✓ Fotos seit der Messung abgezogen (nur eigener Speicherort)")
+
+        # Neue Messung enthält die Fotos bereits
+        snap = _snapshot(tmp, 98 * MB)
+        assert model.estimate(snap)[0] == 98
+        print("  ✓ Neue Messung ersetzt die Zählung")
+
+        # Laufende Aufnahme mit gelernter Rate
+        t0 = time.monotonic()
+        model.video_started(tmp)
+        photos, minutes = model.estimate(snap, now=t0 + 30 * 60)
+        assert photos <= 68 and minutes <= 68
+        model.record_video(tmp, 30 * MB, 30.0)
+        assert model.estimate(snap)[0] == 68
+        print("  ✓ Aufnahme zählt während und nach dem Schreiben")
+
+
+def test_benchmark():
+    """Benchmark: estimate() pro HUD-Aktualisierung"""
+    print("[TEST] Benchmark estimate()...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = CapacityModel(photo_bytes=500_000, video_bps=MB)
+        for _ in range(100):
+            model.record_photo(tmp, 120_000)
+        snap = _snapshot(tmp, 8 * 1024 * MB, t=0.0)
+        n = 10_000
+        t0 = time.perf_counter()
+        for _ in range(n):
+            model.estimate(snap)
+        estimate_us = (time.perf_counter() - t0) / n * 1e6
+
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            os.statvfs(tmp)
+        statvfs_us = (time.perf_counter() - t0) / 1000 * 1e6
+        print(f"  estimate {estimate_us:.1f} µs (100 Fotos seit Messung) | "
+              f"statvfs {statvfs_us:.1f} µs (tmpfs, USB deutlich langsamer)")
+        print("  ✓ Kein Systemaufruf pro Aktualisierung")
+
+
+def main():
+    print("=" * 50)
+    print("KAPAZITÄT TEST")
+    print("=" * 50)
+    test_learned_sizes()
+    test_persistence()
+    test_incremental_free()
+    test_benchmark()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für den Display-Thread
+Prüft Postfach-Semantik, Puffer-Pool, FPS/Drop-Zähler und HUD-Bestätigung
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from nightcam.display_thread import FrameMailbox, DisplayThread
+
+
+class SlowFramebuffer:
+    """Ersatz-Framebuffer: simuliert einen langsamen SPI-Flush"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.shown = []
+
+    def draw_gray(self, gray, compositor, draw_hud=None, keep_hud=False):
+        self.shown.append(int(gray[0, 0]))
+        time.sleep(self.delay)
+
+    def draw(self, bgr, bands=None):
+        self.shown.append(int(bgr[0, 0, 0]))
+        time.sleep(self.delay)
+
+
+def test_mailbox_latest_wins():
+    """Test: Neuer Frame ersetzt wartenden, alter wird zurückgegeben"""
+    print("[TEST] Postfach...")
+
+    box = FrameMailbox()
+    assert box.put("a") is None
+    assert box.put("b") == "a", "Ersetzter Frame sollte zurückkommen"
+    assert box.dropped == 1
+    assert box.take(timeout=0) == "b"
+    assert box.take(timeout=0.01) is None
+
+    # Wartender Leser wird geweckt
+    result = []
+    t = threading.Thread(target=lambda: result.append(box.take(timeout=2.0)))
+    t.start()
+    time.sleep(0.05)
+    box.put("c")
+    t.join(1.0)
+    assert result == ["c"]
+    print("  ✓ Neuester Frame gewinnt")
+
+
+def test_display_thread_drops_and_recycles():
+    """Test: Schneller Produzent, langsames Display -> Drops, Pool bleibt klein"""
+    print("[TEST] Display-Thread...")
+
+    fb = SlowFramebuffer(delay=0.02)
+    display = DisplayThread(fb, max_fps=0)
+    display.start()
+    try:
+        allocated = set()
+        for i in range(100):
+            buf = display.acquire_gray((4, 4))
+            allocated.add(id(buf))
+            buf[:] = i % 256
+            display.submit_gray(buf, compositor=None)
+            time.sleep(0.002)
+        time.sleep(0.1)
+
+        cap_fps, disp_fps, dropped, render_ms = display.stats()
+        print(f"  Capture {cap_fps:.0f} fps | Display {disp_fps:.0f} fps | "
+              f"verworfen {dropped} | Render {render_ms:.1f} ms")
+        assert dropped > 0, "Langsames Display sollte Frames verwerfen"
+        assert len(fb.shown) + dropped == 100, "Jeder Frame ist entweder gezeigt oder verworfen"
+        assert fb.shown[-1] == 99, "Letzter Frame muss angezeigt werden"
+        assert fb.shown == sorted(fb.shown), "Reihenfolge muss erhalten bleiben"
+        assert len(allocated) <= 3, f"Puffer-Pool sollte reichen: {len(allocated)}"
+        assert display.stats()[2] == 0, "Drops zählen pro Abfrage-Intervall"
+        print("  ✓ Drops gezählt, neuester Frame angezeigt, Pool recycelt")
+    finally:
+        display.stop()
+    assert not display.is_alive()
+
+
+def test_display_thread_paces_itself():
+    """Test: max_fps begrenzt die Display-Rate"""
+    print("[TEST] Selbst-Taktung...")
+
+    fb = SlowFramebuffer(delay=0.0)
+    display = DisplayThread(fb, max_fps=20)
+    display.start()
+    try:
+        img = np.zeros((2, 2, 3), dtype=np.uint8)
+        t_end = time.monotonic() + 0.5
+        while time.monotonic() < t_end:
+            display.submit_bgr(img)
+            time.sleep(0.001)
+        assert len(fb.shown) <= 12, f"Zu viele Frames: {len(fb.shown)}"
+        print(f"  ✓ {len(fb.shown)} Frames in 0.5 s bei max 20 fps")
+    finally:
+        display.stop()
+
+
+def test_submit_bgr_merges_bands():
+    """Test: Bänder verworfener Jobs gehen nicht verloren"""
+    print("[TEST] Bänder zusammenführen...")
+
+    class BandFramebuffer:
+        def __init__(self):
+            self.calls = []
+
+        def draw(self, bgr, bands=None):
+            self.calls.append(bands)
+
+    fb = BandFramebuffer()
+    display = DisplayThread(fb, max_fps=0)
+    img = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    # Thread noch nicht gestartet: zweiter Job ersetzt den ersten
+    display.submit_bgr(img, [(0, 1)])
+    display.submit_bgr(img, [(2, 3)])
+    render, _ = display.mailbox.take(timeout=0)
+    render(fb)
+    assert fb.calls == [[(0, 1), (2, 3)]], f"Bänder sollten gesammelt werden: {fb.calls}"
+    assert display.mailbox.dropped == 1
+
+    # Vollbild gewinnt über gesammelte Bänder, danach ist alles abgearbeitet
+    display.submit_bgr(img, [(1, 2)])
+    display.submit_bgr(img)
+    render, _ = display.mailbox.take(timeout=0)
+    render(fb)
+    assert fb.calls[-1] is None
+    display.submit_bgr(img, [])
+    render, _ = display.mailbox.take(timeout=0)
+    render(fb)
+    assert fb.calls[-1] == []
+    print("  ✓ Verworfene Bänder werden nachgeholt")
+
+
+def test_hud_presented():
+    """Test: hud_presented zählt nur angezeigte Frames mit vollem HUD"""
+    print("[TEST] HUD-Bestätigung...")
+
+    fb = SlowFramebuffer(delay=0)
+    display = DisplayThread(fb, max_fps=0)
+    gray = np.zeros((4, 4), dtype=np.uint8)
+
+    # Thread noch nicht gestartet: voller HUD-Frame wird vom nächsten verdrängt
+    need = display.gray_submitted + 1
+    display.submit_gray(display.acquire_gray(gray.shape), None, keep_hud=False)
+    seq = display.submit_gray(display.acquire_gray(gray.shape), None, keep_hud=True)
+    render, release = display.mailbox.take(timeout=0)
+    render(fb)
+    release()
+    assert display.hud_presented < need, "Verworfener HUD-Frame zählt nicht"
+
+    display.submit_gray(display.acquire_gray(gray.shape), None, keep_hud=False)
+    render, release = display.mailbox.take(timeout=0)
+    render(fb)
+    release()
+    assert display.hud_presented == seq + 1 >= need
+    print("  ✓ Nur ein angezeigter Frame mit vollem HUD bestätigt")
+
+
+def main():
+    print("=" * 50)
+    print("DISPLAY-THREAD TEST")
+    print("=" * 50)
+
+    test_mailbox_latest_wins()
+    test_display_thread_drops_and_recycles()
+    test_display_thread_paces_itself()
+    test_submit_bgr_merges_bands()
+    test_hud_presented()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
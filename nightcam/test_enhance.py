@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für das Histogram-Equalizing
+Prüft die LUT gegen cv2.equalizeHist, die reduzierte Neuberechnung und die
+geglättete LUT (Benchmark: exact vs. smooth)
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import cv2
+import numpy as np
+from nightcam.enhance import equalize_lut, HistEqualizer, SmoothEqualizer, make_equalizer
+
+
+def test_lut_matches_equalizehist():
+    """Test: LUT liefert exakt das Ergebnis von cv2.equalizeHist"""
+    print("[TEST] Equalizing-LUT...")
+
+    rng = np.random.default_rng(0)
+    for hi in (256, 60, 2):
+        gray = rng.integers(0, hi, (240, 320)).astype(np.uint8) + (256 - hi) // 2
+        gray = gray.astype(np.uint8)
+        assert np.array_equal(cv2.LUT(gray, equalize_lut(gray)), cv2.equalizeHist(gray))
+
+    flat = np.full((8, 8), 77, dtype=np.uint8)
+    assert np.array_equal(cv2.LUT(flat, equalize_lut(flat)), cv2.equalizeHist(flat))
+    print("  ✓ Identisch zu cv2.equalizeHist (auch dunkle/einfarbige Bilder)")
+
+
+def test_recompute_rate():
+    """Test: every=N berechnet die LUT nur jeden N-ten Frame"""
+    print("[TEST] Neuberechnungsrate...")
+
+    eq = HistEqualizer()
+    dark = np.random.default_rng(1).integers(0, 40, (120, 160)).astype(np.uint8)
+    bright = (dark + 150).astype(np.uint8)
+    dst = np.empty_like(dark)
+
+    assert eq.apply(dark, dst=dst, every=1) is dst
+    assert np.array_equal(dst, cv2.equalizeHist(dark))
+
+    eq.apply(dark, every=3)
+    lut = eq.lut
+    eq.apply(bright, every=3)
+    eq.apply(bright, every=3)
+    assert eq.lut is lut, "LUT sollte wiederverwendet werden"
+    eq.apply(bright, every=3)
+    assert eq.lut is not lut, "Jeder N-te Frame sollte neu berechnen"
+    assert np.array_equal(eq.apply(bright, every=3), cv2.equalizeHist(bright))
+    print("  ✓ LUT wird zwischen den Neuberechnungen wiederverwendet")
+
+
+def _noisy_scene(rng, frames=60, shape=(320, 480), level=30):
+    """Statische dunkle Szene mit IR-Rauschen"""
+    h, w = shape
+    base = np.tile(np.linspace(level - 20, level + 20, w, dtype=np.float32), (h, 1))
+    for _ in range(frames):
+        noise = rng.normal(0, 6, shape).astype(np.float32)
+        yield np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def _lut_jitter(luts, lo=10, hi=50):
+    """Mittlere Änderung der Abbildung von Frame zu Frame im belegten Grauwertbereich"""
+    luts = np.array(luts, dtype=np.float32)[:, lo:hi]
+    return float(np.abs(np.diff(luts, axis=0)).mean())
+
+
+def test_smooth_close_to_exact():
+    """Test: Geglättete LUT nähert sich dem exakten Ergebnis an"""
+    print("[TEST] Geglättete LUT...")
+
+    gray = next(_noisy_scene(np.random.default_rng(2), frames=1))
+    eq = SmoothEqualizer(every=1, alpha=0.5)
+    for _ in range(20):
+        out = eq.apply(gray)
+    diff = np.abs(out.astype(np.int16) - cv2.equalizeHist(gray).astype(np.int16))
+    assert diff.mean() < 3.0, f"Zu weit vom exakten Ergebnis: {diff.mean():.2f}"
+
+    dst = np.empty_like(gray)
+    assert eq.apply(gray, dst=dst) is dst
+    print(f"  ✓ Mittlere Abweichung {diff.mean():.2f} Graustufen (Unterabtastung)")
+
+
+def test_smooth_recompute_and_shift():
+    """Test: Neuberechnung nur alle N Frames, sofort bei Szenenwechsel"""
+    print("[TEST] Neuberechnung/Szenenwechsel...")
+
+    rng = np.random.default_rng(3)
+    dark = list(_noisy_scene(rng, frames=20, level=30))
+    bright = list(_noisy_scene(rng, frames=5, level=160))
+
+    eq = SmoothEqualizer(every=4)
+    for f in dark[:9]:
+        eq.apply(f)
+    assert eq.recomputes == 3, f"Alle 4 Frames neu: {eq.recomputes}"
+
+    eq.apply(dark[9], every=2)   # Faktor vom Governor -> Intervall 8
+    n = eq.recomputes
+    for f in dark[10:16]:
+        eq.apply(f, every=2)
+    assert eq.recomputes == n, "Mit Faktor 2 sollte länger gewartet werden"
+
+    n = eq.recomputes
+    eq.apply(bright[0])
+    assert eq.recomputes == n + 1, "Helligkeitssprung sollte sofort neu berechnen"
+
+    eq.reset()
+    eq.apply(dark[0])
+    assert eq.lut is not None
+    print("  ✓ Intervall und Szenenwechsel-Erkennung")
+
+
+def test_smooth_reduces_flicker():
+    """Test: Weniger Helligkeitsflackern bei verrauschter statischer Szene"""
+    print("[TEST] Flackern...")
+
+    frames = list(_noisy_scene(np.random.default_rng(4), frames=60))
+    f_exact = _lut_jitter([equalize_lut(f) for f in frames])
+    eq = make_equalizer("smooth")
+    smooth = []
+    for f in frames:
+        eq.apply(f)
+        smooth.append(eq.lut.copy())
+    f_smooth = _lut_jitter(smooth[10:])
+    assert f_smooth < 0.5 * f_exact, f"smooth {f_smooth:.3f} vs exact {f_exact:.3f}"
+    print(f"  ✓ LUT-Schwankung pro Frame: exact {f_exact:.3f}, smooth {f_smooth:.3f} Graustufen")
+
+
+def benchmark():
+    """Vergleicht equalizeHist pro Frame mit der geglätteten LUT"""
+    print("[BENCH] Equalizing 480x320 und 640x480...")
+
+    rng = np.random.default_rng(5)
+    runs = 200
+    for shape in ((320, 480), (480, 640)):
+        frames = list(_noisy_scene(rng, frames=8, shape=shape))
+        dst = np.empty(shape, dtype=np.uint8)
+        for mode in ("exact", "smooth"):
+            eq = make_equalizer(mode)
+            t0 = time.perf_counter()
+            for i in range(runs):
+                eq.apply(frames[i % len(frames)], dst=dst)
+            dt = (time.perf_counter() - t0) / runs * 1000
+            print(f"  {shape[1]}x{shape[0]} {mode:6s}: {dt:.3f} ms/Frame")
+
+
+def main():
+    print("=" * 50)
+    print("EQUALIZING TEST")
+    print("=" * 50)
+
+    test_lut_matches_equalizehist()
+    test_recompute_rate()
+    test_smooth_close_to_exact()
+    test_smooth_recompute_and_shift()
+    test_smooth_reduces_flicker()
+
+    print()
+    benchmark()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
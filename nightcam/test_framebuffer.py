@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für Framebuffer-Hilfen
+Prüft RGB565-LUT, HUD-Compositing und misst den Geschwindigkeitsgewinn
+"""
+
+import sys
+import os
+import time
+import tempfile
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import cv2
+import numpy as np
+from nightcam.framebuffer import (GRAY_RGB565_LUT, gray_to_rgb565,
+                                  bgr_to_rgb565, GrayHudCompositor,
+                                  open_fb, Framebuffer, FbInfo, detect_format,
+                                  RGB565, PAGE_SIZE)
+
+
+def _reference_rgb565(bgr):
+    """Alter Pfad aus nachtsicht_fullscreen.py"""
+    b = (bgr[:,:,0]>>3).astype(np.uint16)
+    g = (bgr[:,:,1]>>2).astype(np.uint16)
+    r = (bgr[:,:,2]>>3).astype(np.uint16)
+    return (r<<11)|(g<<5)|b
+
+
+def test_gray_lut_matches_bgr_path():
+    """Test: LUT liefert dieselben Pixel wie GRAY2BGR + bgr_to_rgb565"""
+    print("[TEST] Graustufen-LUT...")
+
+    assert GRAY_RGB565_LUT.dtype == np.uint16
+    assert GRAY_RGB565_LUT.shape == (256,)
+
+    gray = np.random.randint(0, 256, (320, 480), dtype=np.uint8)
+    ref = _reference_rgb565(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+    assert np.array_equal(gray_to_rgb565(gray), ref), "LUT weicht vom BGR-Pfad ab"
+    print("  ✓ LUT identisch mit BGR-Pfad")
+
+
+def test_bgr_packer_matches_reference():
+    """Test: bgr_to_rgb565 mit out= liefert das alte Ergebnis"""
+    print("[TEST] BGR-Packer...")
+
+    bgr = np.random.randint(0, 256, (45, 480, 3), dtype=np.uint8)
+    out = np.empty((45, 480), dtype=np.uint16)
+    res = bgr_to_rgb565(bgr, out=out)
+    assert res is out, "Ergebnis sollte in out liegen"
+    assert np.array_equal(out, _reference_rgb565(bgr))
+    print("  ✓ BGR-Packer korrekt")
+
+
+def test_hud_compositing():
+    """Test: HUD liegt farbig über dem Graubild, Rest bleibt LUT-Ergebnis"""
+    print("[TEST] HUD-Compositing...")
+
+    W, H = 480, 320
+    comp = GrayHudCompositor(W, H, [(0, 45), (H-45, H)])
+    gray = np.random.randint(0, 256, (480, 640), dtype=np.uint8)
+
+    def draw_hud(disp):
+        cv2.putText(disp, "LIVE USB", (10, 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2, cv2.LINE_AA)
+        cv2.rectangle(disp, (90, H-40), (160, H-10), (100, 255, 100), 2)
+
+    packed = comp.render(gray, draw_hud)
+    assert packed.shape == (H, W)
+
+    # Erwartung: alter Pfad auf Display-Größe
+    small = cv2.resize(gray, (W, H), interpolation=cv2.INTER_LINEAR)
+    disp = cv2.cvtColor(small, cv2.COLOR_GRAY2BGR)
+    draw_hud(disp)
+    assert np.array_equal(packed, _reference_rgb565(disp)), "HUD-Compositing fehlerhaft"
+    print("  ✓ HUD korrekt über Graubild gelegt")
+
+
+def _fake_fb(size=480 * 320 * 2):
+    """Normale Datei als Ersatz für /dev/fb1"""
+    tmp = tempfile.NamedTemporaryFile(suffix=".fb", delete=False)
+    tmp.write(b"\x00" * size)
+    tmp.close()
+    return tmp.name
+
+
+# (Format, bpp, Rot-Offset, Blau-Offset, Referenz-Bytes eines BGR-Pixels)
+FORMAT_CASES = [
+    ("RGB565",   16, 11, 0,  lambda b, g, r: ((r >> 3) << 11 | (g >> 2) << 5 | (b >> 3)).to_bytes(2, "little")),
+    ("BGR565",   16, 0,  11, lambda b, g, r: ((b >> 3) << 11 | (g >> 2) << 5 | (r >> 3)).to_bytes(2, "little")),
+    ("XRGB8888", 32, 16, 0,  lambda b, g, r: bytes([b, g, r, 255])),
+    ("RGB888",   24, 16, 0,  lambda b, g, r: bytes([b, g, r])),
+]
+
+
+def _info(bpp, red_off, blue_off, w=480, h=320, pad=32):
+    """FbInfo mit absichtlich gepolsterter Zeilenlänge"""
+    red_len = 5 if bpp == 16 else 8
+    green = (5, 6) if bpp == 16 else (8, 8)
+    return FbInfo(w, h, bpp, w * bpp // 8 + pad, (red_off, red_len), green, (blue_off, red_len))
+
+
+def test_open_fb_fallback_is_rgb565():
+    """Test: Normale Datei (ioctl schlägt fehl) -> 480x320 RGB565"""
+    print("[TEST] open_fb Fallback...")
+
+    path = _fake_fb()
+    fb = open_fb(path)
+    try:
+        assert (fb.width, fb.height, fb.bpp) == (480, 320, 16)
+        assert fb.format is RGB565
+        assert fb.line_length == 960
+        fb.pixels[0, 0] = (0x00, 0xF8)
+        fb.present()
+        fb.mm.seek(0)
+        assert fb.mm.read(2) == b"\x00\xf8", "View schreibt nicht ins mmap"
+        print("  ✓ Fallback-Geometrie und mmap-View korrekt")
+    finally:
+        fb.close()
+        os.unlink(path)
+
+
+def test_detect_format():
+    """Test: Pixelformat aus bpp + Bitfeldern"""
+    print("[TEST] Formaterkennung...")
+
+    for name, bpp, red_off, blue_off, _ in FORMAT_CASES:
+        assert detect_format(_info(bpp, red_off, blue_off)).name == name
+    try:
+        detect_format(_info(8, 0, 0))
+        assert False, "8bpp sollte abgelehnt werden"
+    except ValueError:
+        pass
+    print("  ✓ RGB565 / BGR565 / XRGB8888 / RGB888 erkannt")
+
+
+def test_packers_with_stride():
+    """Test: Jeder Packer schreibt korrekt in ein gepolstertes mmap"""
+    print("[TEST] Packer mit line_length-Polsterung...")
+
+    W, H = 480, 320
+    bgr = np.zeros((H, W, 3), dtype=np.uint8)
+    bgr[:] = (10, 200, 250)
+    gray = np.full((H, W), 128, dtype=np.uint8)
+    comp = GrayHudCompositor(W, H, [(0, 45)])
+
+    def draw_hud(disp):
+        disp[5, 5] = (10, 200, 250)
+
+    for name, bpp, red_off, blue_off, ref in FORMAT_CASES:
+        info = _info(bpp, red_off, blue_off)
+        path = _fake_fb(info.line_length * H)
+        fb = Framebuffer(path, info=info)
+        try:
+            fb.draw(bgr)
+            raw = bytes(fb.mm)
+            px = ref(10, 200, 250)
+            row = raw[info.line_length:2 * info.line_length]
+            assert row[:W * len(px)] == px * W, f"{name}: BGR-Packer falsch"
+            assert row[W * len(px):] == b"\x00" * 32, f"{name}: Polsterung überschrieben"
+
+            fb.draw_gray(gray, comp, draw_hud)
+            raw = bytes(fb.mm)
+            row = raw[100 * info.line_length:101 * info.line_length]
+            assert row[:W * len(px)] == ref(128, 128, 128) * W, f"{name}: Grau-Packer falsch"
+            off = 5 * info.line_length + 5 * len(px)
+            assert raw[off:off + len(px)] == px, f"{name}: HUD fehlt"
+            print(f"  ✓ {name}")
+        finally:
+            fb.close()
+            os.unlink(path)
+
+
+def test_diff_writer_skips_unchanged_pages():
+    """Test: Diff-Modus schreibt nur geänderte Seiten ins mmap"""
+    print("[TEST] Diff-Writer...")
+
+    path = _fake_fb()
+    fb = open_fb(path)
+    try:
+        W, H = fb.width, fb.height
+        bgr = np.random.randint(0, 256, (H, W, 3), dtype=np.uint8)
+
+        first = fb.draw(bgr)
+        assert first == fb.size, "Erster Frame sollte komplett geschrieben werden"
+        assert bytes(fb.mm) == bgr_to_rgb565(bgr).tobytes()
+
+        assert fb.draw(bgr) == 0, "Unveränderter Frame sollte nichts schreiben"
+
+        # Kleine Änderung (HUD-Text) -> nur wenige Seiten
+        cv2.putText(bgr, "F:123", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        written = fb.draw(bgr)
+        assert 0 < written <= 8 * PAGE_SIZE, f"Zu viel geschrieben: {written}"
+        assert bytes(fb.mm) == bgr_to_rgb565(bgr).tobytes(), "mmap-Inhalt falsch"
+        print(f"  ✓ HUD-Änderung: {written} von {fb.size} Bytes")
+
+        # Änderungs-Hinweis auf Zeilenbereich begrenzt den Vergleich
+        bgr[300:310] = 255
+        written = fb.draw(bgr, bands=[(0, 50)])
+        assert written == 0, "Bereich außerhalb der Bänder sollte ignoriert werden"
+        written = fb.draw(bgr, bands=[(300, 310)])
+        assert 0 < written <= 3 * PAGE_SIZE
+        assert bytes(fb.mm) == bgr_to_rgb565(bgr).tobytes()
+
+        fb.invalidate()
+        assert fb.draw(bgr) == fb.size, "invalidate() sollte Vollbild erzwingen"
+        print(f"  ✓ Schnitt {fb.bytes_per_frame():.0f} Bytes/Frame über {fb.frames} Frames")
+    finally:
+        fb.close()
+        os.unlink(path)
+
+
+def test_camera_frames_bypass_diff():
+    """Test: Kamerabilder direkt ins mmap, danach BGR-Frame komplett"""
+    print("[TEST] Kamerabild ohne Diff...")
+
+    path = _fake_fb()
+    fb = open_fb(path)
+    try:
+        W, H = fb.width, fb.height
+        comp = GrayHudCompositor(W, H, [(0, 45)])
+        bgr = np.random.randint(0, 256, (H, W, 3), dtype=np.uint8)
+        fb.draw(bgr)
+
+        gray = np.random.randint(0, 256, (H, W), dtype=np.uint8)
+        assert fb.draw_gray(gray, comp) == fb.size
+        assert np.array_equal(fb.screen[45:, :, :], gray_to_rgb565(gray)[45:, :, None].view(np.uint8))
+
+        # Gleicher BGR-Frame wie vorher: Backbuffer wäre unverändert, trotzdem senden
+        # (auch wenn nur Bänder gemeldet werden)
+        assert fb.draw(bgr, bands=[(0, 10)]) == fb.size
+        assert bytes(fb.mm) == bgr_to_rgb565(bgr).tobytes()
+        assert fb.draw(bgr) == 0, "Danach wieder Diff"
+        print("  ✓ Kamerabild direkt, Terminal/USB danach vollständig")
+    finally:
+        fb.close()
+        os.unlink(path)
+
+
+def test_keep_hud_leaves_bands():
+    """Test: keep_hud packt nur außerhalb der HUD-Bänder"""
+    print("[TEST] HUD stehen lassen...")
+
+    path = _fake_fb()
+    fb = open_fb(path)
+    try:
+        W, H = fb.width, fb.height
+        comp = GrayHudCompositor(W, H, [(0, 45), (H - 45, H)])
+        assert comp.gaps == [(45, H - 45)]
+
+        def hud(canvas):
+            cv2.rectangle(canvas, (5, 5), (60, 30), (0, 0, 255), -1)
+
+        dark = np.full((H, W), 10, dtype=np.uint8)
+        fb.draw_gray(dark, comp, hud)
+        before = fb.screen.copy()
+
+        bright = np.full((H, W), 200, dtype=np.uint8)
+        written = fb.draw_gray(bright, comp, hud, keep_hud=True)
+        after = fb.screen
+        assert np.array_equal(after[:45], before[:45]), "Oberes Band sollte stehen bleiben"
+        assert np.array_equal(after[H - 45:], before[H - 45:]), "Unteres Band sollte stehen bleiben"
+        assert np.array_equal(after[45:H - 45], gray_to_rgb565(bright)[45:H - 45, :, None].view(np.uint8))
+        assert written <= (H - 90) * fb.line_length + 2 * PAGE_SIZE
+        assert bytes(fb.mm) == after.tobytes()
+        print("  ✓ Bänder unverändert, nur Bildbereich gesendet")
+    finally:
+        fb.close()
+        os.unlink(path)
+
+
+def _frame_allocations(fn, runs=20):
+    """Misst Python/NumPy-Allokationen pro Frame (tracemalloc, nach Warmup)"""
+    fn()
+    tracemalloc.start()
+    for _ in range(runs):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def test_no_per_frame_allocations():
+    """Test: Graustufen-Pfad ins mmap allokiert keine Frame-Puffer"""
+    print("[TEST] Allokationen pro Frame...")
+
+    path = _fake_fb()
+    fb = open_fb(path)
+    try:
+        W, H = fb.width, fb.height
+        gray = np.random.randint(0, 256, (480, 640), dtype=np.uint8)
+        comp = GrayHudCompositor(W, H, [(0, 45), (H-45, H)])
+
+        def draw_hud(disp):
+            cv2.putText(disp, "LIVE", (10, 20),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2, cv2.LINE_AA)
+
+        peak = _frame_allocations(lambda: fb.draw_gray(gray, comp, draw_hud))
+        frame_bytes = W * H * 2
+        print(f"  Peak: {peak} Bytes (Frame: {frame_bytes} Bytes)")
+        assert peak < frame_bytes // 10, "Pro Frame sollte kein Vollbild-Puffer entstehen"
+        print("  ✓ Keine Vollbild-Allokationen")
+    finally:
+        fb.close()
+        os.unlink(path)
+
+
+def benchmark():
+    """Vergleicht alten BGR-Pfad mit LUT-Pfad und misst jeden Packer"""
+    print("[BENCH] Graustufen -> RGB565 (640x480 -> 480x320)...")
+
+    W, H = 480, 320
+    gray = np.random.randint(0, 256, (480, 640), dtype=np.uint8)
+    comp = GrayHudCompositor(W, H, [(0, 45), (H-45, H)])
+    runs = 200
+
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        disp = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        resized = cv2.resize(disp, (W, H), interpolation=cv2.INTER_LINEAR)
+        _reference_rgb565(resized).tobytes()
+    t_old = (time.perf_counter() - t0) / runs * 1000
+
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        comp.render(gray, lambda d: None)
+    t_new = (time.perf_counter() - t0) / runs * 1000
+
+    print(f"  BGR-Pfad: {t_old:.2f} ms/Frame")
+    print(f"  LUT-Pfad: {t_new:.2f} ms/Frame")
+
+    print("[BENCH] Packer ins gepolsterte mmap (480x320)...")
+    bgr = np.random.randint(0, 256, (H, W, 3), dtype=np.uint8)
+    small = np.random.randint(0, 256, (H, W), dtype=np.uint8)
+    for name, bpp, red_off, blue_off, _ in FORMAT_CASES:
+        info = _info(bpp, red_off, blue_off)
+        path = _fake_fb(info.line_length * H)
+        fb = Framebuffer(path, info=info)
+        try:
+            t0 = time.perf_counter()
+            for _ in range(runs):
+                fb.format.pack_bgr(bgr, fb.pixels)
+            t_bgr = (time.perf_counter() - t0) / runs * 1000
+            t0 = time.perf_counter()
+            for _ in range(runs):
+                fb.format.pack_gray(small, fb.pixels)
+            t_gray = (time.perf_counter() - t0) / runs * 1000
+            print(f"  {name:9s} BGR: {t_bgr:.3f} ms  Grau: {t_gray:.3f} ms")
+        finally:
+            fb.close()
+            os.unlink(path)
+
+
+def main():
+    print("=" * 50)
+    print("FRAMEBUFFER TEST")
+    print("=" * 50)
+
+    test_gray_lut_matches_bgr_path()
+    test_bgr_packer_matches_reference()
+    test_hud_compositing()
+    test_open_fb_fallback_is_rgb565()
+    test_detect_format()
+    test_packers_with_stride()
+    test_diff_writer_skips_unchanged_pages()
+    test_camera_frames_bypass_diff()
+    test_keep_hud_leaves_bands()
+    test_no_per_frame_allocations()
+
+    print()
+    benchmark()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für den Frame-Budget-Governor
+Prüft Herunter-/Hochschalten mit Hysterese, FPS-Begrenzung und Auflösung
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from nightcam.governor import FrameGovernor, QUALITY_LEVELS
+
+
+class FakeClock:
+    """Manuell vorgestellte Zeit"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _frame(gov, clock, work, parallel=0.0):
+    with gov.stage("hist"):
+        clock.now += work
+    return gov.end_frame(parallel)
+
+
+def test_steps_down_and_up():
+    """Test: Überlast -> Stufe runter, Reserve -> Stufe hoch"""
+    print("[TEST] Governor-Stufen...")
+
+    clock = FakeClock()
+    gov = FrameGovernor(target_fps=30, down_after=5, up_after=20, clock=clock)
+    assert gov.level == 0 and gov.quality.hud_every == 1
+
+    # Einzelne Ausreißer schalten nicht
+    for _ in range(4):
+        _frame(gov, clock, 0.050)
+    _frame(gov, clock, 0.010)
+    assert gov.level == 0, "Einzelne Spitzen sollten nicht schalten"
+
+    # Anhaltende Überlast: Stufe für Stufe bis ganz unten
+    for _ in range(5 * len(QUALITY_LEVELS)):
+        _frame(gov, clock, 0.080)
+    assert gov.level == len(QUALITY_LEVELS) - 1
+    assert gov.quality.max_fps == 15
+    assert abs(gov.budget() - 1 / 15) < 1e-9
+
+    # Im Band zwischen headroom und Budget: bleibt stehen
+    for _ in range(100):
+        _frame(gov, clock, 0.050)
+    assert gov.level == len(QUALITY_LEVELS) - 1
+
+    # Reserve: eine Stufe pro up_after Frames zurück
+    for _ in range(19):
+        _frame(gov, clock, 0.005)
+    assert gov.level == len(QUALITY_LEVELS) - 1
+    assert _frame(gov, clock, 0.005) is True
+    assert gov.level == len(QUALITY_LEVELS) - 2
+    for _ in range(20 * len(QUALITY_LEVELS)):
+        _frame(gov, clock, 0.005)
+    assert gov.level == 0
+    assert "Q0" in gov.describe() and "hist" in gov.describe()
+    print(f"  ✓ {gov.changes} Stufenwechsel, zurück auf voller Qualität")
+
+
+def test_parallel_stage_counts():
+    """Test: Langsamer Display-Thread zählt ins Budget"""
+    print("[TEST] Paralleler Display-Render...")
+
+    clock = FakeClock()
+    gov = FrameGovernor(target_fps=30, down_after=3, clock=clock)
+    for _ in range(3):
+        _frame(gov, clock, 0.005, parallel=0.060)
+    assert gov.level == 1, "Display-Render über Budget sollte herunterschalten"
+    print("  ✓ Render-Zeit des Display-Threads berücksichtigt")
+
+
+def test_processing_size_and_pace():
+    """Test: Halbe Auflösung und FPS-Begrenzung der unteren Stufen"""
+    print("[TEST] Auflösung und Taktung...")
+
+    clock = FakeClock()
+    gov = FrameGovernor(clock=clock)
+    assert gov.processing_size((480, 320)) == (480, 320)
+    gov.level = 3
+    assert gov.processing_size((480, 320)) == (240, 160)
+    assert gov.processing_size((470, 318)) == (234, 158)
+
+    # FPS-Grenze: pace() schläft bis zum nächsten Frame-Slot
+    gov.level = len(QUALITY_LEVELS) - 1
+    gov.pace()
+    clock.now += 0.060
+    assert abs(gov.frame_delay() - 0.0067) < 0.001, "Restzeit bis zum nächsten Slot"
+    import time as _time
+    t0 = _time.monotonic()
+    gov.pace()
+    slept = _time.monotonic() - t0
+    assert 0.003 < slept < 0.05, f"Sollte ~6.7 ms warten: {slept * 1000:.1f} ms"
+
+    gov.level = 0
+    assert gov.frame_delay() == 0.0
+    t0 = _time.monotonic()
+    gov.pace()
+    assert _time.monotonic() - t0 < 0.003, "Ohne FPS-Grenze kein Warten"
+    print("  ✓ Verarbeitung halbiert, 15-fps-Stufe taktet")
+
+
+def main():
+    print("=" * 50)
+    print("GOVERNOR TEST")
+    print("=" * 50)
+
+    test_steps_down_and_up()
+    test_parallel_stage_counts()
+    test_processing_size_and_pace()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
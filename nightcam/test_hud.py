@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für den HUD-Sprite-Cache
+Prüft Pixelgleichheit mit putText, Ziffern-Wiederverwendung, Button-Capture
+und Clipping (Benchmark: direktes Zeichnen vs. Sprites)
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import cv2
+import numpy as np
+from nightcam.hud import SpriteCache, FONT
+from terminal_access.touch_button import TerminalButton
+
+
+def _background(h=45, w=480, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 3)).astype(np.uint8)
+
+
+def _max_diff(a, b):
+    return int(np.abs(a.astype(np.int16) - b.astype(np.int16)).max())
+
+
+def test_text_matches_puttext():
+    """Test: Sprite-Text entspricht cv2.putText mit LINE_AA"""
+    print("[TEST] Text-Sprites...")
+
+    cache = SpriteCache()
+    for text in ("LIVE USB F:1234 V~56min Q0", "REC", "IDLE INT F:0 V~0min Q4"):
+        ref = _background()
+        out = ref.copy()
+        cv2.putText(ref, text, (10, 20), FONT, 0.6, (0, 255, 0), 2, cv2.LINE_AA)
+        cache.draw_text(out, text, (10, 20), 0.6, (0, 255, 0), 2)
+        assert _max_diff(ref, out) <= 1, f"Abweichung bei '{text}'"
+    print("  ✓ Gleich wie putText (max. 1 Graustufe Abweichung)")
+
+
+def test_digits_reused():
+    """Test: Neue Zahlen werden aus vorhandenen Ziffern montiert"""
+    print("[TEST] Ziffern-Streifen...")
+
+    cache = SpriteCache()
+    canvas = _background()
+    cache.draw_text(canvas, "F:0123456789", (10, 20), 0.6, (0, 255, 0), 2)
+    hits, misses, sprites, _ = cache.stats()
+
+    # Gleicher Text: nur ein Treffer
+    cache.draw_text(canvas, "F:0123456789", (10, 20), 0.6, (0, 255, 0), 2)
+    assert cache.stats()[:2] == (hits + 1, misses)
+
+    # Andere Zahl: eine neue Zeile, aber keine neu gerenderten Stücke
+    cache.draw_text(canvas, "F:987", (10, 20), 0.6, (0, 255, 0), 2)
+    new_hits, new_misses, new_sprites, _ = cache.stats()
+    assert new_misses == misses + 1, "Nur die Zeile selbst sollte neu sein"
+    assert new_hits == hits + 1 + 4, "Textstück und Ziffern sollten aus dem Cache kommen"
+    assert new_sprites == sprites + 1
+    print(f"  ✓ {new_hits} Treffer / {new_misses} gerendert")
+
+
+def test_capture_button():
+    """Test: Button aus Schwarz/Weiß-Capture entspricht direktem Zeichnen"""
+    print("[TEST] Button-Capture...")
+
+    cache = SpriteCache()
+    button = TerminalButton(x=10, y=280, width=70, height=30)
+    rect = (8, 278, 83, 313)
+    for pressed in (False, True, False):
+        button.is_pressed = pressed
+        ref = _background(320, 480, seed=int(pressed))
+        out = ref.copy()
+        button.draw(ref)
+        cache.draw_cached(out, ("term", pressed), rect, button.draw)
+        assert _max_diff(ref, out) <= 2
+    assert cache.stats()[:2] == (1, 2), "Zweiter Zustand sollte aus dem Cache kommen"
+    print("  ✓ Farbe und Antialiasing erhalten, ein Sprite pro Zustand")
+
+
+def test_clipping_and_eviction():
+    """Test: Sprites am Rand werden beschnitten, Cache bleibt begrenzt"""
+    print("[TEST] Clipping/LRU...")
+
+    cache = SpriteCache(max_items=4)
+    canvas = _background(20, 60)
+    ref = canvas.copy()
+    cv2.putText(ref, "ABCDEFGH", (-10, 8), FONT, 0.6, (255, 255, 255), 2, cv2.LINE_AA)
+    cache.draw_text(canvas, "ABCDEFGH", (-10, 8), 0.6, (255, 255, 255), 2)
+    assert _max_diff(ref, canvas) <= 1
+    cache.draw_text(canvas, "X", (500, 500), 0.6, (255, 255, 255), 2)  # komplett außerhalb
+
+    for i in range(10):
+        cache.text(f"T{i}", 0.5, (0, 0, 255))
+    assert len(cache) == 4
+    with cache.frame():
+        time.sleep(0.002)
+    assert cache.stats()[3] >= 2.0
+    print("  ✓ Randbereiche korrekt, LRU hält 4 Sprites")
+
+
+def benchmark():
+    """Vergleicht direktes Zeichnen (putText/circle/rectangle) mit Sprites"""
+    print("[BENCH] HUD zeichnen (Status, REC, 2 Buttons)...")
+
+    W, H = 480, 320
+    cache = SpriteCache()
+    button = TerminalButton(x=10, y=H - 40, width=70, height=30)
+    status = "RECORDING USB F:1234 V~56min Q0"
+
+    def rec(d):
+        cv2.circle(d, (W - 40, 30), 12, (0, 0, 255), -1)
+        cv2.putText(d, "REC", (W - 90, 35), FONT, 0.6, (0, 0, 255), 2, cv2.LINE_AA)
+
+    def usb(d):
+        cv2.rectangle(d, (90, H - 40), (160, H - 10), (100, 255, 100), 2)
+        cv2.putText(d, "USB", (100, H - 20), FONT, 0.6, (100, 255, 100), 2, cv2.LINE_AA)
+
+    def direct(d):
+        cv2.putText(d, status, (10, 20), FONT, 0.6, (0, 255, 0), 2, cv2.LINE_AA)
+        rec(d)
+        button.draw(d)
+        usb(d)
+
+    def sprites(d):
+        with cache.frame():
+            cache.draw_text(d, status, (10, 20), 0.6, (0, 255, 0), 2)
+            cache.draw_cached(d, ("rec",), (W - 92, 16, W - 26, 44), rec)
+            cache.draw_cached(d, ("term",), (8, H - 42, 83, H - 7), button.draw)
+            cache.draw_cached(d, ("usb",), (88, H - 42, 163, H - 7), usb)
+
+    canvas = _background(H, W)
+    runs = 500
+    for fn in (direct, sprites):
+        fn(canvas)
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            fn(canvas)
+        dt = (time.perf_counter() - t0) / runs * 1000
+        print(f"  {fn.__name__:8s}: {dt:.3f} ms/Frame")
+    hits, misses, count, hud_ms = cache.stats()
+    print(f"  Cache: {hits} Treffer / {misses} gerendert, {count} Sprites, {hud_ms:.3f} ms")
+
+
+def main():
+    print("=" * 50)
+    print("HUD TEST")
+    print("=" * 50)
+
+    test_text_matches_puttext()
+    test_digits_reused()
+    test_capture_button()
+    test_clipping_and_eviction()
+
+    print()
+    benchmark()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
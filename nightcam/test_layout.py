@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für die Ablage in Tagesverzeichnissen
+Prüft Tagesverzeichnis, Obergrenze pro Verzeichnis, flachen Modus,
+Nummernfolge über Unterverzeichnisse, Umsortieren im Hintergrund und misst
+die Anlege-Zeit bei 1.000, 10.000 und 50.000 vorhandenen Dateien
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from nightcam.layout import MediaLayout, Resharder, is_media
+from nightcam.sequence import SequenceAllocator
+
+DAY = time.mktime((2026, 3, 14, 12, 0, 0, 0, 0, -1))
+
+
+def test_leaf():
+    """Test: Tagesverzeichnis und Obergrenze pro Verzeichnis"""
+    print("[TEST] Tagesverzeichnisse...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        layout = MediaLayout(max_per_leaf=3)
+        leaves = [layout.leaf(tmp, DAY) for _ in range(7)]
+        names = [os.path.basename(p) for p in leaves]
+        assert names == ["2026-03-14"] * 3 + ["2026-03-14_2"] * 3 + ["2026-03-14_3"], names
+        assert layout.leaf(tmp, DAY + 86400).endswith("2026-03-15")
+
+        # Neuer Prozess: zählt vorhandene Dateien einmal
+        for i in range(3):
+            open(os.path.join(tmp, "2026-03-14", f"f{i}.jpg"), "w").close()
+        for i in range(2):
+            open(os.path.join(tmp, "2026-03-14_2", f"f{i}.jpg"), "w").close()
+        layout = MediaLayout(max_per_leaf=3)
+        assert layout.leaf(tmp, DAY).endswith("2026-03-14_2")
+        assert layout.leaf(tmp, DAY).endswith("2026-03-14_3")
+        print("  ✓ YYYY-MM-DD, danach _2, _3 ...; Belegung nach Neustart")
+
+        assert MediaLayout(sharded=False).leaf(tmp, DAY) == tmp
+        print("  ✓ Flacher Modus unverändert")
+
+
+def test_sequence_in_leaves():
+    """Test: Nummernfolge läuft über Tagesverzeichnisse weiter"""
+    print("[TEST] Nummern über Unterverzeichnisse...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        layout = MediaLayout()
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        path = seq.next_path(tmp, layout.leaf(tmp, DAY))
+        assert path == os.path.join(tmp, "2026-03-14", "Nachtsicht_Foto1.jpg")
+        open(path, "w").close()
+        open(os.path.join(tmp, "2026-03-14", "Nachtsicht_Foto8.jpg"), "w").close()
+
+        # Ohne Sidecar: Abgleich findet die Nummern in den Unterverzeichnissen
+        os.remove(os.path.join(tmp, ".Nachtsicht_Foto.seq"))
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        assert seq.next_path(tmp, layout.leaf(tmp, DAY + 86400)).endswith(
+            os.path.join("2026-03-15", "Nachtsicht_Foto9.jpg"))
+        print("  ✓ Sidecar im Hauptverzeichnis, Scan eine Ebene tief")
+
+
+def test_resharder():
+    """Test: flaches Verzeichnis wird nach Änderungsdatum umsortiert"""
+    print("[TEST] Umsortieren...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(12):
+            path = os.path.join(tmp, f"Nachtsicht_Foto{i + 1}.jpg")
+            open(path, "w").close()
+            when = DAY + (i % 2) * 86400
+            os.utime(path, (when, when))
+        open(os.path.join(tmp, ".Nachtsicht_Foto.seq"), "w").close()
+        os.makedirs(os.path.join(tmp, "2026-03-14"))
+        open(os.path.join(tmp, "2026-03-14", "Nachtsicht_Foto1.jpg"), "w").close()
+
+        job = Resharder(tmp, MediaLayout(), batch=5, pause=0.0)
+        job.start()
+        job.join(5.0)
+        assert job.total == 12 and job.moved == 11 and job.skipped == 1
+        left = sorted(n for n in os.listdir(tmp) if is_media(n))
+        assert left == ["Nachtsicht_Foto1.jpg"], "Namenskollision bleibt liegen"
+        assert len(os.listdir(os.path.join(tmp, "2026-03-14"))) == 6
+        assert len(os.listdir(os.path.join(tmp, "2026-03-15"))) == 6
+        assert os.path.exists(os.path.join(tmp, ".Nachtsicht_Foto.seq"))
+        print(f"  ✓ {job.moved} verschoben, Kollision und Sidecar bleiben liegen")
+
+        # Abbrechbar zwischen den Blöcken
+        for i in range(20):
+            open(os.path.join(tmp, f"Nachtsicht_Video{i}.h264"), "w").close()
+        job = Resharder(tmp, MediaLayout(), batch=5, pause=10.0)
+        job.start()
+        time.sleep(0.1)
+        t0 = time.monotonic()
+        job.stop()
+        assert not job.is_alive() and time.monotonic() - t0 < 1.0
+        assert job.moved == 5
+        print("  ✓ stop() wartet nicht auf die Pause")
+
+
+def test_benchmark():
+    """Benchmark: Datei anlegen neben 1.000/10.000/50.000 vorhandenen Dateien"""
+    print("[TEST] Benchmark Anlegen...")
+
+    def create_ms(directory, name, n=200):
+        t0 = time.perf_counter()
+        for i in range(n):
+            fd = os.open(os.path.join(directory, f"{name}{i}.jpg"),
+                         os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            os.close(fd)
+        return (time.perf_counter() - t0) / n * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        create_ms(tmp, "warmup")
+    for count in (1_000, 10_000, 50_000):
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(count):
+                open(os.path.join(tmp, f"Nachtsicht_Foto{i}.jpg"), "w").close()
+            flat_ms = create_ms(tmp, "neu_flach")
+
+            layout = MediaLayout()
+            Resharder(tmp, layout, batch=count, pause=0.0).run()
+            leaf = layout.leaf(tmp)
+            sharded_ms = create_ms(leaf, "neu_tag")
+            print(f"  {count:>6} Dateien: flach {flat_ms:.3f} ms, "
+                  f"Tagesverzeichnis {sharded_ms:.3f} ms "
+                  f"({len(os.listdir(leaf))} Einträge im Verzeichnis)")
+    print("  ✓ Anlege-Zeit gemessen (Unterschied vor allem auf vfat)")
+
+
+def main():
+    print("=" * 50)
+    print("TAGESVERZEICHNISSE TEST")
+    print("=" * 50)
+    test_leaf()
+    test_sequence_in_leaves()
+    test_resharder()
+    test_benchmark()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für den PhotoWriter
+Prüft Reihenfolge der Dateinamen, begrenzte Warteschlange, Fehler im
+Worker und misst Serienbilder gegen das bisherige synchrone Speichern
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import cv2
+import numpy as np
+
+from nightcam.photo_writer import PhotoWriter
+from nightcam.sequence import SequenceAllocator
+
+
+def _submit(writer, value, shape=(48, 64)):
+    buf = writer.acquire(shape)
+    if buf is None:
+        return False
+    buf[:] = value
+    writer.submit(buf)
+    return True
+
+
+def test_order():
+    """Test: Namen in Aufnahme-Reihenfolge, Inhalt passt zum Namen"""
+    print("[TEST] Reihenfolge...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seq = SequenceAllocator("Nachtsicht_Foto", ".png")
+        sizes = []
+
+        def slow_odd(buf):
+            # ungerade Werte brauchen länger: Worker überholen sich
+            if buf[0, 0] % 2:
+                time.sleep(0.01)
+
+        writer = PhotoWriter(lambda: seq.next_path(tmp), process=slow_odd,
+                             on_saved=lambda fn, n: sizes.append(n),
+                             workers=3, max_pending=20, ext=".png")
+        for i in range(20):
+            assert _submit(writer, i * 10)
+        assert writer.flush(5.0)
+        writer.stop()
+
+        for i in range(20):
+            img = cv2.imread(os.path.join(tmp, f"Nachtsicht_Foto{i + 1}.png"),
+                             cv2.IMREAD_GRAYSCALE)
+            assert img is not None and (img == i * 10).all(), i
+        assert writer.saved == 20 and len(sizes) == 20 and writer.errors == 0
+        print("  ✓ 20 Fotos mit 3 Workern, Nummern in Aufnahme-Reihenfolge")
+
+    img = np.random.default_rng(1).integers(0, 120, (48, 64), dtype=np.uint8)
+    ref = cv2.equalizeHist(img)
+    cv2.equalizeHist(img, dst=img)
+    assert (img == ref).all()
+    print("  ✓ equalizeHist an Ort und Stelle wie bisher")
+
+
+def test_backpressure():
+    """Test: volle Warteschlange verwirft, statt zu warten"""
+    print("[TEST] Rückstau...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gate = threading.Event()
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        writer = PhotoWriter(lambda: seq.next_path(tmp), process=lambda buf: gate.wait(),
+                             workers=1, max_pending=2)
+        assert _submit(writer, 1) and _submit(writer, 2)
+        t0 = time.perf_counter()
+        assert not _submit(writer, 3)
+        assert time.perf_counter() - t0 < 0.01
+        assert writer.pending() == 2 and writer.dropped == 1
+        print("  ✓ Drittes Foto sofort verworfen, pending() == 2")
+
+        assert not writer.flush(0.05)
+        gate.set()
+        assert writer.flush(5.0) and writer.pending() == 0
+        assert _submit(writer, 4) and writer.flush(5.0)
+        writer.stop()
+        assert writer.saved == 3 and writer.max_seen == 2
+        files = sorted(n for n in os.listdir(tmp) if not n.startswith("."))
+        assert files == ["Nachtsicht_Foto1.jpg", "Nachtsicht_Foto2.jpg", "Nachtsicht_Foto3.jpg"]
+        print("  ✓ Nach dem Abarbeiten wieder Platz, Puffer wiederverwendet")
+
+        # Andere Auflösung: alte Puffer verfallen, Grenze bleibt
+        writer = PhotoWriter(lambda: seq.next_path(tmp), workers=1, max_pending=2)
+        assert _submit(writer, 1) and writer.flush(5.0)
+        assert _submit(writer, 1, shape=(24, 32)) and _submit(writer, 1, shape=(24, 32))
+        assert writer.flush(5.0)
+        assert writer._allocated == 2
+        writer.stop()
+        print("  ✓ Auflösungswechsel")
+
+
+def test_errors():
+    """Test: Fehler im Worker halten die Reihenfolge nicht auf"""
+    print("[TEST] Fehler...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        names = iter(["a.jpg", os.path.join("fehlt", "b.jpg"), "c.jpg", "d.jpg"])
+
+        def process(buf):
+            if buf[0, 0] == 3:
+                raise ValueError("kaputt")
+
+        writer = PhotoWriter(lambda: os.path.join(tmp, next(names)), process=process,
+                             workers=2, max_pending=4)
+        for value in (1, 2, 3, 4):
+            assert _submit(writer, value)
+        assert writer.flush(5.0)
+        writer.stop()
+        assert writer.saved == 2 and writer.errors == 2
+        assert sorted(os.listdir(tmp)) == ["a.jpg", "c.jpg"]
+        print("  ✓ Schreib- und Bearbeitungsfehler gezählt, Worker laufen weiter")
+
+
+def test_benchmark():
+    """Benchmark: Serienbild, Zeit im Hauptthread und Durchsatz"""
+    print("[TEST] Benchmark Serienbild...")
+
+    shape = (960, 1280)
+    rng = np.random.default_rng(2)
+    frame = rng.integers(0, 90, shape, dtype=np.uint8)
+    n = 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        t0 = time.perf_counter()
+        for _ in range(n):
+            cv2.imwrite(seq.next_path(tmp), cv2.equalizeHist(frame))
+        sync_ms = (time.perf_counter() - t0) / n * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        writer = PhotoWriter(lambda: seq.next_path(tmp),
+                             process=lambda buf: cv2.equalizeHist(buf, dst=buf),
+                             workers=2, max_pending=n)
+        submit_s = 0.0
+        t0 = time.perf_counter()
+        for _ in range(n):
+            t1 = time.perf_counter()
+            buf = writer.acquire(shape)
+            np.copyto(buf, frame)
+            writer.submit(buf)
+            submit_s += time.perf_counter() - t1
+        assert writer.flush(30.0)
+        total_s = time.perf_counter() - t0
+        writer.stop()
+        assert writer.saved == n
+
+    print(f"  synchron {sync_ms:.1f} ms/Foto im Hauptthread | "
+          f"Warteschlange {submit_s / n * 1000:.2f} ms/Foto im Hauptthread")
+    print(f"  {n} Fotos 1280x960 in {total_s * 1000:.0f} ms = {n / total_s:.1f} Fotos/s, "
+          f"max. Rückstau {writer.max_seen}, {writer.latency * 1000:.0f} ms bis gespeichert")
+    print("  ✓ Hauptthread wartet nicht auf Kodierung und Speicher")
+
+
+def main():
+    print("=" * 50)
+    print("FOTO-WARTESCHLANGE TEST")
+    print("=" * 50)
+    test_order()
+    test_backpressure()
+    test_errors()
+    test_benchmark()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für die ereignisgesteuerte Hauptschleife
+Prüft Deskriptoren, benannte Timer, Wecken aus anderem Thread und
+dass im Leerlauf nicht gepollt wird
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from nightcam.reactor import Reactor
+
+
+def test_readers():
+    """Test: Callback nur für lesbare Deskriptoren"""
+    print("[TEST] Deskriptoren...")
+
+    reactor = Reactor()
+    r1, w1 = os.pipe()
+    r2, w2 = os.pipe()
+    got = []
+    reactor.add_reader(r1, lambda: got.append(os.read(r1, 100)))
+    reactor.add_reader(r2, lambda: got.append(os.read(r2, 100)))
+
+    os.write(w2, b"pty")
+    assert reactor.run_once(1.0) == 1
+    assert got == [b"pty"]
+
+    # Entfernt (auch nach close) -> kein Callback mehr
+    reactor.remove_reader(r2)
+    os.close(r2)
+    reactor.remove_reader(r2)
+    assert not reactor.has_reader(r2) and reactor.has_reader(r1)
+    os.write(w1, b"touch")
+    reactor.run_once(1.0)
+    assert got == [b"pty", b"touch"]
+
+    reactor.close()
+    for fd in (r1, w1, w2):
+        os.close(fd)
+    print("  ✓ Nur bereite Deskriptoren, remove_reader auch nach close")
+
+
+def test_timers():
+    """Test: Benannte Timer bestimmen das Timeout, ersetzen sich und lassen sich abbrechen"""
+    print("[TEST] Timer...")
+
+    reactor = Reactor()
+    fired = []
+    reactor.set_timer("gesture", 0.05, lambda: fired.append("gesture"))
+    reactor.set_timer("gesture", 0.02, lambda: fired.append("gesture2"))  # ersetzt
+    reactor.set_timer("perf", 10.0, lambda: fired.append("perf"))
+
+    t0 = time.monotonic()
+    assert reactor.run_once() == 1     # ohne Timeout: bis zum nächsten Timer
+    waited = time.monotonic() - t0
+    assert fired == ["gesture2"], fired
+    assert 0.015 < waited < 0.2, f"{waited * 1000:.1f} ms"
+    assert not reactor.timer_pending("gesture") and reactor.timer_pending("perf")
+
+    reactor.cancel_timer("perf")
+    assert reactor.run_once(0.01) == 0 and fired == ["gesture2"]
+
+    # Timer, der sich selbst neu setzt (wie das Perf-Log)
+    def again():
+        fired.append("again")
+        if fired.count("again") < 3:
+            reactor.set_timer("again", 0.0, again)
+
+    reactor.set_timer("again", 0.0, again)
+    for _ in range(5):
+        reactor.run_once(0.01)
+    assert fired.count("again") == 3
+    reactor.close()
+    print(f"  ✓ Ersetzt, abgebrochen, Timeout aus Timer ({waited * 1000:.0f} ms)")
+
+
+def test_waker():
+    """Test: Wecken aus anderem Thread (wie das Signal der Kamera)"""
+    print("[TEST] Waker...")
+
+    reactor = Reactor()
+    calls = []
+    waker = reactor.waker(lambda: calls.append(threading.current_thread()))
+
+    def camera():
+        time.sleep(0.02)
+        waker.signal()
+
+    t = threading.Thread(target=camera)
+    t.start()
+    t0 = time.monotonic()
+    reactor.run_once(1.0)
+    latency = time.monotonic() - t0
+    t.join()
+    assert calls == [threading.current_thread()], "Callback im Reactor-Thread"
+    assert latency < 0.5
+
+    # Signal ist abgeholt: nächstes run_once wartet wieder
+    assert reactor.run_once(0.01) == 0
+
+    # Mehrfach vor dem Abholen -> ein Callback
+    waker.signal()
+    waker.signal()
+    assert reactor.run_once(0) == 1 and len(calls) == 2
+    assert reactor.run_once(0) == 0
+    reactor.close()
+    print(f"  ✓ Geweckt nach {latency * 1000:.0f} ms, Callback im Reactor-Thread")
+
+
+def test_idle_does_not_poll():
+    """Messung: Ohne Ereignisse kaum Aufwachen und fast keine CPU"""
+    print("[TEST] Leerlauf...")
+
+    reactor = Reactor()
+    r, w = os.pipe()
+    reactor.add_reader(r, lambda: os.read(r, 100))
+    reactor.set_timer("perf", 0.2, lambda: None)
+
+    cpu0 = time.process_time()
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < 0.2:
+        reactor.run_once()
+    cpu = time.process_time() - cpu0
+    wakeups, calls, idle_pct = reactor.stats()
+    print(f"  {wakeups:.0f} Wakeups/s, {calls:.0f} Callbacks/s, "
+          f"{idle_pct:.0f}% wartend, CPU {cpu * 1000:.1f} ms")
+    assert wakeups < 20, "Sollte nur für den Timer aufwachen"
+    assert idle_pct > 80
+    reactor.close()
+    os.close(r)
+    os.close(w)
+    print("  ✓ Schläft bis zum Timer statt zu pollen")
+
+
+def main():
+    print("=" * 50)
+    print("REACTOR TEST")
+    print("=" * 50)
+
+    test_readers()
+    test_timers()
+    test_waker()
+    test_idle_does_not_poll()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
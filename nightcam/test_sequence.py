@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für die Dateinummern-Vergabe
+Prüft Sidecar-Datei, Abgleich bei fehlender/veralteter Sidecar (auch über
+Tagesverzeichnisse), Wechsel des Verzeichnisses (anderer Stick) und misst
+gegen den glob-Scan mit 10.000 vorhandenen Dateien
+"""
+
+import sys
+import os
+import glob
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from nightcam.sequence import SequenceAllocator
+
+
+def _touch(directory, n):
+    open(os.path.join(directory, f"Nachtsicht_Foto{n}.jpg"), "w").close()
+
+
+def _glob_next(pdir):
+    """Bisheriges next_photo(): glob + alle Namen parsen (Referenz)"""
+    ex = glob.glob(os.path.join(pdir, "Nachtsicht_Foto*.jpg"))
+    n = 0
+    for p in ex:
+        b = os.path.basename(p)
+        try:
+            n = max(n, int(b.replace("Nachtsicht_Foto", "").replace(".jpg", "")))
+        except ValueError:
+            pass
+    return os.path.join(pdir, f"Nachtsicht_Foto{n+1}.jpg")
+
+
+def test_sidecar():
+    """Test: einmal scannen, danach nur Sidecar"""
+    print("[TEST] Sidecar...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (1, 2, 7):
+            _touch(tmp, n)
+        _touch(tmp, "x")    # kein gültiger Name
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        assert seq.next_path(tmp).endswith("Nachtsicht_Foto8.jpg")
+        assert seq.next_path(tmp).endswith("Nachtsicht_Foto9.jpg")
+        assert seq.scans == 1
+        with open(os.path.join(tmp, ".Nachtsicht_Foto.seq")) as f:
+            assert f.read().strip() == "10"
+        print("  ✓ Ein Scan, danach fortlaufend; Sidecar enthält die nächste Nummer")
+
+        # Neuer Prozess: Sidecar + ein Abgleich, danach kein Scan mehr
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        assert seq.next_path(tmp).endswith("Nachtsicht_Foto10.jpg")
+        assert seq.next_path(tmp).endswith("Nachtsicht_Foto11.jpg")
+        assert seq.scans == 1
+        print("  ✓ Neustart: ein Abgleich, danach fortlaufend")
+
+
+def test_reconcile():
+    """Test: fehlende, kaputte oder veraltete Sidecar -> Abgleich"""
+    print("[TEST] Abgleich...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sidecar = os.path.join(tmp, ".Nachtsicht_Foto.seq")
+        for n in range(1, 6):
+            _touch(tmp, n)
+
+        # Veraltet (z.B. nach Hot-Unplug nicht mehr geschrieben)
+        with open(sidecar, "w") as f:
+            f.write("3\n")
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        assert seq.next_path(tmp).endswith("Nachtsicht_Foto6.jpg") and seq.scans == 1
+
+        # Kaputt
+        with open(sidecar, "w") as f:
+            f.write("???")
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        assert seq.next_path(tmp).endswith("Nachtsicht_Foto6.jpg") and seq.scans == 1
+
+        # Fremde Datei mit der nächsten Nummer (z.B. vom PC kopiert)
+        _touch(tmp, 7)
+        _touch(tmp, 20)
+        assert seq.next_path(tmp).endswith("Nachtsicht_Foto21.jpg") and seq.scans == 2
+        print("  ✓ Nie eine vorhandene Datei, Abgleich nur bei Bedarf")
+
+        # Veraltete Sidecar, Nummern liegen in einem anderen Tagesverzeichnis
+        os.makedirs(os.path.join(tmp, "2026-03-14"))
+        _touch(os.path.join(tmp, "2026-03-14"), 30)
+        os.makedirs(os.path.join(tmp, "2026-03-15"))
+        with open(sidecar, "w") as f:
+            f.write("25\n")
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        assert seq.next_path(tmp, os.path.join(tmp, "2026-03-15")).endswith(
+            os.path.join("2026-03-15", "Nachtsicht_Foto31.jpg"))
+        print("  ✓ Keine doppelten Nummern über Tagesverzeichnisse")
+
+
+def test_directory_change():
+    """Test: anderes Verzeichnis / neu angelegtes Verzeichnis am selben Pfad"""
+    print("[TEST] Verzeichniswechsel...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        a = os.path.join(tmp, "a")
+        b = os.path.join(tmp, "b")
+        os.makedirs(a)
+        os.makedirs(b)
+        _touch(b, 41)
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        assert seq.next_path(a).endswith("Nachtsicht_Foto1.jpg")
+        assert seq.next_path(b).endswith("Nachtsicht_Foto42.jpg")
+
+        # "Anderer Stick": gleicher Pfad, anderes Verzeichnis
+        os.rename(a, a + "_alt")
+        os.makedirs(a)
+        _touch(a, 99)
+        assert seq.next_path(a).endswith("Nachtsicht_Foto100.jpg")
+        print("  ✓ Neuer Stick am selben Mountpoint wird erkannt")
+
+
+def test_benchmark():
+    """Benchmark: glob-Scan gegen Sidecar bei 10.000 vorhandenen Fotos"""
+    print("[TEST] Benchmark 10.000 Dateien...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in range(1, 10_001):
+            _touch(tmp, n)
+
+        def measure(fn, n=20):
+            t0 = time.perf_counter()
+            for _ in range(n):
+                path = fn()
+                _touch(tmp, os.path.basename(path)[len("Nachtsicht_Foto"):-len(".jpg")])
+            return (time.perf_counter() - t0) / n * 1000
+
+        glob_ms = measure(lambda: _glob_next(tmp))
+        seq = SequenceAllocator("Nachtsicht_Foto", ".jpg")
+        t0 = time.perf_counter()
+        seq.next_path(tmp)      # einmaliger Scan
+        first_ms = (time.perf_counter() - t0) * 1000
+        seq_ms = measure(lambda: seq.next_path(tmp))
+        assert seq.scans == 1
+        print(f"  glob {glob_ms:.2f} ms/Foto | Sidecar {seq_ms:.3f} ms/Foto "
+              f"(erster Zugriff mit Scan {first_ms:.1f} ms)")
+        print("  ✓ Pro Foto kein Verzeichnis-Scan mehr")
+
+
+def main():
+    print("=" * 50)
+    print("DATEINUMMERN TEST")
+    print("=" * 50)
+    test_sidecar()
+    test_reconcile()
+    test_directory_change()
+    test_benchmark()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
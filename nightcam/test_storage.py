@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für die Speicher-Überwachung
+Prüft mountinfo-Auswertung, USB-Erkennung, Auto-Mount-Sperre nach
+manuellem Unmount und den Hintergrund-Thread
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from nightcam.storage import StorageMonitor, parse_mountpoints, find_usb_mount
+
+ROOT_LINE = "22 1 179:2 / / rw,noatime shared:1 - ext4 /dev/root rw\n"
+
+
+def _usb_line(path):
+    return f"35 22 8:1 / {path} rw,relatime shared:20 - vfat /dev/sda1 rw\n"
+
+
+class _Monitor(StorageMonitor):
+    """Zählt Auto-Mount-Versuche statt sudo mount aufzurufen"""
+
+    def __init__(self, *args, **kwargs):
+        self.mount_calls = 0
+        super().__init__(*args, **kwargs)
+
+    def _mount(self):
+        self.mount_calls += 1
+        return True
+
+
+def test_parse():
+    """Test: Mountpoints aus mountinfo, USB nach base_paths"""
+    print("[TEST] mountinfo...")
+
+    text = ROOT_LINE + _usb_line("/media/pi/usb\\040stick") + _usb_line("/media/usb")
+    mounts = parse_mountpoints(text)
+    assert mounts == ["/", "/media/pi/usb stick", "/media/usb"], mounts
+    assert find_usb_mount(mounts, ("/media/valentin", "/media/pi", "/media")) == "/media/pi/usb stick"
+    assert find_usb_mount(mounts, ("/media",)) == "/media/usb"
+    assert find_usb_mount(["/", "/media/data", "/mnt/usb"], ("/media",)) is None
+    print("  ✓ Oktal-Escapes, Reihenfolge der Basis-Pfade")
+
+
+def test_snapshot_and_automount():
+    """Test: Snapshot folgt Mounts, Auto-Mount nur ohne manuellen Unmount"""
+    print("[TEST] Snapshot / Auto-Mount...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mountinfo = os.path.join(tmp, "mountinfo")
+        device = os.path.join(tmp, "sda1")
+        usb = os.path.join(tmp, "usb0")
+        os.makedirs(usb)
+        with open(mountinfo, "w") as f:
+            f.write(ROOT_LINE)
+
+        storage = _Monitor(fallback=tmp, usb_dev=device, base_paths=(tmp,),
+                           mountinfo=mountinfo)
+        snap = storage.snapshot
+        assert snap.usb is None and snap.root == tmp and not snap.device_present
+        assert snap.free_bytes > 0
+
+        # Stick eingesteckt -> ein Auto-Mount-Versuch, danach eingehängt
+        open(device, "w").close()
+        storage.update()
+        assert storage.mount_calls == 1 and storage.snapshot.device_present
+        with open(mountinfo, "w") as f:
+            f.write(ROOT_LINE + _usb_line(usb))
+        storage.update()
+        assert storage.snapshot.usb == usb and storage.snapshot.root == usb
+        print("  ✓ Eingesteckt -> gemountet -> root auf dem Stick")
+
+        # Manueller Unmount: kein erneutes Einhängen, bis der Stick weg ist
+        storage.suppress_automount()
+        with open(mountinfo, "w") as f:
+            f.write(ROOT_LINE)
+        storage.update()
+        storage.update()
+        assert storage.snapshot.usb is None and storage.snapshot.root == tmp
+        assert storage.mount_calls == 1
+        os.remove(device)
+        storage.update()
+        open(device, "w").close()
+        storage.update()
+        assert storage.mount_calls == 2, "nach Entfernen wieder Auto-Mount"
+        print("  ✓ Manueller Unmount sperrt Auto-Mount bis zum Abziehen")
+
+        # Ohne Änderung und ohne Messung bleibt der Snapshot derselbe
+        snap = storage.snapshot
+        assert storage.update(rescan=False, remeasure=False) is False
+        assert storage.snapshot is snap
+        print("  ✓ Unverändert -> kein neuer Snapshot")
+
+
+def test_thread():
+    """Test: Hintergrund-Thread auf dem echten mountinfo"""
+    print("[TEST] Monitor-Thread...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageMonitor(fallback=tmp, usb_dev=os.path.join(tmp, "sda1"),
+                                 auto_mount=False, free_interval=0.05)
+        storage.start()
+        first = storage.snapshot
+        deadline = time.monotonic() + 1.0
+        while storage.snapshot is first and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert storage.snapshot is not first, "free_interval sollte neu messen"
+        assert storage.snapshot.root == tmp
+        storage.refresh()
+        storage.stop()
+        assert not storage.is_alive()
+    print("  ✓ Misst im Hintergrund, stop() beendet den Thread")
+
+
+def main():
+    print("=" * 50)
+    print("SPEICHER-ÜBERWACHUNG TEST")
+    print("=" * 50)
+    test_parse()
+    test_snapshot_and_automount()
+    test_thread()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für die blockweise Touch-Eingabe
+Prüft Dekodierung, Zusammenfassen pro SYN_REPORT, Kernel-Zeitstempel,
+SYN_DROPPED und die Anzahl der Lesezugriffe
+"""
+
+import sys
+import os
+import struct
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from nightcam.touch import (TouchReader, GestureRecognizer, TouchThread, TouchUp,
+                            EVENT_STRUCT, EV_SYN, EV_KEY, EV_ABS,
+                            SYN_REPORT, SYN_DROPPED, ABS_X, ABS_Y, BTN_TOUCH)
+
+
+def _event(t, etype, code, value):
+    sec = int(t)
+    return struct.pack(EVENT_STRUCT, sec, round((t - sec) * 1e6), etype, code, value)
+
+
+def _report(t, x=None, y=None, touch=None):
+    data = b""
+    if x is not None:
+        data += _event(t, EV_ABS, ABS_X, x)
+    if y is not None:
+        data += _event(t, EV_ABS, ABS_Y, y)
+    if touch is not None:
+        data += _event(t, EV_KEY, BTN_TOUCH, touch)
+    return data + _event(t, EV_SYN, SYN_REPORT, 0)
+
+
+def _pipe():
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    return r, w
+
+
+def test_tap():
+    """Test: Tap mit Kernel-Zeitstempeln, Position der letzten Meldung"""
+    print("[TEST] Tap...")
+
+    r, w = _pipe()
+    reader = TouchReader(r)
+    assert reader.read() == []
+
+    os.write(w, _report(100.0, 1000, 2000, touch=1))
+    assert reader.read() == []
+    assert reader.finger_down and reader.down_time == 100.0
+    assert (reader.x, reader.y) == (1000, 2000)
+
+    # Wischen: viele Meldungen, nur die letzte Position zählt
+    os.write(w, b"".join(_report(100.0 + i * 0.01, 1000 + i, 2000 - i) for i in range(20)))
+    os.write(w, _report(100.25, touch=0))
+    ups = reader.read()
+    assert len(ups) == 1
+    up = ups[0]
+    assert abs(up.press_len - 0.25) < 1e-6 and abs(up.time - 100.25) < 1e-6
+    assert (up.x, up.y) == (1019, 1981) and not reader.finger_down
+    print(f"  ✓ Druckdauer {up.press_len:.2f} s aus Kernel-Zeiten, Position ({up.x}, {up.y})")
+
+    os.close(r)
+    os.close(w)
+
+
+def test_bulk_reads():
+    """Test: viele Events pro Systemaufruf"""
+    print("[TEST] Blockweises Lesen...")
+
+    r, w = _pipe()
+    reader = TouchReader(r, max_events=64)
+    reports = 100
+    os.write(w, b"".join(_report(1.0 + i * 0.005, i, i) for i in range(reports)))
+    reader.read()
+    events, reads, committed = reader.stats()
+    assert events == reports * 3 and committed == reports
+    # 300 Events à 64 pro Aufruf -> 5 Aufrufe (der letzte nicht voll)
+    assert reads <= events // 64 + 1, f"{reads} Lesezugriffe"
+    assert (reader.x, reader.y) == (reports - 1, reports - 1)
+    print(f"  ✓ {events} Events in {reads} Lesezugriffen")
+
+    os.close(r)
+    os.close(w)
+
+
+def test_syn_dropped():
+    """Test: Nach SYN_DROPPED wird die unvollständige Meldung verworfen"""
+    print("[TEST] SYN_DROPPED...")
+
+    r, w = _pipe()
+    reader = TouchReader(r)
+    os.write(w, _report(5.0, 10, 20, touch=1))
+    os.write(w, _event(5.1, EV_ABS, ABS_X, 999) + _event(5.1, EV_SYN, SYN_DROPPED, 0)
+             + _event(5.1, EV_ABS, ABS_Y, 999) + _event(5.1, EV_SYN, SYN_REPORT, 0))
+    os.write(w, _report(5.3, touch=0))
+    ups = reader.read()
+    assert (reader.x, reader.y) == (10, 20), "verworfene Werte übernommen"
+    assert len(ups) == 1 and abs(ups[0].press_len - 0.3) < 1e-6
+    print("  ✓ Verworfene Meldung ignoriert, Tap bleibt erhalten")
+
+    os.close(r)
+    os.close(w)
+
+
+def test_recognizer():
+    """Test: Tap, Doppeltap, lang und Halten nach Zeitstempeln"""
+    print("[TEST] Gestenerkennung...")
+
+    rec = GestureRecognizer(long_press=0.8, double_gap=0.35, hold=2.5)
+
+    def kinds(gestures):
+        return [g.kind for g in gestures]
+
+    # Tap steht erst nach Ablauf des Doppeltap-Fensters fest
+    assert kinds(rec.feed([TouchUp(0.1, 10.0, 1, 2)], False, 9.9, 1, 2)) == ["up"]
+    assert abs(rec.deadline(10.1) - 0.25) < 1e-9
+    assert rec.poll(10.2) == []
+    taps = rec.poll(10.4)
+    assert kinds(taps) == ["tap"] and taps[0].time == 10.0 and abs(taps[0].due - 10.35) < 1e-9
+    assert rec.deadline(10.4) is None
+
+    # Doppeltap: zweites Loslassen innerhalb des Fensters
+    rec.feed([TouchUp(0.1, 20.0, 0, 0)], False, 19.9, 0, 0)
+    assert kinds(rec.feed([TouchUp(0.1, 20.3, 0, 0)], False, 20.2, 0, 0)) == ["up", "double"]
+    assert rec.poll(21.0) == []
+
+    # Zwei Taps im selben Block, aber weiter auseinander als das Fenster
+    gestures = rec.feed([TouchUp(0.1, 30.0, 0, 0), TouchUp(0.1, 30.5, 0, 0)], False, 30.4, 0, 0)
+    assert kinds(gestures) == ["up", "tap", "up"]
+
+    # Langer Druck verwirft einen wartenden Tap
+    rec.poll(40.0)
+    rec.feed([TouchUp(0.1, 40.0, 0, 0)], False, 39.9, 0, 0)
+    assert kinds(rec.feed([TouchUp(1.0, 40.2, 0, 0)], False, 39.2, 0, 0)) == ["up", "long"]
+    assert rec.poll(41.0) == []
+
+    # Halten: einmal pro Druck, ohne Loslassen
+    rec.feed([], True, 50.0, 7, 8)
+    assert abs(rec.deadline(51.0) - 1.5) < 1e-9
+    holds = rec.poll(52.6)
+    assert kinds(holds) == ["hold"] and (holds[0].x, holds[0].y) == (7, 8)
+    assert rec.poll(53.0) == [] and rec.deadline(53.0) is None
+    rec.feed([TouchUp(3.5, 53.5, 7, 8)], False, 50.0, 7, 8)
+    rec.feed([], True, 60.0, 0, 0)
+    assert kinds(rec.poll(62.5)) == ["hold"], "neuer Druck -> neues Halten"
+    print("  ✓ tap / double / long / hold")
+
+
+def test_thread():
+    """Test: Touch-Thread erkennt Gesten unabhängig vom Abholer"""
+    print("[TEST] Touch-Thread...")
+
+    r, w = _pipe()
+    notified = threading.Event()
+    thread = TouchThread(r, GestureRecognizer(0.8, 0.05, hold=None), notify=notified.set)
+    thread.start()
+
+    # Abholer ist "beschäftigt": Tap wird trotzdem sofort erkannt
+    now = time.time()
+    os.write(w, _report(now - 0.1, 100, 200, touch=1) + _report(now, touch=0))
+    assert notified.wait(1.0), "Kein notify"
+    deadline = time.time() + 1.0
+    while thread.pending() < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)     # Abholung verzögert
+    gestures = thread.get()
+    assert [g.kind for g in gestures] == ["up", "tap"], gestures
+    assert abs(gestures[0].press_len - 0.1) < 1e-3
+    count, publish_ms, consume_ms, consume_max = thread.stats()
+    assert count == 2
+    assert publish_ms < 100, f"Erkennung {publish_ms:.1f} ms"
+    assert consume_max >= 90, "Abhol-Latenz sollte die Verzögerung zeigen"
+    print(f"  ✓ Erkannt nach {publish_ms:.1f} ms, abgeholt nach {consume_ms:.0f} ms")
+
+    thread.stop()
+    assert not thread.is_alive()
+    os.close(r)
+    os.close(w)
+    print("  ✓ stop() beendet den Thread")
+
+
+def main():
+    print("=" * 50)
+    print("TOUCH-EINGABE TEST")
+    print("=" * 50)
+    test_tap()
+    test_bulk_reads()
+    test_syn_dropped()
+    test_recognizer()
+    test_thread()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Touch-Eingabe (evdev) in Blöcken
+
+Ein Wischen auf dem ADS7846 erzeugt hunderte Events pro Sekunde. Statt pro
+Event select() + read(24) aufzurufen, liest TouchReader so viele Events wie
+in den Puffer passen mit einem Systemaufruf (bis EAGAIN), dekodiert sie per
+struct.iter_unpack in einem Durchgang und übernimmt ABS-Werte erst beim
+SYN_REPORT (nur die letzte Position pro Meldung zählt). Finger-Down/-Up
+behalten den Zeitstempel des Kernels, damit Tap-Dauern auch dann stimmen,
+wenn die Hauptschleife gerade hängt (Foto speichern, Unmount ...).
+
+TouchThread liest das Gerät in einem eigenen Thread, erkennt dort Tap,
+Doppeltap, langen Druck und Halten (GestureRecognizer, ebenfalls auf den
+Kernel-Zeitstempeln) und legt fertige Gesten in eine Warteschlange, die
+die Oberfläche abholt. Die Erkennung hängt damit nicht mehr davon ab, wie
+lange die Hauptschleife für einen Frame braucht.
+"""
+
+import os
+import select
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+from nightcam.reactor import Waker
+
+# struct input_event: timeval(sec, usec), type, code, value
+EVENT_STRUCT = "llHHi"
+EVENT_SIZE = struct.calcsize(EVENT_STRUCT)
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_ABS = 0x03
+SYN_REPORT = 0
+SYN_DROPPED = 3
+ABS_X = 0x00
+ABS_Y = 0x01
+BTN_TOUCH = 0x14a
+
+# Finger losgelassen: Druckdauer, Zeitpunkt (Kernel, wie time.time()) und
+# Rohposition der letzten Meldung
+TouchUp = namedtuple("TouchUp", "press_len time x y")
+
+# Erkannte Geste:
+#   kind      "up" (jedes Loslassen), "tap", "double", "long", "hold"
+#   time      Kernel-Zeit des auslösenden Loslassens (bei "hold": des Drückens)
+#   due       Zeitpunkt, ab dem die Geste feststand (Basis der Latenzmessung)
+#   x, y      Rohposition
+#   press_len Druckdauer (bei "hold": bisher gehalten)
+Gesture = namedtuple("Gesture", "kind time due x y press_len")
+
+
+class TouchReader:
+    """
+    Liest Touch-Events blockweise von einem nicht-blockierenden evdev-fd
+
+    Verwendung:
+
+        reader = TouchReader(touch_fd)
+        for up in reader.read():        # wenn fd lesbar ist
+            ... up.press_len, up.x, up.y
+        reader.x, reader.y, reader.finger_down, reader.down_time
+    """
+
+    def __init__(self, fd, max_events=64):
+        """
+        Args:
+            fd: evdev-Deskriptor (O_NONBLOCK)
+            max_events: Events pro Systemaufruf
+        """
+        self.fd = fd
+        self._buffer = bytearray(max_events * EVENT_SIZE)
+        self._view = memoryview(self._buffer)
+
+        self.x = 0              # Rohposition nach der letzten SYN_REPORT
+        self.y = 0
+        self.finger_down = False
+        self.down_time = 0.0    # Kernel-Zeitstempel des Finger-Down
+
+        # Werte seit der letzten SYN_REPORT
+        self._pending_x = None
+        self._pending_y = None
+        self._pending_touch = None
+        self._dropped = False   # SYN_DROPPED: Rest bis zur nächsten Meldung verwerfen
+
+        self.error = None       # OSError außer EAGAIN (z.B. Gerät entfernt)
+
+        self.events = 0         # dekodierte Events seit stats()
+        self.reads = 0          # read-Systemaufrufe seit stats()
+        self.reports = 0        # übernommene SYN_REPORTs seit stats()
+
+    def read(self):
+        """
+        Liest alle anstehenden Events
+
+        Returns:
+            Liste von TouchUp (Finger losgelassen), meist leer
+        """
+        ups = []
+        view = self._view
+        size = len(self._buffer)
+        while True:
+            try:
+                n = os.readv(self.fd, [self._buffer])
+            except BlockingIOError:
+                break
+            except OSError as e:
+                self.error = e
+                break
+            self.reads += 1
+            if n <= 0:
+                break
+            n -= n % EVENT_SIZE     # evdev liefert nur ganze Events
+            self._decode(view[:n], ups)
+            if n < size:
+                break   # Puffer nicht voll: Gerät ist leer, EAGAIN sparen
+        return ups
+
+    def _decode(self, data, ups):
+        for sec, usec, etype, code, value in struct.iter_unpack(EVENT_STRUCT, data):
+            self.events += 1
+            if etype == EV_SYN:
+                if code == SYN_REPORT:
+                    if self._dropped:
+                        self._dropped = False
+                    else:
+                        self._commit(sec + usec * 1e-6, ups)
+                elif code == SYN_DROPPED:
+                    self._dropped = True
+                    self._pending_x = self._pending_y = self._pending_touch = None
+            elif self._dropped:
+                continue
+            elif etype == EV_ABS:
+                if code == ABS_X:
+                    self._pending_x = value
+                elif code == ABS_Y:
+                    self._pending_y = value
+            elif etype == EV_KEY and code == BTN_TOUCH:
+                self._pending_touch = value
+
+    def _commit(self, t, ups):
+        """Übernimmt eine vollständige Meldung (Zeitstempel t)"""
+        self.reports += 1
+        if self._pending_x is not None:
+            self.x = self._pending_x
+        if self._pending_y is not None:
+            self.y = self._pending_y
+        touch = self._pending_touch
+        self._pending_x = self._pending_y = self._pending_touch = None
+
+        # value 1 = down, 0 = up
+        if touch == 1 and not self.finger_down:
+            self.finger_down = True
+            self.down_time = t
+        elif touch == 0 and self.finger_down:
+            self.finger_down = False
+            ups.append(TouchUp(t - self.down_time, t, self.x, self.y))
+
+    def stats(self):
+        """
+        Returns:
+            (events, reads, reports) seit der letzten Abfrage
+        """
+        result = (self.events, self.reads, self.reports)
+        self.events = self.reads = self.reports = 0
+        return result
+
+
+class GestureRecognizer:
+    """
+    Tap/Doppeltap/lang/Halten aus TouchUp-Events und Finger-Zustand
+
+    Rein zeitgesteuert über die übergebenen Zeitstempel (Kernel-Zeit bzw.
+    time.time()), ohne eigene Threads: feed() nach jedem Lesen, poll() wenn
+    deadline() abgelaufen ist.
+    """
+
+    def __init__(self, long_press, double_gap, hold=None):
+        """
+        Args:
+            long_press: ab dieser Druckdauer "long" statt Tap
+            double_gap: Doppeltap-Fenster; ein Tap gilt erst danach als "tap"
+            hold: "hold" sobald der Finger so lange unten ist (None = aus)
+        """
+        self.long_press = long_press
+        self.double_gap = double_gap
+        self.hold = hold
+
+        self._pending = None    # TouchUp, wartet auf den zweiten Tap
+        self._hold_sent = False
+        self.finger_down = False
+        self.down_time = 0.0
+        self.x = 0
+        self.y = 0
+
+    def feed(self, ups, finger_down, down_time, x, y):
+        """
+        Übernimmt neu gelesene Events
+
+        Args:
+            ups: TouchUp-Liste aus TouchReader.read()
+            finger_down, down_time, x, y: Zustand des TouchReader danach
+
+        Returns:
+            Liste erkannter Gesten
+        """
+        out = []
+        for up in ups:
+            self._expire(up.time, out)
+            out.append(Gesture("up", up.time, up.time, up.x, up.y, up.press_len))
+            if up.press_len >= self.long_press:
+                self._pending = None
+                out.append(Gesture("long", up.time, up.time, up.x, up.y, up.press_len))
+            elif self._pending is not None:
+                self._pending = None
+                out.append(Gesture("double", up.time, up.time, up.x, up.y, up.press_len))
+            else:
+                self._pending = up
+
+        if finger_down and down_time != self.down_time:
+            self._hold_sent = False     # neuer Druck
+        self.finger_down = finger_down
+        self.down_time = down_time
+        self.x, self.y = x, y
+        return out
+
+    def _expire(self, now, out):
+        pending = self._pending
+        if pending is not None and now - pending.time >= self.double_gap:
+            self._pending = None
+            out.append(Gesture("tap", pending.time, pending.time + self.double_gap,
+                               pending.x, pending.y, pending.press_len))
+
+    def poll(self, now):
+        """
+        Zeitabhängige Gesten (Tap nach Ablauf des Doppeltap-Fensters, Halten)
+
+        Returns:
+            Liste erkannter Gesten
+        """
+        out = []
+        self._expire(now, out)
+        if (self.hold is not None and self.finger_down and not self._hold_sent
+                and now - self.down_time >= self.hold):
+            self._hold_sent = True
+            out.append(Gesture("hold", self.down_time, self.down_time + self.hold,
+                               self.x, self.y, now - self.down_time))
+        return out
+
+    def deadline(self, now):
+        """Sekunden, bis poll() etwas liefern kann, sonst None"""
+        waits = []
+        if self._pending is not None:
+            waits.append(self._pending.time + self.double_gap - now)
+        if self.hold is not None and self.finger_down and not self._hold_sent:
+            waits.append(self.down_time + self.hold - now)
+        return max(0.0, min(waits)) if waits else None
+
+
+class TouchThread(threading.Thread):
+    """
+    Liest Touch-Events in eigenem Thread und veröffentlicht Gesten
+
+    Verwendung:
+
+        touch = TouchThread(touch_fd, GestureRecognizer(0.8, 0.35, 2.5),
+                            notify=reactor.waker(on_touch).signal)
+        touch.start()
+        ...
+        for gesture in touch.get():     # im Hauptthread (on_touch)
+            ...
+        touch.stop()
+    """
+
+    def __init__(self, fd, recognizer, notify=None, clock=time.time):
+        """
+        Args:
+            fd: evdev-Deskriptor (O_NONBLOCK)
+            recognizer: GestureRecognizer
+            notify: wird (im Touch-Thread) nach neuen Gesten aufgerufen
+            clock: Zeitquelle in der Zeitbasis der Kernel-Zeitstempel
+        """
+        super().__init__(name="touch", daemon=True)
+        self.reader = TouchReader(fd)
+        self.recognizer = recognizer
+        self.clock = clock
+        self._notify = notify
+        self._queue = deque()   # append/popleft sind thread-sicher
+        self._stop_waker = Waker()
+        self._running = True
+
+        # Latenzen in Sekunden seit stats(): due -> veröffentlicht / abgeholt
+        self._lock = threading.Lock()
+        self.published = 0
+        self._publish_sum = 0.0
+        self._consumed = 0
+        self._consume_sum = 0.0
+        self._consume_max = 0.0
+
+    def run(self):
+        fd = self.reader.fd
+        wake = self._stop_waker.fileno()
+        while self._running:
+            timeout = self.recognizer.deadline(self.clock())
+            try:
+                readable, _, _ = select.select([fd, wake], [], [], timeout)
+            except (OSError, ValueError):
+                break   # fd geschlossen
+            if not self._running:
+                break
+
+            reader = self.reader
+            ups = reader.read() if fd in readable else []
+            if reader.error is not None:
+                print(f"[TOUCH] Lesefehler: {reader.error}")
+                break
+            gestures = self.recognizer.feed(ups, reader.finger_down, reader.down_time,
+                                            reader.x, reader.y)
+            gestures += self.recognizer.poll(self.clock())
+            if gestures:
+                self._publish(gestures)
+
+    def _publish(self, gestures):
+        now = self.clock()
+        with self._lock:
+            self.published += len(gestures)
+            self._publish_sum += sum(now - g.due for g in gestures)
+        self._queue.extend(gestures)
+        if self._notify is not None:
+            self._notify()
+
+    def get(self):
+        """Holt alle wartenden Gesten (älteste zuerst)"""
+        gestures = []
+        while self._queue:
+            gestures.append(self._queue.popleft())
+        if gestures:
+            now = self.clock()
+            with self._lock:
+                for g in gestures:
+                    latency = now - g.due
+                    self._consumed += 1
+                    self._consume_sum += latency
+                    self._consume_max = max(self._consume_max, latency)
+        return gestures
+
+    def pending(self):
+        """Anzahl noch nicht abgeholter Gesten"""
+        return len(self._queue)
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        self._stop_waker.signal()
+        if self.is_alive():
+            self.join(timeout)
+        self._stop_waker.close()
+
+    def stats(self):
+        """
+        Returns:
+            (gesten, veröffentlicht_ms, abgeholt_ms_mittel, abgeholt_ms_max)
+            seit der letzten Abfrage; Latenzen ab dem Zeitpunkt, an dem die
+            Geste feststand
+        """
+        with self._lock:
+            published, consumed = self.published, self._consumed
+            result = (published,
+                      1000.0 * self._publish_sum / published if published else 0.0,
+                      1000.0 * self._consume_sum / consumed if consumed else 0.0,
+                      1000.0 * self._consume_max)
+            self.published = self._consumed = 0
+            self._publish_sum = self._consume_sum = self._consume_max = 0.0
+        return result
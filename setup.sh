@@ -99,6 +99,7 @@ echo "[5/8] Programm-Dateien kopieren..."
 cp "$SCRIPT_DIR/nachtsicht_fullscreen.py" /opt/nachtsicht/
 cp "$SCRIPT_DIR/nachtsicht_optimized.py" /opt/nachtsicht/
 chmod +x /opt/nachtsicht/*.py
+cp -r "$SCRIPT_DIR/nightcam" /opt/nachtsicht/
 
 if [ -d "$SCRIPT_DIR/terminal_access" ]; then
     echo "  ✓ Terminal Access Modul"
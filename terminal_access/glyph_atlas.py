@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bitmap-Schrift mit festen Zellen für den Terminal Emulator
+
+Alle druckbaren ASCII-Zeichen werden einmal per cv2.putText in einen
+Glyphen-Atlas (N x Zellhöhe x Zellbreite, Deckkraft 0-255) gerendert. Für
+jedes benutzte Farbpaar (Vorder-/Hintergrund) entsteht einmalig ein fertig
+eingefärbter Satz Kacheln. Das Zusammensetzen des Bildschirms ist danach
+ein einziges np.take über ein Index-Array (Zelle -> Farbpaar * N + Zeichen),
+Farben kosten also nichts extra.
+"""
+
+import cv2
+import numpy as np
+
+FIRST_CHAR = 32
+LAST_CHAR = 126
+FALLBACK = "?"
+
+DEFAULT_FG = (200, 200, 200)
+DEFAULT_BG = (0, 0, 0)
+
+# pyte-Farbnamen -> BGR
+ANSI_COLORS = {
+    "black":         (0, 0, 0),
+    "red":           (0, 0, 205),
+    "green":         (0, 205, 0),
+    "brown":         (0, 205, 205),
+    "yellow":        (0, 205, 205),
+    "blue":          (238, 0, 0),
+    "magenta":       (205, 0, 205),
+    "cyan":          (205, 205, 0),
+    "white":         (229, 229, 229),
+    "brightblack":   (127, 127, 127),
+    "brightred":     (0, 0, 255),
+    "brightgreen":   (0, 255, 0),
+    "brightbrown":   (0, 255, 255),
+    "brightyellow":  (0, 255, 255),
+    "brightblue":    (255, 92, 92),
+    "brightmagenta": (255, 0, 255),
+    "brightcyan":    (255, 255, 0),
+    "brightwhite":   (255, 255, 255),
+}
+
+
+def parse_color(name, default):
+    """
+    pyte-Farbe (Name, "default" oder Hex "rrggbb") -> BGR
+
+    Returns:
+        (b, g, r) Tupel
+    """
+    if name == "default" or not name:
+        return default
+    color = ANSI_COLORS.get(name)
+    if color is not None:
+        return color
+    if len(name) == 6:
+        try:
+            r, g, b = int(name[0:2], 16), int(name[2:4], 16), int(name[4:6], 16)
+            return (b, g, r)
+        except ValueError:
+            pass
+    return default
+
+
+class GlyphAtlas:
+    """Vorgerenderte Zeichen in festen Zellen"""
+
+    def __init__(self, cell_width=8, cell_height=12,
+                 font=cv2.FONT_HERSHEY_PLAIN, font_scale=0.6, thickness=1,
+                 max_pairs=64):
+        """
+        Args:
+            cell_width, cell_height: Zellgröße in Pixeln
+            font, font_scale, thickness: OpenCV-Schrift für den Atlas
+            max_pairs: Obergrenze für gecachte Farbpaare
+        """
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.max_pairs = max_pairs
+
+        self.count = LAST_CHAR - FIRST_CHAR + 1
+        self.tiles = np.zeros((self.count, cell_height, cell_width), dtype=np.uint8)
+        # Grundlinie so, dass Unterlängen (g, p, y) noch in die Zelle passen
+        baseline = cell_height - 1 - cv2.getTextSize("g", font, font_scale, thickness)[1]
+        for i in range(self.count):
+            ch = chr(FIRST_CHAR + i)
+            (w, _), _ = cv2.getTextSize(ch, font, font_scale, thickness)
+            x = max(0, (cell_width - w) // 2)
+            cv2.putText(self.tiles[i], ch, (x, baseline), font, font_scale,
+                        255, thickness, cv2.LINE_AA)
+
+        # Deckkraft 0..256 für die Farbmischung per >> 8
+        self._alpha = ((self.tiles.astype(np.uint16) * 256 + 127) // 255)[..., None]
+        self._fallback = ord(FALLBACK) - FIRST_CHAR
+
+        # Eingefärbte Kacheln: (Paare * N) x Zellhöhe x (Zellbreite * 3)
+        self._pairs = {}
+        self.generation = 0     # zählt clear(): gecachte Zellindizes werden ungültig
+        self.fallbacks = 0      # Paare, die wegen vollem Cache Standardfarben bekamen
+        self._table = np.zeros((0, cell_height, cell_width * 3), dtype=np.uint8)
+        self._gather = None
+        self._add_pair(DEFAULT_FG, DEFAULT_BG)  # immer Basis 0
+
+    def glyph(self, ch):
+        """Atlas-Index eines Zeichens (unbekannte Zeichen -> '?', leer -> Leerzeichen)"""
+        if not ch:
+            return 0
+        o = ord(ch[0])
+        if FIRST_CHAR <= o <= LAST_CHAR:
+            return o - FIRST_CHAR
+        return self._fallback
+
+    def pair(self, fg, bg, evict=True):
+        """
+        Nummer des Farbpaars (legt die eingefärbten Kacheln bei Bedarf an)
+
+        Args:
+            fg, bg: BGR-Farben
+            evict: bei vollem Cache alles verwerfen (alte Indizes werden
+                   ungültig); sonst Standardfarben liefern (zählt fallbacks)
+
+        Returns:
+            Basis-Index; Zellindex = Basis + glyph(ch)
+        """
+        key = (fg, bg)
+        base = self._pairs.get(key)
+        if base is not None:
+            return base
+        if len(self._pairs) >= self.max_pairs:
+            if not evict:
+                self.fallbacks += 1
+                return 0
+            # Sehr bunte Ausgabe: Cache verwerfen
+            self.clear()
+        return self._add_pair(fg, bg)
+
+    def _add_pair(self, fg, bg):
+        fg16 = np.array(fg, dtype=np.uint16)
+        bg16 = np.array(bg, dtype=np.uint16)
+        colored = (fg16 * self._alpha + bg16 * (256 - self._alpha)) >> 8
+        colored = colored.astype(np.uint8).reshape(self.count, self.cell_height, -1)
+        base = len(self._table)
+        self._table = np.concatenate([self._table, colored])
+        self._pairs[(fg, bg)] = base
+        return base
+
+    def clear(self):
+        """Verwirft alle eingefärbten Kacheln (bis auf die Standardfarben)"""
+        self._pairs.clear()
+        self._table = self._table[:0]
+        self.generation += 1
+        self._add_pair(DEFAULT_FG, DEFAULT_BG)
+
+    def cell(self, ch, fg=DEFAULT_FG, bg=DEFAULT_BG):
+        """Zellindex für Zeichen + Farben"""
+        return self.pair(fg, bg) + self.glyph(ch)
+
+    def render(self, dst, cells):
+        """
+        Setzt einen Zellblock zusammen
+
+        Args:
+            dst: uint8 BGR Ziel (rows*Zellhöhe x cols*Zellbreite x 3), zusammenhängend
+            cells: int Array (rows x cols) mit Zellindizes aus cell()
+        """
+        rows, cols = cells.shape
+        gather = self._gather
+        if gather is None or gather.shape[1] != cols or gather.shape[0] < rows:
+            # Puffer wächst nur; weniger Zeilen (Teil-Updates) nutzen den Anfang
+            gather = self._gather = np.empty(
+                (rows, cols, self.cell_height, self.cell_width * 3), dtype=np.uint8)
+        gather = gather[:rows]
+        # Zusammenhängend sammeln, dann in Zeilenreihenfolge umkopieren (schneller
+        # als np.take direkt in den transponierten View)
+        np.take(self._table, cells, axis=0, out=gather)
+        out = dst.reshape(rows, self.cell_height, cols, self.cell_width * 3)
+        np.copyto(out, gather.transpose(0, 2, 1, 3))
+        return dst
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scrollback-Speicher für den Terminal Emulator
+
+Zeilen, die oben aus dem Bild laufen, landen kompakt in einem Ringpuffer:
+der Text als ein String, Farben nur als Läufe (Startspalte, Stil) und nur
+wenn die Zeile überhaupt Farben hat. pyte.HistoryScreen hält dagegen pro
+Zeichen ein Char-Tupel in einem Dict (gut 100 Bytes pro Zelle).
+
+Begrenzt wird sowohl die Zeilenzahl als auch der (geschätzte) Speicher;
+ist eine Grenze erreicht, fallen die ältesten Zeilen heraus.
+"""
+
+import sys
+from collections import deque
+from itertools import groupby
+from operator import attrgetter, itemgetter
+
+# Stil einer Zelle, soweit der Renderer ihn nutzt
+# (fg, bg, bold, reverse) - siehe TerminalEmulator._style_base
+DEFAULT_STYLE = ("default", "default", False, False)
+
+_LINE_OVERHEAD = sys.getsizeof((None, None)) + 8   # Zeilen-Tupel + Slot im deque
+_RUN_SIZE = sys.getsizeof((0, DEFAULT_STYLE))      # Stile selbst werden geteilt
+
+
+_style = itemgetter(1, 2, 3, 7)    # Char -> (fg, bg, bold, reverse)
+_data = attrgetter("data")
+_PREFIX = list(range(1024))
+
+
+def compact_line(line, columns):
+    """
+    pyte-Zeile -> (text, runs)
+
+    Args:
+        line: Zeile aus pyte.Screen.buffer (Spalte -> Char)
+        columns: Anzahl Spalten
+
+    Returns:
+        text: genau `columns` Zeichen (ohne Farben: rechts gekürzt)
+        runs: None oder Tupel aus (Startspalte, Stil)
+    """
+    keys = list(line)
+    n = len(keys)
+    default = line.default
+    if (n <= columns and keys == _PREFIX[:n]
+            and default.data == " " and _style(default) == DEFAULT_STYLE):
+        # Üblicher Fall: von links beschrieben, dahinter leere Standard-Zellen
+        chars = list(line.values())
+        tail = columns - n
+    else:
+        chars = list(map(line.__getitem__, range(columns)))
+        tail = 0
+    text = "".join(map(_data, chars))
+    if len(text) != len(chars):
+        # Breite Zeichen (leerer Platzhalter) / kombinierte Zeichen: eine Zelle pro Zeichen
+        text = "".join([c.data[:1] or " " for c in chars])
+
+    styles = list(map(_style, chars))
+    if styles.count(DEFAULT_STYLE) == len(styles):
+        return text.rstrip(" "), None
+    text += " " * tail
+    if tail:
+        styles.extend([DEFAULT_STYLE] * tail)
+    runs = []
+    x = 0
+    for style, group in groupby(styles):
+        runs.append((x, _intern(style)))
+        x += sum(1 for _ in group)
+    return text, tuple(runs)
+
+
+_styles = {DEFAULT_STYLE: DEFAULT_STYLE}
+
+
+def _intern(style):
+    # Gleiche Stile als ein Objekt speichern
+    return _styles.setdefault(style, style)
+
+
+def line_size(entry):
+    """Geschätzter Speicher einer kompakten Zeile in Bytes"""
+    text, runs = entry
+    size = _LINE_OVERHEAD + sys.getsizeof(text)
+    if runs is not None:
+        size += sys.getsizeof(runs) + len(runs) * _RUN_SIZE
+    return size
+
+
+class Scrollback:
+    """Ringpuffer für kompakte Terminal-Zeilen"""
+
+    def __init__(self, max_lines=2000, max_bytes=512 * 1024):
+        """
+        Args:
+            max_lines: höchstens so viele Zeilen
+            max_bytes: höchstens so viel (geschätzter) Speicher
+        """
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self._lines = deque()
+        self.bytes = 0
+        self.pushed = 0     # Zeilen insgesamt (zählt weiter, auch wenn alte herausfallen)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __getitem__(self, index):
+        return self._lines[index]
+
+    def push(self, line, columns):
+        """Übernimmt eine aus dem Bild gelaufene pyte-Zeile"""
+        entry = compact_line(line, columns)
+        size = line_size(entry)
+        self._lines.append(entry)
+        self.bytes += size
+        self.pushed += 1
+        lines = self._lines
+        while len(lines) > self.max_lines or (self.bytes > self.max_bytes and len(lines) > 1):
+            self.bytes -= line_size(lines.popleft())
+
+    def clear(self):
+        self._lines.clear()
+        self.bytes = 0
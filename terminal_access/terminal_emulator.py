@@ -8,7 +8,8 @@ Verwendet pyte für VT100-Emulation und PTY für bash-Prozess
 import os
 import sys
 import pty
-import select
+import errno
+import time
 import termios
 import struct
 import fcntl
@@ -16,25 +17,42 @@ import signal
 import cv2
 import numpy as np
 
+from .glyph_atlas import GlyphAtlas, parse_color, DEFAULT_FG, DEFAULT_BG
+
 try:
     import pyte
+    from .vt_screen import FastScreen
+    from .scrollback import Scrollback, DEFAULT_STYLE
     PYTE_AVAILABLE = True
 except ImportError:
     PYTE_AVAILABLE = False
     print("[WARN] pyte nicht verfügbar - installiere mit: pip3 install pyte")
 
+# PTY-Lesen: in großen Stücken bis EAGAIN, aber pro Aufruf begrenzt,
+# damit eine Ausgabeflut (apt, dmesg) die Hauptschleife nicht blockiert
+READ_CHUNK = 65536          # Bytes pro os.read()
+READ_BUDGET_BYTES = 262144  # max. Bytes pro read()-Aufruf
+READ_BUDGET_SEC = 0.02      # max. Zeit pro read()-Aufruf (inkl. pyte)
+
+# Scrollback: Obergrenzen für Zeilen und Speicher
+SCROLLBACK_LINES = 2000
+SCROLLBACK_BYTES = 512 * 1024
+
 class TerminalEmulator:
     """
     Terminal Emulator mit PTY und pyte VT100-Emulation
     """
     
-    def __init__(self, width=480, height=180, cols=60, rows=20):
+    def __init__(self, width=480, height=180, cols=60, rows=20,
+                 scrollback_lines=SCROLLBACK_LINES, scrollback_bytes=SCROLLBACK_BYTES):
         """
         Args:
             width: Pixel-Breite des Terminal-Bereichs
             height: Pixel-Höhe des Terminal-Bereichs
             cols: Anzahl Zeichen pro Zeile
             rows: Anzahl Zeilen
+            scrollback_lines: max. Zeilen im Scrollback (0 = kein Scrollback)
+            scrollback_bytes: max. Speicher des Scrollbacks
         """
         if not PYTE_AVAILABLE:
             raise ImportError("pyte library nicht verfügbar")
@@ -47,24 +65,53 @@ class TerminalEmulator:
         self.master_fd = None
         self.pid = None
         
-        # pyte Screen für VT100-Emulation
-        self.screen = pyte.Screen(cols, rows)
+        # pyte Screen für VT100-Emulation, herausgescrollte Zeilen in den Scrollback
+        self.scrollback = None
+        if scrollback_lines:
+            self.scrollback = Scrollback(scrollback_lines, scrollback_bytes)
+        self.screen = FastScreen(cols, rows, self.scrollback)
+        self.scroll_offset = 0  # Zeilen zurückgeblättert (0 = aktuelles Bild)
+        self._pushed_seen = 0
         self.stream = pyte.ByteStream(self.screen)
         
         self.running = False
+        self.pending = False    # read() hat wegen des Budgets vor EAGAIN aufgehört
+        self.bytes_read = 0     # gelesene Bytes seit stats()
         
         # Zeichensatz-Parameter - optimiert für 480x180 auf kleinem Display
         self.char_width = 8
         self.char_height = 12
         self.font_scale = 0.6  # Größer für Lesbarkeit
         self.font_thickness = 1
+
+        # Bitmap-Schrift: Zeichen einmal vorrendern, Zeilen aus Kacheln setzen
+        self.atlas = GlyphAtlas(self.char_width, self.char_height,
+                                font_scale=self.font_scale, thickness=self.font_thickness)
+        self._cells = np.zeros((rows, cols), dtype=np.int32)
+        self._surface = np.zeros((rows * self.char_height, cols * self.char_width, 3),
+                                 dtype=np.uint8)
+        self._cell_cache = {}   # pyte-Char -> Zellindex
+        self._style_cache = {}  # (fg, bg, bold, reverse) -> Farbpaar-Basis
+        self._cache_generation = self.atlas.generation
+        self._evict_pairs = True    # False: Farbpaar-Cache voll -> Standardfarben
+        self._glyph_lut = np.array([self.atlas.glyph(chr(i)) for i in range(128)],
+                                   dtype=np.int32)
+
+        # Inkrementelles Zeichnen: nur geänderte Zeilen (pyte screen.dirty)
+        self._full_repaint = True
+        self._cursor_drawn = None   # (x, y) des zuletzt gezeichneten Cursors
+        self._view_drawn = (0, 0)   # (scroll_offset, Scrollback-Stand) beim letzten Zeichnen
+        self.renders = 0            # render()-Aufrufe seit stats()
+        self.idle_renders = 0       # davon ohne Änderung
+        self.rows_painted = 0       # neu gerasterte Zeilen seit stats()
         
-    def start(self, shell="/bin/bash"):
+    def start(self, shell="/bin/bash", args=()):
         """
         Startet PTY mit Shell
         
         Args:
             shell: Shell-Programm (default: /bin/bash)
+            args: zusätzliche Argumente (z.B. ("-c", "dmesg") für Benchmarks)
         """
         if self.running:
             return
@@ -79,7 +126,7 @@ class TerminalEmulator:
                 os.environ['LINES'] = str(self.rows)
                 
                 try:
-                    os.execvp(shell, [shell])
+                    os.execvp(shell, [shell] + list(args))
                 except Exception as e:
                     print(f"Fehler beim Starten der Shell: {e}", file=sys.stderr)
                     sys.exit(1)
@@ -126,6 +173,12 @@ class TerminalEmulator:
         except Exception as e:
             print(f"[TERMINAL] Fehler beim Beenden: {e}")
             
+    def fileno(self):
+        """PTY-Master für select/epoll (None, wenn keine Shell läuft)"""
+        if not self.running or not self.master_fd:
+            return None
+        return self.master_fd
+
     def write(self, data):
         """
         Schreibt Daten zum Terminal (Tastatur-Input)
@@ -133,6 +186,8 @@ class TerminalEmulator:
         Args:
             data: bytes
         """
+        # Tippen springt zurück ans Ende
+        self.scroll_offset = 0
         if not self.running or not self.master_fd:
             return
             
@@ -141,83 +196,276 @@ class TerminalEmulator:
         except OSError as e:
             print(f"[TERMINAL] Schreibfehler: {e}")
             
-    def read(self):
+    def read(self, max_bytes=READ_BUDGET_BYTES, max_time=READ_BUDGET_SEC):
         """
-        Liest Output vom Terminal (non-blocking)
-        Aktualisiert pyte screen buffer
+        Liest Output vom Terminal (non-blocking) und aktualisiert den pyte-Buffer
+
+        Liest in großen Stücken, bis das PTY leer ist (EAGAIN) oder das
+        Budget erschöpft ist; jedes Stück geht am Stück in pyte. Blieb noch
+        etwas übrig, ist danach self.pending gesetzt.
+
+        Args:
+            max_bytes: höchstens so viele Bytes pro Aufruf
+            max_time: höchstens so lange (Sekunden, inkl. pyte) pro Aufruf
+
+        Returns:
+            Anzahl gelesener Bytes
         """
+        self.pending = False
         if not self.running or not self.master_fd:
-            return
-            
-        try:
-            # Non-blocking read
-            ready, _, _ = select.select([self.master_fd], [], [], 0)
+            return 0
             
-            if ready:
-                data = os.read(self.master_fd, 4096)
-                if data:
-                    # Feed zu pyte stream
-                    self.stream.feed(data)
-                else:
-                    # EOF - Shell beendet
-                    self.running = False
-                    
-        except OSError as e:
-            if e.errno != 11:  # EAGAIN ist ok bei non-blocking
-                print(f"[TERMINAL] Lesefehler: {e}")
+        t0 = time.monotonic()
+        total = 0
+        while True:
+            try:
+                data = os.read(self.master_fd, READ_CHUNK)
+            except BlockingIOError:
+                break   # EAGAIN: alles gelesen
+            except OSError as e:
+                if e.errno != errno.EIO:  # EIO = Shell beendet (Slave geschlossen)
+                    print(f"[TERMINAL] Lesefehler: {e}")
+                self.running = False
+                break
+            if not data:
+                # EOF - Shell beendet
                 self.running = False
+                break
+            # Feed zu pyte stream
+            self.stream.feed(data)
+            total += len(data)
+            if total >= max_bytes or time.monotonic() - t0 >= max_time:
+                self.pending = True
+                break
+        self.bytes_read += total
+        return total
                 
+    def _style_base(self, style):
+        """Farbpaar-Basis für einen Stil (fg, bg, bold, reverse)"""
+        base = self._style_cache.get(style)
+        if base is not None:
+            return base
+        fg, bg, bold, reverse = style
+        if bold and fg in ("black", "red", "green", "brown", "blue",
+                           "magenta", "cyan", "white"):
+            fg = "bright" + fg
+        fg = parse_color(fg, DEFAULT_FG)
+        bg = parse_color(bg, DEFAULT_BG)
+        if reverse:
+            fg, bg = bg, fg
+        fallbacks = self.atlas.fallbacks
+        base = self.atlas.pair(fg, bg, evict=self._evict_pairs)
+        if self.atlas.fallbacks == fallbacks:
+            self._style_cache[style] = base     # Ersatzfarben nicht merken
+        return base
+
+    def _cell_index(self, char):
+        """Zellindex (Zeichen + Farben) für ein pyte-Char"""
+        style = (char.fg, char.bg, char.bold, char.reverse)
+        return self._style_base(style) + self.atlas.glyph(char.data)
+
+    def _history_cells(self, entry, out):
+        """Zellindizes einer kompakten Scrollback-Zeile (text, runs)"""
+        text, runs = entry
+        glyphs = self._glyph_lut[np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8)]
+        n = len(glyphs)
+        if runs is None:
+            base = self._style_base(DEFAULT_STYLE)
+            out[:n] = glyphs + base
+            out[n:] = base   # Leerzeichen ist Glyph 0
+            return
+        for i, (x, style) in enumerate(runs):
+            x1 = runs[i + 1][0] if i + 1 < len(runs) else self.cols
+            out[x:x1] = glyphs[x:x1] + self._style_base(style)
+
+    def _update_cells(self, rows):
+        """Überträgt die angegebenen Zeilen der aktuellen Ansicht (Scrollback
+        oder pyte-Buffer) in das Zellindex-Array"""
+        generation = self.atlas.generation
+        self._fill_cells(rows)
+        if self.atlas.generation != generation:
+            # Farbpaar-Cache lief während des Aufbaus über: einmal neu aufbauen,
+            # ohne erneut zu verdrängen - was dann nicht mehr passt, bekommt
+            # die Standardfarben
+            self._evict_pairs = False
+            try:
+                self._fill_cells(rows)
+            finally:
+                self._evict_pairs = True
+
+    def _fill_cells(self, rows):
+        if self._cache_generation != self.atlas.generation:
+            self._cell_cache.clear()
+            self._style_cache.clear()
+            self._cache_generation = self.atlas.generation
+        cache = self._cell_cache
+        cells = self._cells
+        buffer = self.screen.buffer
+        columns = range(self.cols)
+        history = self.scrollback if self.scroll_offset else ()
+        first = len(history) - self.scroll_offset   # Scrollback-Zeile in Ansichtszeile 0
+        for y in rows:
+            if first + y < len(history):
+                self._history_cells(history[first + y], cells[y])
+                continue
+            line = buffer[first + y - len(history)]
+            try:
+                cells[y] = [cache[line[x]] for x in columns]
+            except KeyError:
+                # Neues Zeichen/Farbe: einmal langsam, danach aus dem Cache
+                row = cells[y]
+                for x in columns:
+                    char = line[x]
+                    index = cache.get(char)
+                    if index is None:
+                        fallbacks = self.atlas.fallbacks
+                        index = self._cell_index(char)
+                        if self.atlas.fallbacks == fallbacks:
+                            cache[char] = index
+                    row[x] = index
+        if self.scroll_offset and 0 in rows:
+            # Position oben rechts einblenden (invertiert)
+            label = f" -{self.scroll_offset}/{len(history)} "[-self.cols:]
+            base = self.atlas.pair(DEFAULT_BG, DEFAULT_FG, evict=self._evict_pairs)
+            for i, ch in enumerate(label, self.cols - len(label)):
+                cells[0, i] = base + self.atlas.glyph(ch)
+
+    def scroll(self, lines):
+        """
+        Blättert im Scrollback
+
+        Args:
+            lines: positiv = zurück (ältere Zeilen), negativ = vor
+
+        Returns:
+            True, wenn sich die Ansicht geändert hat
+        """
+        if self.scrollback is None:
+            return False
+        if not self.scroll_offset:
+            self._pushed_seen = self.scrollback.pushed
+        limit = len(self.scrollback)
+        offset = max(0, min(limit, self.scroll_offset + lines))
+        changed = offset != self.scroll_offset
+        self.scroll_offset = offset
+        return changed
+
+    def scroll_page(self, direction):
+        """Eine Seite (Zeilen - 1) zurück (direction=1) oder vor (-1)"""
+        return self.scroll(direction * max(1, self.rows - 1))
+
+    def invalidate(self):
+        """Erzwingt beim nächsten render() ein komplettes Neuzeichnen
+        (z.B. wenn der Frame inzwischen anderweitig benutzt wurde)"""
+        self._full_repaint = True
+
     def render(self, frame, x_offset=0, y_offset=0):
         """
-        Rendert Terminal-Output auf Frame
-        
+        Rendert Terminal-Output auf Frame (inkrementell)
+
+        Neu gerastert werden nur Zeilen, die pyte als geändert meldet, sowie
+        die Zeilen der alten und neuen Cursor-Position. Der Frame muss
+        zwischen den Aufrufen erhalten bleiben, sonst vorher invalidate().
+        Beim Zurückblättern wird das sichtbare Fenster aus Scrollback und
+        Buffer gezeigt; es bleibt an seinem Platz, auch wenn Ausgabe nachkommt.
+
         Args:
             frame: BGR numpy array
             x_offset: X-Offset für Rendering
             y_offset: Y-Offset für Rendering
+
+        Returns:
+            Liste geänderter Zeilenbereiche (y0, y1) im Frame, leer wenn nichts
+            zu tun war
         """
-        # Hintergrund
-        bg_color = (0, 0, 0)
-        frame[y_offset:y_offset+self.height, x_offset:x_offset+self.width] = bg_color
-        
-        # Cursor-Position
-        cursor_x = self.screen.cursor.x
-        cursor_y = self.screen.cursor.y
-        
-        # Zeilen rendern
-        for row_idx, line in enumerate(self.screen.display):
-            y = y_offset + (row_idx * self.char_height) + self.char_height
-            
-            # Zeile zusammensetzen - API-Kompatibilität
-            if line and hasattr(line[0], 'data'):
-                # Alte pyte API
-                text = "".join(char.data for char in line)
-            else:
-                # Neue pyte API
-                text = "".join(line)
-            
-            if text.strip():  # Nur nicht-leere Zeilen zeichnen
-                cv2.putText(
-                    frame, text, (x_offset + 2, y),
-                    cv2.FONT_HERSHEY_PLAIN,
-                    self.font_scale,
-                    (200, 200, 200),
-                    self.font_thickness,
-                    cv2.LINE_AA
-                )
-                
-        # Cursor zeichnen
-        if self.running:
-            cursor_px_x = x_offset + (cursor_x * self.char_width)
-            cursor_px_y = y_offset + (cursor_y * self.char_height)
+        self.renders += 1
+        region = frame[y_offset:y_offset+self.height, x_offset:x_offset+self.width]
+        h = min(region.shape[0], self._surface.shape[0])
+        w = min(region.shape[1], self._surface.shape[1])
+
+        # Zurückgeblättert: neue Zeilen verschieben das Fenster mit
+        if self.scrollback is not None:
+            pushed = self.scrollback.pushed
+            if self.scroll_offset:
+                self.scroll_offset = min(len(self.scrollback),
+                                         self.scroll_offset + pushed - self._pushed_seen)
+            self._pushed_seen = pushed
+        view = (self.scroll_offset, self._pushed_seen if self.scroll_offset else 0)
+
+        cursor = self.screen.cursor
+        cursor_pos = None
+        if self.running and not cursor.hidden and not self.scroll_offset:
+            cursor_pos = (cursor.x, cursor.y)
+
+        dirty = self.screen.dirty
+        if self._full_repaint:
+            rows = range(self.rows)
+            # Rand außerhalb der Zellfläche nur beim Vollbild füllen
+            region[h:] = DEFAULT_BG
+            region[:h, w:] = DEFAULT_BG
+        elif view != self._view_drawn or (self.scroll_offset and dirty):
+            rows = range(self.rows)
+        else:
+            rows = set(y for y in dirty if 0 <= y < self.rows)
+            if cursor_pos != self._cursor_drawn:
+                for pos in (self._cursor_drawn, cursor_pos):
+                    if pos is not None and pos[1] < self.rows:
+                        rows.add(pos[1])
+            rows = sorted(rows)
+        dirty.clear()
+        self._view_drawn = view
+
+        if not rows:
+            self.idle_renders += 1
+            return []
+        self.rows_painted += len(rows)
+
+        # Zeichen aus dem Glyphen-Atlas zusammensetzen, zusammenhängende
+        # Zeilen in einem Rutsch (feste 8x12-Zellen)
+        self._update_cells(rows)
+        ch = self.char_height
+        bands = []
+        start = prev = rows[0]
+        for y in list(rows[1:]) + [None]:
+            if y is not None and y == prev + 1:
+                prev = y
+                continue
+            self.atlas.render(self._surface[start * ch:(prev + 1) * ch],
+                              self._cells[start:prev + 1])
+            y0, y1 = start * ch, min((prev + 1) * ch, h)
+            if y1 > y0:
+                region[y0:y1, :w] = self._surface[y0:y1, :w]
+                bands.append((y_offset + y0, y_offset + y1))
+            if y is not None:
+                start = prev = y
+
+        # Cursor zeichnen (genau auf der Zelle); seine Zeile ist oben neu gerastert
+        if cursor_pos is not None:
+            cursor_px_x = x_offset + (cursor_pos[0] * self.char_width)
+            cursor_px_y = y_offset + (cursor_pos[1] * self.char_height)
             cv2.rectangle(
                 frame,
                 (cursor_px_x, cursor_px_y),
-                (cursor_px_x + self.char_width, cursor_px_y + self.char_height),
+                (cursor_px_x + self.char_width - 1, cursor_px_y + self.char_height - 1),
                 (0, 255, 0),
                 1
             )
-            
+        self._cursor_drawn = cursor_pos
+
+        if self._full_repaint:
+            self._full_repaint = False
+            bands = [(y_offset, y_offset + region.shape[0])]
+        return bands
+
+    def stats(self):
+        """
+        Returns:
+            (renders, idle_renders, rows_painted, bytes_read) seit der letzten Abfrage
+        """
+        result = (self.renders, self.idle_renders, self.rows_painted, self.bytes_read)
+        self.renders = self.idle_renders = self.rows_painted = self.bytes_read = 0
+        return result
+
     def is_alive(self):
         """Prüft ob Shell noch läuft"""
         if not self.running or not self.pid:
@@ -23,6 +23,7 @@ logger = logging.getLogger(__name__)
 
 FB_DEVICE = "/dev/fb1"
 TOUCH_DEVICE = "/dev/input/event0"
+KEY_FLASH_SEC = 0.15  # so lange bleibt eine angetippte Taste hervorgehoben
 
 class TerminalLauncher:
     """Verwaltet integriertes Terminal mit virtueller Tastatur"""
@@ -35,6 +36,8 @@ class TerminalLauncher:
         # Integrierte Terminal-Komponenten
         self.terminal = None
         self.keyboard = None
+        self._keyboard_dirty = True  # Tastatur beim nächsten render() neu zeichnen
+        self._pressed_until = 0.0    # Ende der Hervorhebung der angetippten Taste
         
         # Legacy external terminal support
         self.terminal_process = None
@@ -52,13 +55,14 @@ class TerminalLauncher:
             return False
             
         try:
-            # Terminal-Emulator (oben, 180px für ~20 Zeilen)
-            self.terminal = TerminalEmulator(width=480, height=180, cols=60, rows=20)
+            # Terminal-Emulator (oben, 180px = 15 Zeilen à 12px, 60 Spalten à 8px)
+            self.terminal = TerminalEmulator(width=480, height=180, cols=60, rows=15)
             self.terminal.start(shell="/bin/bash")
             
             # Tastatur (unten, 140px, startet bei y=180)
             # Mit +30px Touch-Offset-Korrektur wird das zu y=180+30=210 für Touches
             self.keyboard = VirtualKeyboard(width=480, height=140, y_offset=180)
+            self._keyboard_dirty = True
             
             self.terminal_active = True
             print("[TERMINAL] Integriertes Terminal gestartet")
@@ -75,34 +79,66 @@ class TerminalLauncher:
     def update(self):
         """
         Update-Loop für Terminal (liest Output, prüft Status)
-        Sollte regelmäßig aufgerufen werden wenn Terminal aktiv
+        Aufrufen, sobald fileno() lesbar ist (oder regelmäßig, wenn Terminal aktiv)
+        
+        Returns:
+            True, wenn noch ungelesene Ausgabe wartet (Budget erschöpft) -
+            dann ohne Pause gleich wieder aufrufen
         """
         if not self.terminal_active or not self.terminal:
-            return
+            return False
             
         # Terminal-Output lesen und Screen-Buffer aktualisieren
         self.terminal.read()
+        pending = self.terminal.pending
         
         # Prüfen ob Shell noch läuft
         if not self.terminal.is_alive():
             print("[TERMINAL] Shell beendet - schließe Terminal")
             self.close_terminal()
+            return False
+        return pending
             
+    def fileno(self):
+        """PTY des aktiven Terminals für select/epoll (None ohne Terminal)"""
+        if not self.terminal_active or not self.terminal:
+            return None
+        return self.terminal.fileno()
+
+    def invalidate(self):
+        """Nächstes render() zeichnet alles neu (Frame war anderweitig in Benutzung)"""
+        self._keyboard_dirty = True
+        if self.terminal:
+            self.terminal.invalidate()
+
     def render(self, frame):
         """
-        Rendert Terminal und Tastatur auf Frame
+        Rendert Terminal und Tastatur auf Frame (nur was sich geändert hat)
         
         Args:
-            frame: BGR numpy array (480x320x3)
+            frame: BGR numpy array (480x320x3), bleibt zwischen Aufrufen erhalten
+            
+        Returns:
+            Liste geänderter Zeilenbereiche (y0, y1), leer wenn nichts zu tun war
         """
         if not self.terminal_active:
-            return
-            
+            return []
+        
+        if (self.keyboard and self.keyboard.pressed_id
+                and time.monotonic() >= self._pressed_until):
+            self.keyboard.pressed_id = 0
+            self._keyboard_dirty = True
+        
+        bands = []
         if self.terminal:
-            self.terminal.render(frame, x_offset=0, y_offset=0)
+            bands = self.terminal.render(frame, x_offset=0, y_offset=0)
             
-        if self.keyboard:
+        if self.keyboard and self._keyboard_dirty:
             self.keyboard.draw(frame)
+            self._keyboard_dirty = False
+            bands.append((self.keyboard.y_offset,
+                          self.keyboard.y_offset + self.keyboard.height))
+        return bands
             
     def handle_touch(self, x, y):
         """
@@ -123,12 +159,30 @@ class TerminalLauncher:
         adjusted_y = y - 85  # Touch kommt 85px zu weit unten
         
         # Hit-Test auf Tastatur mit korrigierten Koordinaten
-        key = self.keyboard.hit_test(adjusted_x, adjusted_y)
+        key_id = self.keyboard.key_at(adjusted_x, adjusted_y)
         
-        if key:
+        if key_id:
+            key = self.keyboard.keys[key_id]['label']
+            # Angetippte Taste kurz hervorheben (siehe redraw_delay)
+            self.keyboard.pressed_id = key_id
+            self._pressed_until = time.monotonic() + KEY_FLASH_SEC
+            self._keyboard_dirty = True
+            
             # Taste verarbeiten
+            # Blättern im Scrollback statt Bytes an die Shell
+            direction = self.keyboard.SCROLL_KEYS.get(key)
+            if direction is not None:
+                if self.terminal:
+                    self.terminal.scroll_page(direction)
+                return False
+                
             key_bytes, exit_requested = self.keyboard.process_key(key)
             
+            # Layoutwechsel (SHIFT/SYM): gleiche id kann eine andere Taste sein
+            keys = self.keyboard.keys
+            if key_id >= len(keys) or keys[key_id]['label'] != key:
+                self.keyboard.pressed_id = 0
+                
             if exit_requested:
                 return True
                 
@@ -138,6 +192,15 @@ class TerminalLauncher:
                 
         return False
             
+    def redraw_delay(self):
+        """
+        Sekunden, bis render() ohne neue Eingabe etwas zu tun hat
+        (Ende der Tasten-Hervorhebung), sonst None
+        """
+        if not self.terminal_active or not self.keyboard or not self.keyboard.pressed_id:
+            return None
+        return max(0.0, self._pressed_until - time.monotonic())
+            
     def close_terminal(self):
         """Schließt integriertes Terminal"""
         if self.terminal:
@@ -159,6 +222,16 @@ class TerminalLauncher:
         else:
             return self.launch_terminal()
             
+    def stats(self):
+        """
+        Returns:
+            (renders, idle_renders, rows_painted, bytes_read) des Terminals
+            seit der letzten Abfrage
+        """
+        if not self.terminal:
+            return 0, 0, 0, 0
+        return self.terminal.stats()
+            
     def is_active(self):
         """Gibt zurück ob Terminal aktiv ist"""
         return self.terminal_active
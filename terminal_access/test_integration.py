@@ -222,6 +222,7 @@ def visual_integration_test():
             
             # Frame rendern
             frame = np.zeros((320, 480, 3), dtype=np.uint8)
+            launcher.invalidate()  # neuer Frame: alles zeichnen
             launcher.render(frame)
             
             # Info overlay
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-Skript für den Terminal-Scrollback
+Prüft kompakte Zeilen, Zeilen-/Speichergrenzen, Blättern im Emulator
+und misst den Speicher nach einer großen Ausgabe (ohne Shell)
+"""
+
+import sys
+import os
+import gc
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+try:
+    import pyte
+    from terminal_access.scrollback import Scrollback, compact_line, DEFAULT_STYLE
+    from terminal_access.vt_screen import FastScreen
+    from terminal_access.terminal_emulator import TerminalEmulator
+    TERMINAL_AVAILABLE = True
+except ImportError as e:
+    TERMINAL_AVAILABLE = False
+    print(f"[ERROR] Terminal Emulator nicht verfügbar: {e}")
+
+
+def _dump(screen, count, start=0):
+    stream = pyte.ByteStream(screen)
+    stream.feed(b"".join(b"line %d: kernel message text\r\n" % i
+                         for i in range(start, start + count)))
+
+
+def test_compact_lines():
+    """Test: Zeilen als String + Farbläufe"""
+    if not TERMINAL_AVAILABLE:
+        print("[SKIP] Terminal nicht verfügbar")
+        return
+
+    print("[TEST] Kompakte Zeilen...")
+
+    screen = FastScreen(20, 4)
+    pyte.ByteStream(screen).feed(
+        b"plain text\r\n\x1b[31mred\x1b[0m rest\r\n\xe4\xb8\xadwide")
+    assert compact_line(screen.buffer[0], 20) == ("plain text", None)
+
+    text, runs = compact_line(screen.buffer[1], 20)
+    assert text == "red rest".ljust(20)
+    assert runs == ((0, ("red", "default", False, False)), (3, DEFAULT_STYLE))
+
+    # Breites Zeichen belegt zwei Zellen -> Platzhalter bleibt als Leerzeichen
+    assert compact_line(screen.buffer[2], 20) == ("中 wide", None)
+    print("  ✓ Text ohne Farben gekürzt, Farben als Läufe")
+
+
+def test_limits():
+    """Test: Zeilen- und Speichergrenze, älteste Zeilen fallen heraus"""
+    if not TERMINAL_AVAILABLE:
+        print("[SKIP] Terminal nicht verfügbar")
+        return
+
+    print("[TEST] Grenzen...")
+
+    sb = Scrollback(max_lines=100, max_bytes=1024 * 1024)
+    screen = FastScreen(60, 15, sb)
+    _dump(screen, 500)
+    assert len(sb) == 100
+    assert sb[0][0].startswith("line 386:") and sb[-1][0].startswith("line 485:")
+    assert sb.pushed == 486
+
+    sb = Scrollback(max_lines=100000, max_bytes=8 * 1024)
+    screen = FastScreen(60, 15, sb)
+    _dump(screen, 500)
+    assert 0 < sb.bytes <= sb.max_bytes
+    assert sb[-1][0].startswith("line 485:")
+    print(f"  ✓ {len(sb)} Zeilen in {sb.bytes} Bytes (Grenze {sb.max_bytes})")
+
+
+def test_memory_after_dump():
+    """Messung: echter Speicher nach großer Ausgabe bleibt unter der Grenze"""
+    if not TERMINAL_AVAILABLE:
+        print("[SKIP] Terminal nicht verfügbar")
+        return
+
+    print("[TEST] Speicher nach 50000 Zeilen...")
+
+    cap = 256 * 1024
+    sb = Scrollback(max_lines=5000, max_bytes=cap)
+    screen = FastScreen(60, 15, sb)
+    tracemalloc.start()
+    try:
+        _dump(screen, 50000)
+        gc.collect()
+        with_lines = tracemalloc.get_traced_memory()[0]
+        kept = len(sb)
+        estimate = sb.bytes
+        sb.clear()
+        gc.collect()
+        measured = with_lines - tracemalloc.get_traced_memory()[0]
+
+        # Zum Vergleich: pyte.HistoryScreen mit gleich vielen Zeilen
+        gc.collect()
+        base = tracemalloc.get_traced_memory()[0]
+        history = pyte.HistoryScreen(60, 15, history=kept)
+        _dump(history, kept + 15)
+        gc.collect()
+        pyte_bytes = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+
+    print(f"  {kept} Zeilen: gemessen {measured / 1024:.0f} KB, geschätzt "
+          f"{estimate / 1024:.0f} KB, Grenze {cap / 1024:.0f} KB "
+          f"(pyte.HistoryScreen: {pyte_bytes / 1024:.0f} KB)")
+    assert estimate <= cap
+    assert measured <= cap, f"Scrollback belegt {measured} Bytes > {cap}"
+    assert measured < pyte_bytes / 4, "Kompakte Zeilen sollten deutlich kleiner sein"
+    print("  ✓ Speicher innerhalb der Grenze")
+
+
+def test_scrolled_view():
+    """Test: Zurückblättern zeigt das Fenster aus dem Scrollback"""
+    if not TERMINAL_AVAILABLE:
+        print("[SKIP] Terminal nicht verfügbar")
+        return
+
+    print("[TEST] Blättern...")
+
+    def lines(a, b):
+        return b"\r\n".join(b"\x1b[32mline\x1b[0m %d" % i for i in range(a, b))
+
+    terminal = TerminalEmulator(width=480, height=180, cols=60, rows=15)
+    terminal.stream.feed(lines(0, 100) + b"\r\n")
+    frame = np.zeros((320, 480, 3), dtype=np.uint8)
+    terminal.render(frame)
+    assert len(terminal.scrollback) == 86
+
+    # Eine Seite zurück: Scrollback 72..85 + erste Buffer-Zeile (86)
+    assert terminal.scroll_page(1) and terminal.scroll_offset == 14
+    assert terminal.render(frame) == [(0, 180)], "Ansicht wechselt komplett"
+
+    ref = TerminalEmulator(width=480, height=180, cols=60, rows=15)
+    ref.stream.feed(lines(72, 87))
+    expected = np.zeros((320, 480, 3), dtype=np.uint8)
+    ref.render(expected)
+    ch, cw = terminal.char_height, terminal.char_width
+    label = len(" -14/86 ")
+    assert np.array_equal(frame[ch:180], expected[ch:180]), "Scrollback-Zeilen pixelgleich"
+    assert np.array_equal(frame[:ch, :-label * cw], expected[:ch, :-label * cw])
+    assert not np.array_equal(frame[:ch, -label * cw:], expected[:ch, -label * cw:]), \
+        "Position oben rechts eingeblendet"
+
+    # Nichts Neues -> nichts zu tun
+    assert terminal.render(frame) == []
+
+    # Neue Ausgabe verschiebt das Fenster mit, Inhalt bleibt stehen
+    before = frame.copy()
+    terminal.stream.feed(lines(100, 103) + b"\r\n")
+    terminal.render(frame)
+    assert terminal.scroll_offset == 17
+    assert np.array_equal(frame[ch:180], before[ch:180])
+
+    # Ende und Anfang begrenzen
+    assert terminal.scroll(-1000) and terminal.scroll_offset == 0
+    terminal.scroll(10 ** 6)
+    assert terminal.scroll_offset == len(terminal.scrollback)
+
+    # Tippen springt ans Ende
+    terminal.write(b"x")
+    assert terminal.scroll_offset == 0
+    terminal.render(frame)
+    ref = TerminalEmulator(width=480, height=180, cols=60, rows=15)
+    ref.stream.feed(lines(0, 103) + b"\r\n")
+    ref.render(expected)
+    assert np.array_equal(frame[:180], expected[:180])
+    print("  ✓ Fenster aus Scrollback, mitlaufend bei neuer Ausgabe, Sprung ans Ende")
+
+
+def main():
+    print("=" * 50)
+    print("SCROLLBACK TEST")
+    print("=" * 50)
+
+    test_compact_lines()
+    test_limits()
+    test_memory_after_dump()
+    test_scrolled_view()
+
+    print()
+    print("=" * 50)
+    print("ALLE TESTS BESTANDEN ✓")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -104,6 +104,226 @@ def test_terminal_rendering():
     
     terminal.stop()
 
+def test_glyph_atlas_rendering():
+    """Test: Bitmap-Schrift in festen Zellen, Farben und Cursor (ohne Shell)"""
+    if not TERMINAL_AVAILABLE:
+        print("[SKIP] Terminal nicht verfügbar")
+        return
+
+    print("[TEST] Glyphen-Atlas...")
+
+    terminal = TerminalEmulator(width=480, height=180, cols=60, rows=15)
+    terminal.stream.feed(b"ab\r\n\x1b[31mR\x1b[0m\x1b[7mV\x1b[0m\xc3\xa4")
+    terminal.running = True  # nur für den Cursor, keine Shell nötig
+
+    frame = np.full((320, 480, 3), 77, dtype=np.uint8)
+    terminal.render(frame)
+    cw, ch = terminal.char_width, terminal.char_height
+    atlas = terminal.atlas
+
+    # Zelle (0,1) = 'b' exakt aus dem Atlas (Standardfarben)
+    tile = frame[0:ch, cw:2 * cw]
+    expected = np.zeros((ch, cw, 3), dtype=np.uint8)
+    atlas.render(expected, np.array([[atlas.cell("b")]]))
+    assert np.array_equal(tile, expected), "Zeichen sollte exakt in der Zelle liegen"
+
+    # Rot, invertiert, Fallback für Nicht-ASCII
+    red = frame[ch:2 * ch, 0:cw]
+    assert red[..., 2].max() > 150 and red[..., 1].max() == 0, "Rote Vordergrundfarbe"
+    rev = frame[ch:2 * ch, cw:2 * cw]
+    assert rev.mean() > 100, "Invertierte Zelle hat hellen Hintergrund"
+    expected = np.zeros((ch, cw, 3), dtype=np.uint8)
+    atlas.render(expected, np.array([[atlas.cell("?")]]))
+    assert np.array_equal(frame[ch:2 * ch, 2 * cw:3 * cw], expected)
+
+    # Cursor (nach 'ä' in Zeile 1, Spalte 3) genau auf der Zellgrenze
+    cx, cy = terminal.screen.cursor.x, terminal.screen.cursor.y
+    assert (cx, cy) == (3, 1)
+    cell = frame[cy * ch:(cy + 1) * ch, cx * cw:(cx + 1) * cw]
+    assert (cell[0, :, 1] == 255).all() and (cell[-1, :, 1] == 255).all()
+    assert (cell[:, 0, 1] == 255).all() and (cell[:, -1, 1] == 255).all()
+    assert frame[(cy + 1) * ch, cx * cw, 1] != 255, "Cursor darf nicht in die nächste Zeile ragen"
+
+    # Außerhalb des Terminal-Bereichs bleibt alles unverändert
+    assert (frame[180:] == 77).all()
+    print("  ✓ Feste Zellen, ANSI-Farben, Cursor deckungsgleich")
+
+
+def test_many_colors():
+    """Test: Mehr Farben als der Farbpaar-Cache fasst (256 Farben, Truecolor)"""
+    if not TERMINAL_AVAILABLE:
+        print("[SKIP] Terminal nicht verfügbar")
+        return
+
+    print("[TEST] Viele Farben...")
+
+    terminal = TerminalEmulator(width=480, height=180, cols=60, rows=15)
+    frame = np.zeros((320, 480, 3), dtype=np.uint8)
+    terminal.stream.feed(b"\x1b[31mred\x1b[0m\r\n")
+    terminal.render(frame)
+    cw, ch = terminal.char_width, terminal.char_height
+    red = frame[0:ch, 0:cw].copy()
+
+    t0 = time.monotonic()
+    palette = "".join(f"\x1b[38;5;{i}m#" for i in range(256))
+    truecolor = "".join(f"\x1b[38;2;{i};{255 - i};{i // 2}m@" for i in range(0, 256, 2))
+    terminal.stream.feed((palette + "\x1b[0m\r\n" + truecolor + "\x1b[0m").encode())
+    terminal.render(frame)
+    dt = time.monotonic() - t0
+    assert dt < 10.0, f"Rendern dauerte {dt:.1f} s"
+    assert terminal.atlas.fallbacks > 0
+    assert len(terminal.atlas._pairs) <= terminal.atlas.max_pairs
+    assert np.array_equal(frame[0:ch, 0:cw], red), "Unveränderte Zeile bleibt stehen"
+
+    # Alles neu (gültige Indizes nach dem Überlauf), Rot kommt wieder in den Cache
+    terminal.invalidate()
+    terminal.render(frame)
+    assert np.array_equal(frame[0:ch, 0:cw], red), "Alte Zeile behält ihre Farbe"
+    print(f"  ✓ {terminal.atlas.fallbacks} Paare mit Standardfarben, {dt * 1000:.0f} ms")
+
+
+def test_incremental_rendering():
+    """Test: Nur geänderte Zeilen + Cursor werden neu gezeichnet (ohne Shell)"""
+    if not TERMINAL_AVAILABLE:
+        print("[SKIP] Terminal nicht verfügbar")
+        return
+
+    print("[TEST] Inkrementelles Rendern...")
+
+    def reference(data):
+        ref = TerminalEmulator(width=480, height=180, cols=60, rows=15)
+        ref.running = True
+        ref.stream.feed(data)
+        out = np.zeros((320, 480, 3), dtype=np.uint8)
+        ref.render(out)
+        return out
+
+    terminal = TerminalEmulator(width=480, height=180, cols=60, rows=15)
+    terminal.running = True
+    ch = terminal.char_height
+    frame = np.zeros((320, 480, 3), dtype=np.uint8)
+
+    data = b"line0\r\nline1\r\nline2"
+    terminal.stream.feed(data)
+    assert terminal.render(frame) == [(0, 180)], "Erster Aufruf zeichnet alles"
+
+    # Leerlauf: nichts zu tun, Frame bleibt unangetastet
+    frame[200:] = 77
+    assert terminal.render(frame) == []
+    assert (frame[200:] == 77).all()
+    frame[200:] = 0
+
+    # Zeichen in Zeile 2 -> nur Zeile 2 (Cursor bleibt in derselben Zeile)
+    terminal.stream.feed(b"X")
+    data += b"X"
+    assert terminal.render(frame) == [(2 * ch, 3 * ch)]
+    assert np.array_equal(frame, reference(data)), "Teil-Update muss Vollbild entsprechen"
+
+    # Cursor-Sprung ohne Text: alte und neue Cursor-Zeile
+    terminal.stream.feed(b"\x1b[6;1H")
+    data += b"\x1b[6;1H"
+    assert terminal.render(frame) == [(2 * ch, 3 * ch), (5 * ch, 6 * ch)]
+    assert np.array_equal(frame, reference(data))
+
+    # Benachbarte Zeilen werden zu einem Band zusammengefasst
+    terminal.stream.feed(b"a\r\nb")
+    data += b"a\r\nb"
+    assert terminal.render(frame) == [(5 * ch, 7 * ch)]
+    assert np.array_equal(frame, reference(data))
+
+    renders, idle, rows, _ = terminal.stats()
+    assert (renders, idle) == (5, 1) and rows == 15 + 1 + 2 + 2
+    assert terminal.stats() == (0, 0, 0, 0), "Zähler sollten zurückgesetzt sein"
+
+    # invalidate() erzwingt wieder ein Vollbild
+    frame[:] = 0
+    terminal.invalidate()
+    assert terminal.render(frame) == [(0, 180)]
+    assert np.array_equal(frame, reference(data))
+    print("  ✓ Leerlauf ohne Arbeit, Teil-Updates identisch zum Vollbild")
+
+
+def test_fast_screen_matches_pyte():
+    """Test: FastScreen liefert denselben Buffer wie pyte.Screen"""
+    if not TERMINAL_AVAILABLE:
+        print("[SKIP] Terminal nicht verfügbar")
+        return
+
+    print("[TEST] FastScreen...")
+
+    import random
+    import pyte
+    from terminal_access.vt_screen import FastScreen
+
+    pieces = [b"hello world ", b"\r\n", b"x" * 70, b"\x1b[31m", b"\x1b[1;44m", b"\x1b[0m",
+              b"\xc3\xa4\xe4\xb8\xad", b"\t", b"\x08", b"\x1b(0lqqk\x1b(B", b"\x1b[4h",
+              b"\x1b[4l", b"\x1b[?7l", b"\x1b[?7h", b"\x1b[5;10H", b"\x1b[2J", b"\x1b[K"]
+    rng = random.Random(1)
+    for _ in range(200):
+        data = b"".join(rng.choice(pieces) for _ in range(100))
+        ref, fast = pyte.Screen(60, 15), FastScreen(60, 15)
+        pyte.ByteStream(ref).feed(data)
+        stream = pyte.ByteStream(fast)
+        cut = rng.randrange(len(data))
+        stream.feed(data[:cut])
+        stream.feed(data[cut:])
+        for y in range(15):
+            assert dict(ref.buffer[y]) == dict(fast.buffer[y]), f"Zeile {y}: {data!r}"
+        assert (ref.cursor.x, ref.cursor.y) == (fast.cursor.x, fast.cursor.y)
+        assert ref.dirty == fast.dirty
+    print("  ✓ Gleiches Ergebnis für ASCII, Farben, Unicode, Wrap und Sonderzeichensätze")
+
+
+def test_pty_throughput():
+    """Benchmark: mehrere MB durch ein echtes PTY, Rendern höchstens 30x/s"""
+    if not TERMINAL_AVAILABLE:
+        print("[SKIP] Terminal nicht verfügbar")
+        return
+
+    print("[TEST] PTY-Durchsatz...")
+
+    size = 4 * 1024 * 1024
+    terminal = TerminalEmulator(width=480, height=180, cols=60, rows=15)
+    # Ausgabe wie bei dmesg/journalctl: viele kurze Zeilen
+    terminal.start(shell="/bin/sh", args=(
+        "-c", f"yes 'kernel: usb 1-1.3: new high-speed USB device number 5' | head -c {size}"))
+    assert terminal.running, "PTY sollte laufen"
+    assert terminal.fileno() == terminal.master_fd, "PTY für epoll"
+
+    frame = np.zeros((320, 480, 3), dtype=np.uint8)
+    frame_interval = 1.0 / 30
+    total = renders = reads = 0
+    last_render = 0.0
+    t0 = time.monotonic()
+    try:
+        while terminal.running and time.monotonic() - t0 < 60:
+            total += terminal.read()
+            reads += 1
+            now = time.monotonic()
+            if now - last_render >= frame_interval:
+                last_render = now
+                terminal.render(frame)
+                renders += 1
+            if not terminal.pending:
+                time.sleep(0.001)
+        terminal.render(frame)
+        renders += 1
+        dt = time.monotonic() - t0
+    finally:
+        terminal.stop()
+    assert terminal.fileno() is None
+
+    # PTY wandelt \n in \r\n
+    assert total >= size, f"Nur {total} von {size} Bytes gelesen"
+    rate = total / dt
+    legacy = 4096 / 0.01
+    print(f"  {total / 1e6:.1f} MB in {dt:.2f} s = {rate / 1e6:.2f} MB/s "
+          f"(alt: max. {legacy / 1e3:.0f} KB/s) | {reads} read()-Aufrufe, {renders} Renders")
+    assert renders <= dt * 30 + 2, "Höchstens ein Render pro Display-Frame"
+    assert "USB device number 5" in terminal.get_screen_text()
+    print("  ✓ PTY bis EAGAIN geleert, Renders zusammengefasst")
+
+
 def test_terminal_is_alive():
     """Test: Terminal Alive-Check"""
     if not TERMINAL_AVAILABLE:
@@ -155,6 +375,7 @@ def interactive_test():
             terminal.read()
             
             frame = np.zeros((320, 480, 3), dtype=np.uint8)
+            terminal.invalidate()  # neuer Frame: alles zeichnen
             terminal.render(frame, x_offset=0, y_offset=0)
             
             # Info-Text
@@ -189,6 +410,11 @@ def main():
     test_terminal_start_stop()
     test_terminal_write_read()
     test_terminal_rendering()
+    test_glyph_atlas_rendering()
+    test_many_colors()
+    test_incremental_rendering()
+    test_fast_screen_matches_pyte()
+    test_pty_throughput()
     test_terminal_is_alive()
     
     print()
@@ -7,6 +7,7 @@ Simuliert Touch-Events und prüft Key-Mapping
 
 import sys
 import os
+import time
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 import cv2
@@ -136,6 +137,123 @@ def test_exit_key(keyboard):
     assert key_bytes is None, "EXIT sollte keine Bytes senden"
     print("  ✓ EXIT-Taste korrekt")
 
+def _draw_direct(keyboard, frame):
+    """Bisheriges draw(): alle Tasten pro Aufruf neu zeichnen (Referenz)"""
+    frame[keyboard.y_offset:keyboard.y_offset+keyboard.height, :] = (30, 30, 30)
+    active = keyboard._active_labels()
+    for rect in keyboard.keys[1:]:
+        key_label = rect['label']
+        x, y, w, h = rect['x'], rect['y'], rect['w'], rect['h']
+        if key_label in active or rect['id'] == keyboard.pressed_id:
+            color = (100, 200, 255)
+        elif key_label == 'EXIT':
+            color = (0, 0, 200)
+        else:
+            color = (80, 80, 80)
+        cv2.rectangle(frame, (x+2, y+2), (x+w-2, y+h-2), color, -1)
+        cv2.rectangle(frame, (x+2, y+2), (x+w-2, y+h-2), (150, 150, 150), 1)
+        font_scale = 0.4 if len(key_label) > 1 else 0.5
+        text_size = cv2.getTextSize(key_label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 1)[0]
+        text_x = x + (w - text_size[0]) // 2
+        text_y = y + (h + text_size[1]) // 2
+        cv2.putText(frame, key_label, (text_x, text_y),
+                   cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+
+def test_prerendered_layouts():
+    """Test: Vorgerenderte Layouts + Overlay pixelgleich zum direkten Zeichnen"""
+    print("[TEST] Vorgerenderte Layouts...")
+    
+    keyboard = VirtualKeyboard(width=480, height=140, y_offset=180)
+    states = [
+        dict(),
+        dict(shift_active=True),
+        dict(symbols_active=True),
+        dict(ctrl_active=True),
+        dict(shift_active=True, ctrl_active=True, symbols_active=True),
+        dict(pressed='g'),
+        dict(shift_active=True, pressed='ENTER'),
+        dict(symbols_active=True, pressed='-'),
+    ]
+    for state in states:
+        keyboard.shift_active = keyboard.ctrl_active = keyboard.symbols_active = False
+        keyboard.pressed_id = 0
+        state = dict(state)
+        pressed = state.pop('pressed', None)
+        for name, value in state.items():
+            setattr(keyboard, name, value)
+        keyboard._calculate_key_positions()
+        if pressed is not None:
+            # letzte Taste mit dem Label (bei Duplikaten nicht die aus key_rects)
+            keyboard.pressed_id = [r['id'] for r in keyboard.keys[1:] if r['label'] == pressed][-1]
+        
+        frame = np.full((320, 480, 3), 7, dtype=np.uint8)
+        expected = frame.copy()
+        keyboard.draw(frame)
+        _draw_direct(keyboard, expected)
+        assert np.array_equal(frame, expected), f"Abweichung bei {state}"
+    assert keyboard.bitmaps_rendered == 3, "Jedes Layout nur einmal gerendert"
+    print(f"  ✓ {len(states)} Zustände pixelgleich, {keyboard.bitmaps_rendered} Layouts gerendert")
+    
+    # Geometrie ändern -> Cache verwirft die Bitmaps von selbst
+    keyboard.y_offset = 170
+    keyboard.height = 150
+    assert keyboard.hit_test(300, 175) is not None, "Tasten an neuer Position"
+    frame = np.zeros((320, 480, 3), dtype=np.uint8)
+    expected = frame.copy()
+    keyboard.draw(frame)
+    _draw_direct(keyboard, expected)
+    assert np.array_equal(frame, expected), "Neue Geometrie sollte übernommen werden"
+    assert keyboard.bitmaps_rendered == 4
+    print("  ✓ Geometrie-Änderung rendert neu")
+
+def test_key_map():
+    """Test: Indexbild liefert für jede physische Taste ihre eigene id"""
+    print("[TEST] Tasten-Indexbild...")
+    
+    keyboard = VirtualKeyboard(width=480, height=140, y_offset=180)
+    for symbols in (False, True):
+        keyboard.symbols_active = symbols
+        keyboard._calculate_key_positions()
+        assert keyboard.key_map.dtype == np.uint8
+        for rect in keyboard.keys[1:]:
+            cx = rect['x'] + rect['w'] // 2
+            cy = rect['y'] + rect['h'] // 2
+            assert keyboard.key_at(cx, cy) == rect['id'], f"Taste {rect['label']} #{rect['id']}"
+            assert keyboard.hit_test(cx, cy) == rect['label']
+    
+    # Doppelte Labels im Symbol-Layout sind einzeln erreichbar
+    labels = [rect['label'] for rect in keyboard.keys[1:]]
+    duplicates = {label for label in labels if labels.count(label) > 1}
+    assert duplicates, "Symbol-Layout enthält doppelte Labels"
+    print(f"  ✓ {len(keyboard.keys) - 1} Tasten, Duplikate einzeln: {' '.join(sorted(duplicates))}")
+    
+    # Außerhalb der Tastatur: keine Taste
+    assert keyboard.key_at(5, 10) == 0
+    assert keyboard.key_at(479, 400) == 0
+    assert keyboard.hit_test(-1, 200) is None
+    print("  ✓ Außerhalb der Tastatur keine Taste")
+
+def test_draw_benchmark():
+    """Benchmark: direktes Zeichnen gegen vorgerenderte Bitmaps"""
+    print("[TEST] Zeichen-Benchmark...")
+    
+    keyboard = VirtualKeyboard(width=480, height=140, y_offset=180)
+    keyboard.ctrl_active = True
+    frame = np.zeros((320, 480, 3), dtype=np.uint8)
+    keyboard.draw(frame)    # Layout einmal vorrendern
+    
+    def measure(draw, n=200):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            draw(frame)
+        return (time.perf_counter() - t0) / n * 1000
+    
+    direct_ms = measure(lambda f: _draw_direct(keyboard, f))
+    cached_ms = measure(keyboard.draw)
+    print(f"  direkt {direct_ms:.3f} ms, vorgerendert {cached_ms:.3f} ms "
+          f"(x{direct_ms / cached_ms:.0f})")
+    print("  ✓ Tastatur zeichnen ist eine Kopie plus Overlay")
+
 def visual_test():
     """Visueller Test: Zeigt Tastatur-Layouts an"""
     print("[TEST] Visueller Test...")
@@ -185,6 +303,9 @@ def main():
     test_shift_layout(keyboard)
     test_symbols_layout(keyboard)
     test_exit_key(keyboard)
+    test_prerendered_layouts()
+    test_key_map()
+    test_draw_benchmark()
     
     print()
     print("=" * 50)
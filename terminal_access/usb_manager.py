@@ -10,9 +10,11 @@ import subprocess
 import time
 
 class USBManager:
-    def __init__(self, fb_width=480, fb_height=320):
+    def __init__(self, fb_width=480, fb_height=320, before_unmount=None):
         self.width = fb_width
         self.height = fb_height
+        # Optionaler Callback vor dem Unmount (z.B. ausstehende Fotos schreiben)
+        self.before_unmount = before_unmount
         self.usb_dev = "/dev/sda1"
         self.mount_point = "/media/usb"
         
@@ -35,6 +37,9 @@ class USBManager:
             return False, "USB nicht gemountet"
         
         try:
+            if self.before_unmount:
+                self.before_unmount()
+            
             # Sync vor Unmount
             subprocess.run(["sync"], check=True, timeout=10)
             time.sleep(0.5)
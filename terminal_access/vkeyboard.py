@@ -3,6 +3,11 @@
 """
 Virtuelle Tastatur für Framebuffer-Display
 Rendert Tastatur-Layout mit OpenCV und verarbeitet Touch-Input
+
+Jedes Layout wird einmal als Bitmap vorgerendert (normal und komplett
+hervorgehoben); draw() kopiert nur noch das Band und blendet aktive
+Modifier bzw. die gedrückte Taste als Ausschnitt aus der hervorgehobenen
+Variante ein.
 """
 
 import cv2
@@ -16,28 +21,38 @@ class VirtualKeyboard:
     # Tastatur-Layouts - kompakt für 480px Breite
     LAYOUT_NORMAL = [
         ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0', 'BKSP'],
-        ['q', 'w', 'e', 'r', 't', 'y', 'u', 'i', 'o', 'p'],
-        ['a', 's', 'd', 'f', 'g', 'h', 'j', 'k', 'l', 'ENTER'],
+        ['q', 'w', 'e', 'r', 't', 'y', 'u', 'i', 'o', 'p', 'PGUP'],
+        ['a', 's', 'd', 'f', 'g', 'h', 'j', 'k', 'l', 'ENTER', 'PGDN'],
         ['SHIFT', 'z', 'x', 'c', 'v', 'b', 'n', 'm', '.', '/', 'UP'],
         ['CTRL', 'ESC', 'TAB', 'SPACE', 'SYM', 'LF', 'DN', 'RT', 'EXIT']
     ]
     
     LAYOUT_SHIFT = [
         ['!', '@', '#', '$', '%', '^', '&', '*', '(', ')', 'BKSP'],
-        ['Q', 'W', 'E', 'R', 'T', 'Y', 'U', 'I', 'O', 'P'],
-        ['A', 'S', 'D', 'F', 'G', 'H', 'J', 'K', 'L', 'ENTER'],
+        ['Q', 'W', 'E', 'R', 'T', 'Y', 'U', 'I', 'O', 'P', 'PGUP'],
+        ['A', 'S', 'D', 'F', 'G', 'H', 'J', 'K', 'L', 'ENTER', 'PGDN'],
         ['SHIFT', 'Z', 'X', 'C', 'V', 'B', 'N', 'M', ',', '?', 'UP'],
         ['CTRL', 'ESC', 'TAB', 'SPACE', 'SYM', 'LF', 'DN', 'RT', 'EXIT']
     ]
     
     LAYOUT_SYMBOLS = [
         ['~', '`', '-', '=', '[', ']', '\\', ';', "'", '"', 'BKSP'],
-        ['!', '@', '#', '$', '%', '^', '&', '*', '(', ')'],
-        ['{', '}', '|', '<', '>', '_', '+', ':', ';', 'ENTER'],
+        ['!', '@', '#', '$', '%', '^', '&', '*', '(', ')', 'PGUP'],
+        ['{', '}', '|', '<', '>', '_', '+', ':', ';', 'ENTER', 'PGDN'],
         ['SHIFT', '/', '?', ',', '.', '-', '=', '+', '_', '|', 'UP'],
         ['CTRL', 'ESC', 'TAB', 'SPACE', 'ABC', 'LF', 'DN', 'RT', 'EXIT']
     ]
     
+    # Blättern im Scrollback (lokal, geht nicht an die Shell): Richtung
+    SCROLL_KEYS = {'PGUP': 1, 'PGDN': -1}
+    
+    # Farben (BGR)
+    COLOR_BACKGROUND = (30, 30, 30)
+    COLOR_KEY = (80, 80, 80)
+    COLOR_ACTIVE = (100, 200, 255)   # aktiver Modifier / gedrückte Taste
+    COLOR_EXIT = (0, 0, 200)
+    COLOR_BORDER = (150, 150, 150)
+    
     def __init__(self, width=400, height=140, y_offset=180):
         """
         Args:
@@ -55,16 +70,36 @@ class VirtualKeyboard:
         self.alt_active = False
         self.symbols_active = False
         
-        self.key_rects = {}
+        self.keys = [None]      # Tastentabelle, Index = Tasten-id
+        self.key_map = None     # uint8-Indexbild: Pixel -> Tasten-id
+        self.key_rects = {}     # Label -> erste Taste mit diesem Label
         self.last_key = None
+        self.pressed_id = 0     # wird hervorgehoben (z.B. kurz nach dem Antippen)
+        
+        # Vorgerenderte Layouts: id(layout) -> (normal, hervorgehoben)
+        self._bitmaps = {}
+        self._bitmap_geometry = None
+        self.bitmaps_rendered = 0
         
         self._calculate_key_positions()
         
     def _calculate_key_positions(self):
-        """Berechnet Position und Größe jeder Taste"""
-        self.key_rects.clear()
+        """
+        Berechnet Position und Größe jeder Taste des aktuellen Layouts
         
-        layout = self._get_current_layout()
+        Ergebnis ist die Tastentabelle (keys[id] = Rechteck, id 0 = keine Taste)
+        und ein uint8-Indexbild über den Tastaturbereich, das jedem Pixel die
+        id seiner Taste zuordnet. Zeichnen und Touch nutzen dieselbe Tabelle.
+        """
+        self.keys, self.key_map = self._layout_keys(self._get_current_layout())
+        self.key_rects = {}
+        for rect in self.keys[1:]:
+            self.key_rects.setdefault(rect['label'], rect)
+        self._rects_geometry = self._geometry()
+        
+    def _layout_keys(self, layout):
+        """Tastentabelle und Indexbild eines Layouts bei der aktuellen Geometrie"""
+        keys = [None]   # id 0 = keine Taste
         num_rows = len(layout)
         row_height = self.height // num_rows
         
@@ -82,15 +117,24 @@ class VirtualKeyboard:
                 else:
                     key_width = self.width // num_keys
                 
-                self.key_rects[key] = {
+                keys.append({
+                    'id': len(keys),
                     'x': x_pos,
                     'y': y,
                     'w': key_width,
                     'h': row_height,
                     'label': key
-                }
+                })
                 
                 x_pos += key_width
+        
+        # Indexbild: Zeilen relativ zu y_offset, Spalten absolut
+        map_width = max(rect['x'] + rect['w'] for rect in keys[1:])
+        key_map = np.zeros((self.height, map_width), dtype=np.uint8)
+        for rect in keys[1:]:
+            r0 = rect['y'] - self.y_offset
+            key_map[r0:r0 + rect['h'], rect['x']:rect['x'] + rect['w']] = rect['id']
+        return keys, key_map
                 
     def _get_current_layout(self):
         """Gibt aktuelles Layout zurück basierend auf Modifier-Tasten"""
@@ -101,38 +145,48 @@ class VirtualKeyboard:
         else:
             return self.LAYOUT_NORMAL
             
-    def draw(self, frame):
+    def _geometry(self):
+        return (self.width, self.height, self.y_offset, self.x_offset)
+        
+    def _active_labels(self):
+        """Tasten, die wegen aktiver Modifier hervorgehoben werden"""
+        active = []
+        if self.shift_active:
+            active.append('SHIFT')
+        if self.ctrl_active:
+            active.append('CTRL')
+        if self.alt_active:
+            active.append('ALT')
+        if self.symbols_active:
+            active.extend(('SYM', 'ABC'))
+        return active
+        
+    def _render_keys(self, frame, keys, highlight=False):
         """
-        Zeichnet Tastatur auf Frame
+        Zeichnet alle Tasten direkt (langsam: Rechtecke + Anti-Aliasing-Text)
         
         Args:
-            frame: BGR numpy array (480x320x3)
+            frame: Bild in Display-Koordinaten
+            keys: Tastentabelle (siehe _layout_keys)
+            highlight: alle Tasten in der Hervorhebungsfarbe
         """
-        # Keyboard-Hintergrund
-        frame[self.y_offset:self.y_offset+self.height, :] = (30, 30, 30)
-        
-        layout = self._get_current_layout()
+        frame[self.y_offset:self.y_offset+self.height, :] = self.COLOR_BACKGROUND
         
-        for key_label, rect in self.key_rects.items():
+        for rect in keys[1:]:
+            key_label = rect['label']
             x, y, w, h = rect['x'], rect['y'], rect['w'], rect['h']
             
             # Farbe basierend auf Zustand
-            if key_label == 'SHIFT' and self.shift_active:
-                color = (100, 200, 255)
-            elif key_label == 'CTRL' and self.ctrl_active:
-                color = (100, 200, 255)
-            elif key_label == 'ALT' and self.alt_active:
-                color = (100, 200, 255)
-            elif key_label in ['SYM', 'ABC'] and self.symbols_active:
-                color = (100, 200, 255)
+            if highlight:
+                color = self.COLOR_ACTIVE
             elif key_label == 'EXIT':
-                color = (0, 0, 200)
+                color = self.COLOR_EXIT
             else:
-                color = (80, 80, 80)
+                color = self.COLOR_KEY
             
             # Taste zeichnen
             cv2.rectangle(frame, (x+2, y+2), (x+w-2, y+h-2), color, -1)
-            cv2.rectangle(frame, (x+2, y+2), (x+w-2, y+h-2), (150, 150, 150), 1)
+            cv2.rectangle(frame, (x+2, y+2), (x+w-2, y+h-2), self.COLOR_BORDER, 1)
             
             # Label
             font_scale = 0.4 if len(key_label) > 1 else 0.5
@@ -143,6 +197,75 @@ class VirtualKeyboard:
             cv2.putText(frame, key_label, (text_x, text_y),
                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
                        
+    def _layout_bitmaps(self, layout, frame_shape):
+        """Vorgerenderte Bitmaps des Layouts (bei Geometrie-Änderung neu)"""
+        geometry = self._geometry() + tuple(frame_shape[:2])
+        if geometry != self._bitmap_geometry:
+            self._bitmaps.clear()
+            self._bitmap_geometry = geometry
+        if self._rects_geometry != self._geometry():
+            self._calculate_key_positions()
+        
+        entry = self._bitmaps.get(id(layout))
+        if entry is None:
+            if layout is self._get_current_layout():
+                keys = self.keys
+            else:
+                keys = self._layout_keys(layout)[0]
+            bitmaps = []
+            for highlight in (False, True):
+                canvas = np.zeros((frame_shape[0], frame_shape[1], 3), dtype=np.uint8)
+                self._render_keys(canvas, keys, highlight)
+                bitmaps.append(canvas[self.y_offset:self.y_offset+self.height].copy())
+            entry = (bitmaps[0], bitmaps[1])
+            self._bitmaps[id(layout)] = entry
+            self.bitmaps_rendered += 1
+        return entry
+        
+    def draw(self, frame):
+        """
+        Zeichnet Tastatur auf Frame
+        
+        Kopiert das vorgerenderte Layout und blendet aktive Modifier und die
+        gedrückte Taste aus der hervorgehobenen Variante ein.
+        
+        Args:
+            frame: BGR numpy array (480x320x3)
+        """
+        normal, highlighted = self._layout_bitmaps(self._get_current_layout(), frame.shape)
+        y0 = self.y_offset
+        frame[y0:y0 + normal.shape[0]] = normal
+        
+        active = set(self._active_labels())
+        width = normal.shape[1]
+        for rect in self.keys[1:]:
+            if rect['label'] not in active and rect['id'] != self.pressed_id:
+                continue
+            x0 = max(rect['x'], 0)
+            x1 = min(rect['x'] + rect['w'], width)
+            r0 = rect['y'] - y0
+            r1 = min(r0 + rect['h'], normal.shape[0])
+            if x0 < x1 and r0 < r1:
+                frame[y0 + r0:y0 + r1, x0:x1] = highlighted[r0:r1, x0:x1]
+                
+    def key_at(self, x, y):
+        """
+        Taste unter einem Touch-Punkt (ein Zugriff ins Indexbild)
+        
+        Args:
+            x, y: Touch-Koordinaten (normalisiert auf Display-Auflösung)
+            
+        Returns:
+            Tasten-id (Index in self.keys) oder 0
+        """
+        if self._rects_geometry != self._geometry():
+            self._calculate_key_positions()
+        row = int(y) - self.y_offset
+        col = int(x)
+        if 0 <= row < self.key_map.shape[0] and 0 <= col < self.key_map.shape[1]:
+            return int(self.key_map[row, col])
+        return 0
+                       
     def hit_test(self, x, y):
         """
         Prüft welche Taste getroffen wurde
@@ -153,16 +276,14 @@ class VirtualKeyboard:
         Returns:
             Key-Label oder None
         """
-        # Touch-Hit-Testing
-        for key_label, rect in self.key_rects.items():
-            kx, ky, kw, kh = rect['x'], rect['y'], rect['w'], rect['h']
-            if kx <= x < (kx + kw) and ky <= y < (ky + kh):
-                # Debug nur für wichtige Tasten
-                if key_label in ['EXIT', 'ENTER']:
-                    print(f"[KEYBOARD] {key_label}")
-                return key_label
-        
-        return None
+        key_id = self.key_at(x, y)
+        if not key_id:
+            return None
+        key_label = self.keys[key_id]['label']
+        # Debug nur für wichtige Tasten
+        if key_label in ['EXIT', 'ENTER']:
+            print(f"[KEYBOARD] {key_label}")
+        return key_label
         
     def process_key(self, key_label):
         """
@@ -183,6 +304,10 @@ class VirtualKeyboard:
         if key_label == 'EXIT':
             return None, True
             
+        # Blättern erledigt der Aufrufer (siehe SCROLL_KEYS)
+        if key_label in self.SCROLL_KEYS:
+            return None, False
+            
         # Modifier-Tasten
         if key_label == 'SHIFT':
             self.shift_active = not self.shift_active
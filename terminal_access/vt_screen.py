@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pyte-Screen mit schnellem Pfad für reinen ASCII-Text
+
+pyte.Screen.draw() legt für jedes Zeichen per namedtuple._replace ein neues
+Char-Objekt an; bei großen Ausgaben (apt, dmesg, journalctl) ist das der
+Flaschenhals. FastScreen schreibt druckbare ASCII-Läufe zeilenweise und
+nimmt die Char-Objekte aus einem Cache pro Attributsatz. Alles andere
+(Unicode, Einfügemodus, ohne Auto-Wrap) läuft unverändert über pyte.
+"""
+
+import pyte
+from pyte import modes as mo
+
+
+class FastScreen(pyte.Screen):
+    """pyte.Screen mit gleichem Verhalten, aber schnellerem draw() für ASCII"""
+
+    def __init__(self, columns, lines, scrollback=None):
+        """
+        Args:
+            columns, lines: Größe wie bei pyte.Screen
+            scrollback: optionaler Scrollback für oben herauslaufende Zeilen
+        """
+        self._char_attrs = None     # Attribute, zu denen _chars gehört
+        self._chars = {}            # Zeichen -> Char mit aktuellen Attributen
+        self.scrollback = scrollback
+        super().__init__(columns, lines)
+
+    def index(self):
+        # Läuft die oberste Zeile des ganzen Bilds heraus, kommt sie in den Scrollback
+        # (Scroll-Bereiche mit oberem Rand, z.B. in Editoren, nicht)
+        if self.scrollback is not None:
+            top, bottom = self.margins or (0, self.lines - 1)
+            if top == 0 and self.cursor.y == bottom:
+                self.scrollback.push(self.buffer[0], self.columns)
+        super().index()
+
+    def draw(self, data):
+        data = data.translate(self.g1_charset if self.charset else self.g0_charset)
+        mode = self.mode
+        if (not data.isascii() or not data.isprintable()
+                or mo.IRM in mode or mo.DECAWM not in mode):
+            # Sonderfälle wie pyte (Übersetzung ist für ASCII idempotent)
+            return super().draw(data)
+
+        cursor = self.cursor
+        attrs = cursor.attrs
+        if attrs is not self._char_attrs:
+            self._char_attrs = attrs
+            self._chars = {}
+        chars = self._chars
+
+        columns = self.columns
+        pos = 0
+        end = len(data)
+        while pos < end:
+            if cursor.x == columns:
+                self.dirty.add(cursor.y)
+                self.carriage_return()
+                self.linefeed()
+            x = cursor.x
+            n = min(end - pos, columns - x)
+            run = data[pos:pos + n]
+            line = self.buffer[cursor.y]
+            try:
+                line.update(zip(range(x, x + n), map(chars.__getitem__, run)))
+            except KeyError:
+                # Neue Zeichen für diesen Attributsatz anlegen, dann nochmal
+                for char in set(run) - chars.keys():
+                    chars[char] = attrs._replace(data=char)
+                line.update(zip(range(x, x + n), map(chars.__getitem__, run)))
+            cursor.x = x + n
+            pos += n
+
+        self.dirty.add(cursor.y)